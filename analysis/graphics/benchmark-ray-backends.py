@@ -0,0 +1,71 @@
+import timeit
+import numpy as np
+import trimesh
+import sys
+import matplotlib.pyplot as plt
+import templates
+
+sys.path.append("../../preprocessor")
+from src import ray_backends
+
+RAY_AMOUNT = 5000
+RAY_DISPLACEMENT = 1e-4
+
+def random_points_in_element(element, amount):
+    random_weights = np.random.rand(amount, 3)
+    random_weights /= np.sum(random_weights, axis=1).reshape(-1, 1)
+    return (random_weights[:, np.newaxis] @ element).reshape((amount, 3))
+
+def random_unit_vectors(amount):
+    random_vectors = np.random.normal(0, 1, (amount, 3))
+    return random_vectors / np.linalg.norm(random_vectors, axis=1)[:, np.newaxis]
+
+def available_backends():
+	backends = [ray_backends.TRIMESH, ray_backends.NUMPY]
+	if trimesh.ray.has_embree:
+		backends.append(ray_backends.EMBREE)
+	try:
+		import open3d
+		backends.append(ray_backends.OPEN3D)
+	except ImportError:
+		pass
+	return backends
+
+def backend_benchmark(file_path, backend_name):
+	# The scene of the backend (and its BVH) is built once and reused by every
+	# element, as the preprocessor does for a whole run.
+	mesh = trimesh.load(file_path)
+	backend = ray_backends.create_ray_backend(mesh, backend_name)
+	for emitting_element in mesh.triangles:
+		ray_origins = random_points_in_element(emitting_element, RAY_AMOUNT)
+		ray_directions = random_unit_vectors(RAY_AMOUNT)
+		ray_origins += ray_directions * RAY_DISPLACEMENT
+		backend.intersects_first(ray_origins, ray_directions)
+
+def main():
+	if len(sys.argv) < 3:
+		print(f"Use: {sys.argv[0]} <folder> <mesh1> <mesh2> ...")
+		print("Meshes must not include .stl extension")
+
+	_, folder, *meshes = sys.argv
+	if folder[-1] != "/":
+		folder += "/"
+	element_amount = list(map(lambda x: int(x), meshes))
+	element_amount.sort()
+	meshes = list(map(lambda x : folder + str(x) + ".stl", element_amount))
+
+	backends = available_backends()
+	backend_times = {backend: [] for backend in backends}
+	for mesh in meshes:
+		print(mesh)
+		for backend in backends:
+			backend_times[backend].append(timeit.timeit(lambda : backend_benchmark(mesh, backend), number=1))
+
+	templates.template_style()
+	fig, ax = plt.subplots()
+	for backend in backends:
+		ax.plot(element_amount, backend_times[backend], label=backend, marker="s")
+	templates.template_plot(ax, "Number of Elements", "Execution Time (s)", "Ray Backends")
+	templates.template_save_multiple_images([fig], "ray_backends", ["ray_backends"])
+
+main()
@@ -13,13 +13,37 @@ def _get_file_with_name(directory, filename):
             return f"{directory}/{file}"
     raise FileNotFoundError(filename)
 
+def _parse_options(options):
+    """
+    Given the list of arguments that follow the files directory path, it returns
+    a dictionary with the parsed options.
+
+    The options are:
+        --workers N: amount of worker processes used to compute the view factors.
+        --backend NAME: ray backend (trimesh, embree, open3d or numpy).
+        --resume: continues an interrupted process run from its checkpoint.
+    """
+    parsed_options = {"workers": 1, "backend": None, "resume": False}
+    options = iter(options)
+    for option in options:
+        match option:
+            case "--workers":
+                parsed_options["workers"] = int(next(options))
+            case "--backend":
+                parsed_options["backend"] = next(options)
+            case "--resume":
+                parsed_options["resume"] = True
+            case _:
+                raise ValueError(f"Unknown option {option}")
+    return parsed_options
+
 def main():
     """
     Reads from the argv and expect a command as the first argument.
 
     The commands are:
         process: given the mesh, properties, gmat report and eclipse report files
-        it calculates the view factors.
+        it calculates the view factors. Accepts the --workers N, --backend NAME and --resume options.
         viewm: given the mesh and properties files it displays the materials of the mesh.
         viewn: given the mesh file it displays the normal orientation of each mesh element.
     """
@@ -27,11 +51,18 @@ def main():
         commands.show_help(sys.argv)
         return
 
-    [_, opcode, files_directory_path] = sys.argv
+    [_, opcode, files_directory_path, *options] = sys.argv
 
     if files_directory_path[-1] != "/":
         files_directory_path += "/"
 
+    try:
+        options = _parse_options(options)
+    except (ValueError, StopIteration) as e:
+        print("Error: Invalid options", e)
+        commands.show_help(sys.argv)
+        return -1
+
     try:
         mesh_file_path = _get_file_with_name(files_directory_path, "mesh.vtk")
         properties_file_path = _get_file_with_name(files_directory_path, "properties.json")
@@ -55,6 +86,9 @@ def main():
                     gmat_report_file_path,
                     gmat_eclipse_file_path,
                     view_factors_file_path,
+                    workers=options["workers"],
+                    ray_backend=options["backend"],
+                    resume=options["resume"],
                 )
 
             case "viewm":
@@ -0,0 +1,89 @@
+import numpy as np
+import trimesh
+from . import vector_math
+
+SUN_POINTING = "sun_pointing"
+NADIR_POINTING = "nadir_pointing"
+INERTIAL = "inertial"
+ATTITUDES = (SUN_POINTING, NADIR_POINTING, INERTIAL)
+
+
+def look_at_rotation(direction):
+    """
+    Receives a direction in space and returns the 3x3 rotation that takes the
+    mesh local z+ onto it (the rotation applied by mesh_ops.look_at).
+    """
+    _, phi, theta = vector_math.spherical_cordinates(direction)
+    rotation = trimesh.transformations.rotation_matrix(
+        phi, [0, 0, 1]
+    ) @ trimesh.transformations.rotation_matrix(theta, [1, 0, 0])
+    return rotation[:3, :3]
+
+
+def _unit_rows(vectors):
+    return vectors / np.linalg.norm(vectors, axis=1)[:, np.newaxis]
+
+
+def _nadir_pointing_rotations(sat_positions, sat_velocities):
+    """
+    Receives the satellite positions and velocities and returns the rotations
+    (D, 3, 3) of the local vertical local horizontal frame: z+ towards the earth
+    (nadir), y+ against the orbit normal and x+ along the velocity.
+    """
+    z_axes = _unit_rows(-sat_positions)
+    y_axes = _unit_rows(-np.cross(sat_positions, sat_velocities))
+    x_axes = np.cross(y_axes, z_axes)
+    return np.stack((x_axes, y_axes, z_axes), axis=2)
+
+
+def body_rotations(attitude, sun_direction, sat_positions, sat_velocities):
+    """
+    Receives the attitude law (sun_pointing, nadir_pointing or inertial), the
+    direction towards the sun and the satellite positions and velocities at each
+    orbit division. Returns the rotations (D, 3, 3) from the mesh (body) frame
+    to the inertial frame at each division: sun pointing keeps the mesh z+
+    towards the sun, nadir pointing keeps the mesh z+ towards the earth and x+
+    along the velocity, and inertial keeps the mesh frame fixed.
+    """
+    divisions_amount = len(sat_positions)
+    if attitude == SUN_POINTING:
+        return np.broadcast_to(
+            look_at_rotation(sun_direction), (divisions_amount, 3, 3)
+        )
+    if attitude == NADIR_POINTING:
+        return _nadir_pointing_rotations(sat_positions, sat_velocities)
+    if attitude == INERTIAL:
+        return np.broadcast_to(np.eye(3), (divisions_amount, 3, 3))
+    raise ValueError(f"Unknown attitude {attitude}")
+
+
+def to_body_frame(rotations, directions):
+    """
+    Receives the body to inertial rotations (D, 3, 3) of some divisions and a
+    direction (3,) or one direction per division (D, 3) in the inertial frame.
+    Returns the directions (D, 3) in the body frame of each division.
+    """
+    directions = np.broadcast_to(directions, (len(rotations), 3))
+    return np.einsum("dji,dj->di", rotations, directions)
+
+
+def division_directions(
+    attitude, sun_direction, sat_position, elapsed_secs, division_steps
+):
+    """
+    Receives the attitude law, the direction towards the sun, the satellite
+    positions at every orbit step, their elapsed seconds and the steps of the
+    orbit divisions.
+    Returns the directions towards the sun and towards the earth (D, 3) in the
+    body frame of each division, so the mesh is never transformed.
+    """
+    sat_position = np.asarray(sat_position, dtype=float)
+    sat_velocities = np.gradient(sat_position, np.asarray(elapsed_secs), axis=0)
+    sat_positions = sat_position[division_steps]
+    rotations = body_rotations(
+        attitude, sun_direction, sat_positions, sat_velocities[division_steps]
+    )
+    return (
+        to_body_frame(rotations, sun_direction),
+        _unit_rows(to_body_frame(rotations, -sat_positions)),
+    )
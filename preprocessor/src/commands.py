@@ -1,22 +1,387 @@
+import os
 import numpy as np
-from . import vector_math, mesh_ops, properties_atlas, vtk_io, view_factors, visualization, serializer
+from functools import partial
+from . import vector_math, mesh_ops, properties_atlas, vtk_io, view_factors, visualization, serializer, parallel, view_factors_cache, view_factors_checkpoint, pipeline, sampling, reciprocity, symmetry, attitude, orbit_interpolation
 
-def _is_closest_orbit_point(step, elapsed_secs, target_time):
+ELEMENT_ERRORS_FILE_NAME = "element_view_factors_errors.txt"
+ELEMENT_ROWS_FILE_NAME = "element_view_factors.rows"
+EARTH_ERRORS_FILE_NAME = "earth_view_factors_errors.txt"
+
+def _orbit_division_steps(
+    elapsed_secs, orbit_period, orbit_divisions, phase_folding=False
+):
+    """
+    Recieves the elapsed seconds of every GMAT step, the orbit period, the amount
+    of orbit divisions and whether to fold the steps of every orbit of the report
+    into a single orbit by their phase (elapsed seconds modulo the period).
+    Selects, with a single binary search, the step closest to the start time of
+    every division (the later one on ties). Steps are taken in increasing time
+    and at most once, so a division whose closest step was already taken moves
+    to the next one, and divisions past the last step are dropped.
+    Returns the selected steps and their times within the orbit.
+    """
+    elapsed_secs = np.asarray(elapsed_secs, dtype=float)
+    step_times = np.mod(elapsed_secs, orbit_period) if phase_folding else elapsed_secs
+    order = np.argsort(step_times, kind="stable")
+    sorted_times = step_times[order]
+    if len(sorted_times) < 2:
+        return order, sorted_times
+
+    target_times = orbit_period / orbit_divisions * np.arange(orbit_divisions)
+    next_positions = np.clip(
+        np.searchsorted(sorted_times, target_times, side="right"),
+        1,
+        len(sorted_times) - 1,
+    )
+    closest_positions = np.where(
+        np.abs(target_times - sorted_times[next_positions - 1])
+        < np.abs(target_times - sorted_times[next_positions]),
+        next_positions - 1,
+        next_positions,
+    )
+    division_numbers = np.arange(orbit_divisions)
+    positions = division_numbers + np.maximum.accumulate(
+        closest_positions - division_numbers
+    )
+    steps = order[positions[positions < len(sorted_times)]]
+    return steps, step_times[steps]
+
+
+def _stored_values(checkpoint, name, cache, key_values):
+    """
+    Receives a view factors checkpoint and cache (or None), the name of a result
+    in the checkpoint and the values that identify it in the cache.
+    Returns the values stored in the checkpoint or else in the cache (copying
+    them into the checkpoint), or None if neither has them.
+    """
+    values = None if checkpoint is None else checkpoint.load(name)
+    if values is None and cache is not None:
+        values = cache.load(view_factors_cache.fingerprint(*key_values))
+        if values is not None and checkpoint is not None:
+            checkpoint.store(name, values)
+    return values
+
+
+def _store_values(checkpoint, name, cache, key_values, values):
+    """
+    Receives a view factors checkpoint and cache (or None), the name and key
+    values of a result (see _stored_values) and its list of values, and stores
+    them in both.
+    """
+    values = list(values)
+    if cache is not None:
+        cache.store(view_factors_cache.fingerprint(*key_values), values)
+    if checkpoint is not None:
+        checkpoint.store(name, values)
+
+
+def _element_element_stage(
+    mesh,
+    ray_backend,
+    absorptance_by_element,
+    two_sides_emission_by_element,
+    element_ray_amount,
+    element_max_reflections_amount,
+    element_block_size,
+    seed,
+    element_view_factors_threshold,
+    element_view_factors_sparse,
+    element_ray_tolerance,
+    element_max_ray_amount,
+    element_ray_sampling,
+    element_ray_cosine_weighted,
+    element_analytic_view_factors,
+    element_culling,
+    element_symmetry_group,
+    element_view_factors_streaming,
+    element_reflection_mode,
+    diffuse_fraction_by_element,
+    pool,
+    rows_file_path,
+    checkpoint,
+):
+    print("Calculating element-element ir view factors")
+    element_amount = mesh_ops.element_amount(mesh)
+    rows_writer = None
+    if element_view_factors_streaming:
+        rows_writer = serializer.ElementRowsWriter(
+            rows_file_path,
+            element_amount,
+            element_amount,
+            element_view_factors_sparse,
+        )
+    emitters = None
+    if len(element_symmetry_group) > 1:
+        emitters, _, _ = symmetry.representatives(element_symmetry_group)
+        print(
+            f"Tracing {len(emitters)} representative elements of "
+            f"{element_amount} ({len(element_symmetry_group)} symmetries)"
+        )
+    element_element_view_factors, element_element_errors = view_factors.element_element(
+        mesh,
+        absorptance_by_element,
+        two_sides_emission_by_element,
+        element_ray_amount,
+        element_max_reflections_amount,
+        block_size=element_block_size,
+        pool=pool,
+        seed=seed,
+        threshold=element_view_factors_threshold,
+        sparse_output=element_view_factors_sparse,
+        tolerance=element_ray_tolerance,
+        max_ray_amount=element_max_ray_amount,
+        return_errors=True,
+        sampling_method=element_ray_sampling,
+        cosine_weighted=element_ray_cosine_weighted,
+        emitters=emitters,
+        analytic_direct=element_analytic_view_factors,
+        culling_enabled=element_culling,
+        rows_writer=rows_writer,
+        checkpoint=checkpoint,
+        reflection_mode=element_reflection_mode,
+        diffuse_fraction_by_element=diffuse_fraction_by_element,
+    )
+    if rows_writer is not None:
+        rows_writer.close()
+        element_element_view_factors = rows_file_path
+    if emitters is not None:
+        element_element_view_factors = symmetry.expand_rows(
+            element_element_view_factors, element_symmetry_group
+        )
+        element_element_errors = symmetry.expand_values(
+            element_element_errors, element_symmetry_group
+        )
+    return [element_element_view_factors, element_element_errors]
+
+
+def _report_element_element_errors(errors, errors_file_path):
+    """
+    Receives the achieved standard error of each element-element view factors
+    row, prints a summary and saves them into the errors_file_path file.
     """
-    Recieves a step (time), an array of elapsed_secs and an ideal target_time, and
-    Returns true if the step point time is the closest to the target time or
-    false otherwise.
+    worst_element_id = np.argmax(errors)
+    print(
+        f"Element-element standard error: mean {np.mean(errors):.2e}, "
+        f"max {errors[worst_element_id]:.2e} (element {worst_element_id})"
+    )
+    np.savetxt(errors_file_path, errors)
+
+
+def _report_earth_interpolation_errors(errors, errors_file_path):
     """
-    if step == len(elapsed_secs) - 1:
-        return True
-    curr_elapsed_seconds = elapsed_secs[step]
-    next_elapsed_seconds = elapsed_secs[step + 1]
+    Receives the error estimate (D, N) of the interpolated earth view factors of
+    each element at each orbit division, prints a summary and saves them into the
+    errors_file_path file (one row per division).
+    """
+    worst_division, worst_element_id = np.unravel_index(np.argmax(errors), errors.shape)
+    print(
+        f"Earth view factors interpolation error: mean {np.mean(errors):.2e}, "
+        f"max {errors[worst_division, worst_element_id]:.2e} "
+        f"(element {worst_element_id}, division {worst_division})"
+    )
+    np.savetxt(errors_file_path, errors)
+
+
+def _reciprocity_stage(
+    mesh,
+    absorptance_by_element,
+    two_sides_emission_by_element,
+    element_element_traced_view_factors,
+    element_view_factors_reciprocity,
+):
+    if not element_view_factors_reciprocity:
+        return [element_element_traced_view_factors]
+    print("Enforcing element-element view factors reciprocity")
+    weights = reciprocity.emission_weights(
+        mesh.area_faces, absorptance_by_element, two_sides_emission_by_element
+    )
+    element_element_view_factors, residuals = reciprocity.enforce_reciprocity(
+        element_element_traced_view_factors, weights
+    )
+    print(
+        f"Reciprocity residual: {residuals['reciprocity_before']:.2e} -> "
+        f"{residuals['reciprocity_after']:.2e}, "
+        f"row sums residual: {residuals['row_sums_before']:.2e} -> "
+        f"{residuals['row_sums_after']:.2e}"
+    )
+    if residuals["unbalanced_emitters"]:
+        print(
+            f"{residuals['unbalanced_emitters']} elements see nothing, their "
+            "exchange was left as traced"
+        )
+    return [element_element_view_factors]
 
-    if next_elapsed_seconds > target_time and np.abs(
-        target_time - curr_elapsed_seconds
-    ) < np.abs(target_time - next_elapsed_seconds):
-        return True
-    return False
+
+def _attitude_stage(
+    attitude_law, sun_direction, sat_position, elapsed_secs, division_steps
+):
+    print(f"Setting up celestial bodies ({attitude_law} attitude)")
+    return attitude.division_directions(
+        attitude_law, sun_direction, sat_position, elapsed_secs, division_steps
+    )
+
+
+def _sun_stage(mesh, ray_backend, division_sun_directions, element_block_size, pool):
+    print("Calculating sun view factors")
+    return [
+        view_factors.element_sun_divisions(
+            mesh, division_sun_directions, pool=pool, block_size=element_block_size
+        )
+    ]
+
+
+def _orbit_divisions_stage(
+    elapsed_secs, orbit_period, orbit_divisions, orbit_phase_folding
+):
+    division_steps, division_secs = _orbit_division_steps(
+        elapsed_secs, orbit_period, orbit_divisions, orbit_phase_folding
+    )
+    print(f"Orbit was divided into {len(division_steps)} points")
+    return [division_steps, division_secs]
+
+
+def _earth_visibility_stage(
+    mesh,
+    ray_backend,
+    earth_visibility_precomputed,
+    earth_ray_amount,
+    element_block_size,
+    seed,
+    pool,
+):
+    if not earth_visibility_precomputed:
+        return [np.zeros((0, 3)), np.zeros((0, 0), dtype=np.uint8)]
+    print("Precomputing earth visibility")
+    return view_factors.earth_visibility(
+        mesh,
+        earth_ray_amount,
+        block_size=element_block_size,
+        pool=pool,
+        seed=seed,
+    )
+
+
+def _earth_stage(
+    mesh,
+    mesh_hash,
+    ray_backend,
+    division_earth_directions,
+    division_sun_directions,
+    earth_visibility_directions,
+    earth_visibility,
+    earth_ray_amount,
+    element_block_size,
+    seed,
+    earth_interpolation_tolerance,
+    earth_interpolation_anchors,
+    pool,
+    cache,
+    checkpoint,
+):
+    print("Calculating earth view factors")
+    divisions_amount = len(division_earth_directions)
+
+    computed_divisions = []
+
+    def division_key_values(division_number):
+        return [
+            "element_earth",
+            mesh_hash,
+            ray_backend,
+            division_earth_directions[division_number],
+            division_sun_directions[division_number],
+            earth_ray_amount,
+            element_block_size,
+            seed,
+            division_number,
+        ]
+
+    def traced_divisions(division_numbers):
+        if len(earth_visibility_directions):
+            return (
+                view_factors.element_earth_from_visibility(
+                    mesh,
+                    (earth_visibility_directions, earth_visibility),
+                    division_earth_directions[division_number],
+                    division_sun_directions[division_number],
+                    penumbra_fraction=0.0,
+                    block_size=element_block_size,
+                )
+                for division_number in division_numbers
+            )
+        return view_factors.element_earth_divisions(
+            mesh,
+            division_earth_directions[division_numbers],
+            division_sun_directions[division_numbers],
+            penumbra_fraction=0.0,
+            ray_amount=earth_ray_amount,
+            block_size=element_block_size,
+            pool=pool,
+            seed=seed,
+            division_numbers=division_numbers,
+        )
+
+    def compute_divisions(division_numbers):
+        stored_divisions = {}
+        if not len(earth_visibility_directions):
+            for division_number in division_numbers:
+                values = _stored_values(
+                    checkpoint,
+                    f"earth_division_{division_number}",
+                    cache,
+                    division_key_values(division_number),
+                )
+                if values is not None:
+                    stored_divisions[division_number] = values
+        traced_view_factors = traced_divisions(
+            [
+                division_number
+                for division_number in division_numbers
+                if division_number not in stored_divisions
+            ]
+        )
+        divisions_view_factors = []
+        for division_number in division_numbers:
+            values = stored_divisions.get(division_number)
+            if values is None:
+                values = next(traced_view_factors)
+                if not len(earth_visibility_directions):
+                    _store_values(
+                        checkpoint,
+                        f"earth_division_{division_number}",
+                        cache,
+                        division_key_values(division_number),
+                        values,
+                    )
+            divisions_view_factors.append(values)
+            computed_divisions.append(division_number)
+            print(f"{(len(computed_divisions) * 100) / divisions_amount:>5.1f}%")
+        return divisions_view_factors
+
+    if earth_interpolation_tolerance is None:
+        earth_ir_view_factors, earth_albedo_view_factors = (
+            np.array(view_factors_kind)
+            for view_factors_kind in zip(*compute_divisions(range(divisions_amount)))
+        )
+        return [earth_ir_view_factors, earth_albedo_view_factors, np.zeros((0, 0))]
+
+    (
+        (earth_ir_view_factors, earth_albedo_view_factors),
+        earth_interpolation_errors,
+        _,
+    ) = orbit_interpolation.interpolated_divisions(
+        orbit_interpolation.division_angles(
+            division_earth_directions, division_sun_directions
+        ),
+        compute_divisions,
+        earth_interpolation_tolerance,
+        earth_interpolation_anchors,
+    )
+    print(
+        f"Computed {len(computed_divisions)} orbit divisions and interpolated "
+        f"{divisions_amount - len(computed_divisions)}"
+    )
+    return [earth_ir_view_factors, earth_albedo_view_factors, earth_interpolation_errors]
 
 
 def process_view_factors(
@@ -25,12 +390,32 @@ def process_view_factors(
     orbit_report_file_path,
     orbit_eclipse_file_path,
     view_factors_file_path,
+    workers=1,
+    ray_backend=None,
+    resume=False,
 ):
     """
     Receives the mesh file path (vtk), the properties file path (json) and GMAT
     report and eclipse locator files (txt)
+    Optionally receives the amount of worker processes used to compute the
+    view factors, the name of the ray backend, which overrides the ray_backend
+    global property, and whether to resume the checkpoint of an interrupted run.
     It calculates the view factors for each step and saves them into the
     output_path file.
+    If the element_view_factors_streaming global property is set, the element-element
+    rows are streamed to an element rows file next to the output file as soon as each
+    block of emitters finishes, and copied into the output file at the end.
+    If the view_factors_checkpoint global property is set or the run is resumed,
+    finished blocks of element-element rows and orbit divisions are checkpointed next
+    to the output file as they finish, so a resumed run only computes the missing ones
+    and produces the same result as an uninterrupted run.
+    The mesh is never transformed: the sun and earth directions of each orbit division
+    are rotated into the mesh frame according to the attitude global property.
+    The computation is split into stages (element-element, reciprocity, orbit
+    divisions, attitude, sun, earth visibility and earth) whose outputs are cached by the fingerprint of
+    their inputs, which include the ray backend of the stages that cast rays, so only the
+    stages whose inputs changed are recomputed. The earth
+    stage caches each traced orbit division instead of its whole output.
     """
     print("Starting process of view factors")
 
@@ -44,83 +429,300 @@ def process_view_factors(
         orbit_report_file_path,
         orbit_eclipse_file_path,
     )
-    earth_ray_amount = properties.global_properties["earth_ray_amount"]
-    element_ray_amount = properties.global_properties["element_ray_amount"]
-    element_max_reflections_amount = properties.global_properties[
-        "element_max_reflections_amount"
-    ]
-    orbit_divisions = properties.global_properties["orbit_divisions"]
-    division_time = properties.orbit_properties.period / orbit_divisions
+    global_properties = properties.global_properties
+    seed = global_properties.get("seed", None)
+    cache_enabled = global_properties.get("view_factors_cache", True)
+    cache_max_size_mb = global_properties.get(
+        "view_factors_cache_max_size_mb", view_factors_cache.DEFAULT_MAX_SIZE_MB
+    )
+    orbit_divisions = global_properties["orbit_divisions"]
     elapsed_secs = properties.orbit_properties.elapsed_secs
     sun_direction = vector_math.normalize(properties.orbit_properties.sun_position)
+    attitude_law = global_properties.get("attitude", attitude.SUN_POINTING)
+    if attitude_law not in attitude.ATTITUDES:
+        raise ValueError(f"Unknown attitude {attitude_law}")
 
     if orbit_divisions > len(elapsed_secs):
         raise Exception(
             "Orbit divisions ({orbit_divisions}) is greater than GMAT data rows ({len(elapsed_secs)})"
         )
 
-    print("Setting up celestial bodies")
-    mesh_ops.look_at(mesh, sun_direction)
-
-    print("Calculating element-element ir view factors")
-    element_element_ir_view_factors = view_factors.element_element(
-        mesh,
-        properties.absortance_ir_by_element,
-        properties.two_sides_emission_by_element,
-        element_ray_amount,
-        element_max_reflections_amount
+    element_symmetry_group = np.arange(mesh_ops.element_amount(mesh))[np.newaxis]
+    element_symmetry = global_properties.get("element_symmetry", False)
+    element_view_factors_streaming = global_properties.get(
+        "element_view_factors_streaming", False
+    )
+    element_view_factors_reciprocity = global_properties.get(
+        "element_view_factors_reciprocity", False
     )
+    if element_view_factors_streaming and (
+        element_symmetry or element_view_factors_reciprocity
+    ):
+        raise Exception(
+            "Streamed element view factors can't be combined with element_symmetry "
+            "or element_view_factors_reciprocity, which need the whole matrix"
+        )
+    rows_file_path = os.path.join(
+        os.path.dirname(view_factors_file_path), ELEMENT_ROWS_FILE_NAME
+    )
+    if element_symmetry:
+        print("Detecting mesh symmetries")
+        element_symmetry_group = symmetry.symmetry_group(
+            mesh,
+            properties.absortance_ir_by_element,
+            properties.two_sides_emission_by_element,
+            element_symmetry,
+            properties.diffuse_fraction_by_element,
+        )
 
-    print("Calculating sun view factors")
-    element_sun_view_factors = [
-        (
-            view_factors.element_sun(mesh, sun_direction),
-            properties.orbit_properties.elapsed_secs[0],
+    cache = None
+    if cache_enabled and seed is not None:
+        cache = view_factors_cache.ViewFactorsCache(
+            os.path.join(
+                os.path.dirname(view_factors_file_path),
+                view_factors_cache.CACHE_DIRECTORY_NAME,
+            ),
+            cache_max_size_mb,
         )
-    ]
+    elif cache_enabled:
+        print("View factors cache disabled: it requires the seed global property")
+    mesh_hash = view_factors_cache.mesh_fingerprint(mesh)
 
-    print("Calculating earth view factors")
-    element_earth_ir_view_factors = []
-    element_earth_albedo_view_factors = []
-    division_number = 0
+    ray_backend = ray_backend or global_properties.get("ray_backend", None)
+    pool = parallel.WorkerPool(mesh, workers, ray_backend)
+    print(f"Using the {pool.ray_backend_name} ray backend")
+    if workers > 1:
+        print(f"Using {workers} worker processes")
 
-    for step in range(len(elapsed_secs)):
-        if not _is_closest_orbit_point(
-            step, elapsed_secs, division_time * division_number
-        ):
-            continue
+    stage_inputs = {
+        "mesh": mesh,
+        "mesh_hash": mesh_hash,
+        "ray_backend": pool.ray_backend_name,
+        "absorptance_by_element": properties.absortance_ir_by_element,
+        "two_sides_emission_by_element": properties.two_sides_emission_by_element,
+        "element_ray_amount": global_properties["element_ray_amount"],
+        "element_max_reflections_amount": global_properties[
+            "element_max_reflections_amount"
+        ],
+        "element_block_size": global_properties.get(
+            "element_block_size", view_factors.ELEMENT_BLOCK_SIZE
+        ),
+        "seed": seed,
+        "element_view_factors_threshold": global_properties.get(
+            "element_view_factors_threshold", 1 / serializer.FACTOR
+        ),
+        "element_view_factors_sparse": global_properties.get(
+            "element_view_factors_sparse", True
+        ),
+        "element_ray_tolerance": global_properties.get("element_ray_tolerance", None),
+        "element_max_ray_amount": global_properties.get("element_max_ray_amount", None),
+        "element_ray_sampling": global_properties.get(
+            "element_ray_sampling", sampling.RANDOM
+        ),
+        "element_ray_cosine_weighted": global_properties.get(
+            "element_ray_cosine_weighted", False
+        ),
+        "element_analytic_view_factors": global_properties.get(
+            "element_analytic_view_factors", False
+        ),
+        "element_culling": global_properties.get("element_culling", False),
+        "element_symmetry_group": element_symmetry_group,
+        "element_view_factors_streaming": element_view_factors_streaming,
+        "element_reflection_mode": global_properties.get(
+            "element_reflection_mode", view_factors.SAMPLED_REFLECTIONS
+        ),
+        "diffuse_fraction_by_element": properties.diffuse_fraction_by_element,
+        "element_view_factors_reciprocity": element_view_factors_reciprocity,
+        "sun_direction": sun_direction,
+        "attitude_law": attitude_law,
+        "elapsed_secs": np.array(elapsed_secs),
+        "orbit_period": properties.orbit_properties.period,
+        "orbit_divisions": orbit_divisions,
+        "orbit_phase_folding": global_properties.get("orbit_phase_folding", False),
+        "earth_visibility_precomputed": global_properties.get(
+            "earth_visibility_precomputed", False
+        ),
+        "earth_ray_amount": global_properties["earth_ray_amount"],
+        "earth_interpolation_tolerance": global_properties.get(
+            "earth_interpolation_tolerance", None
+        ),
+        "earth_interpolation_anchors": global_properties.get(
+            "earth_interpolation_anchors", orbit_interpolation.DEFAULT_ANCHORS_AMOUNT
+        ),
+        "sat_position": np.array(properties.orbit_properties.sat_position),
+    }
 
-        earth_direction = vector_math.normalize(
-            -properties.orbit_properties.sat_position[step]
+    checkpoint = None
+    if global_properties.get("view_factors_checkpoint", False) or resume:
+        checkpoint = view_factors_checkpoint.ViewFactorsCheckpoint(
+            os.path.join(
+                os.path.dirname(view_factors_file_path),
+                view_factors_checkpoint.CHECKPOINT_DIRECTORY_NAME,
+            ),
+            view_factors_cache.fingerprint(
+                mesh_hash,
+                [
+                    (name, value)
+                    for name, value in sorted(stage_inputs.items())
+                    if name != "mesh"
+                ],
+            ),
+            np.random.SeedSequence().entropy if seed is None else seed,
+            resume,
         )
+        stage_inputs["seed"] = checkpoint.seed
+        if checkpoint.resumed:
+            print(
+                "Resuming from checkpoint: "
+                f"{checkpoint.stored_amount('element_block_')} element-element blocks and "
+                f"{checkpoint.stored_amount('earth_division_')} orbit divisions done"
+            )
 
-        ir_view_factors, albedo_view_factors = view_factors.element_earth(
-            mesh,
-            earth_direction,
-            sun_direction,
-            penumbra_fraction=0.0,
-            ray_amount=earth_ray_amount,
-        )
-        element_earth_ir_view_factors.append((ir_view_factors, elapsed_secs[step]))
-        element_earth_albedo_view_factors.append(
-            (albedo_view_factors, elapsed_secs[step])
+    stages = [
+        pipeline.Stage(
+            "element-element",
+            [
+                "mesh",
+                "ray_backend",
+                "absorptance_by_element",
+                "two_sides_emission_by_element",
+                "element_ray_amount",
+                "element_max_reflections_amount",
+                "element_block_size",
+                "seed",
+                "element_view_factors_threshold",
+                "element_view_factors_sparse",
+                "element_ray_tolerance",
+                "element_max_ray_amount",
+                "element_ray_sampling",
+                "element_ray_cosine_weighted",
+                "element_analytic_view_factors",
+                "element_culling",
+                "element_symmetry_group",
+                "element_view_factors_streaming",
+                "element_reflection_mode",
+                "diffuse_fraction_by_element",
+            ],
+            ["element_element_traced_view_factors", "element_element_errors"],
+            partial(
+                _element_element_stage,
+                pool=pool,
+                rows_file_path=rows_file_path,
+                checkpoint=checkpoint,
+            ),
+            cached=not element_view_factors_streaming,
+        ),
+        pipeline.Stage(
+            "element-element reciprocity",
+            [
+                "mesh",
+                "absorptance_by_element",
+                "two_sides_emission_by_element",
+                "element_element_traced_view_factors",
+                "element_view_factors_reciprocity",
+            ],
+            ["element_element_view_factors"],
+            _reciprocity_stage,
+            cached=False,
+        ),
+        pipeline.Stage(
+            "orbit divisions",
+            ["elapsed_secs", "orbit_period", "orbit_divisions", "orbit_phase_folding"],
+            ["division_steps", "division_secs"],
+            _orbit_divisions_stage,
+            cached=False,
+        ),
+        pipeline.Stage(
+            "attitude",
+            [
+                "attitude_law",
+                "sun_direction",
+                "sat_position",
+                "elapsed_secs",
+                "division_steps",
+            ],
+            ["division_sun_directions", "division_earth_directions"],
+            _attitude_stage,
+            cached=False,
+        ),
+        pipeline.Stage(
+            "sun",
+            ["mesh", "ray_backend", "division_sun_directions", "element_block_size"],
+            ["sun_view_factors"],
+            partial(_sun_stage, pool=pool),
+        ),
+        pipeline.Stage(
+            "earth visibility",
+            [
+                "mesh",
+                "ray_backend",
+                "earth_visibility_precomputed",
+                "earth_ray_amount",
+                "element_block_size",
+                "seed",
+            ],
+            ["earth_visibility_directions", "earth_visibility"],
+            partial(_earth_visibility_stage, pool=pool),
+        ),
+        pipeline.Stage(
+            "earth",
+            [
+                "mesh",
+                "mesh_hash",
+                "ray_backend",
+                "division_earth_directions",
+                "division_sun_directions",
+                "earth_visibility_directions",
+                "earth_visibility",
+                "earth_ray_amount",
+                "element_block_size",
+                "seed",
+                "earth_interpolation_tolerance",
+                "earth_interpolation_anchors",
+            ],
+            [
+                "earth_ir_view_factors",
+                "earth_albedo_view_factors",
+                "earth_interpolation_errors",
+            ],
+            partial(_earth_stage, pool=pool, cache=cache, checkpoint=checkpoint),
+            cached=False,
+        ),
+    ]
+
+    with pool:
+        outputs = pipeline.Pipeline(stages, cache).run(
+            stage_inputs, fingerprints={"mesh": mesh_hash}
         )
-        division_number += 1
-        if division_number == orbit_divisions:
-            break
-        print(f"{(division_number*100)/orbit_divisions:>5.1f}%")
-    print(f"{100:>5.1f}%")
-    print(f"Orbit was divided into {division_number} points")
-    print("Writing output files")
 
+    print("Writing output files")
+    if outputs["element_ray_tolerance"] is not None:
+        _report_element_element_errors(
+            outputs["element_element_errors"],
+            os.path.join(
+                os.path.dirname(view_factors_file_path), ELEMENT_ERRORS_FILE_NAME
+            ),
+        )
+    if outputs["earth_interpolation_tolerance"] is not None:
+        _report_earth_interpolation_errors(
+            outputs["earth_interpolation_errors"],
+            os.path.join(
+                os.path.dirname(view_factors_file_path), EARTH_ERRORS_FILE_NAME
+            ),
+        )
+    division_secs = outputs["division_secs"]
     properties.dump(properties_file_path)
     serializer.serialize_view_factors(
         view_factors_file_path,
-        element_earth_ir_view_factors,
-        element_earth_albedo_view_factors,
-        element_sun_view_factors,
-        element_element_ir_view_factors,
+        list(zip(outputs["earth_ir_view_factors"], division_secs)),
+        list(zip(outputs["earth_albedo_view_factors"], division_secs)),
+        list(zip(outputs["sun_view_factors"], division_secs)),
+        outputs["element_element_view_factors"],
     )
+    if element_view_factors_streaming:
+        os.remove(rows_file_path)
+    if checkpoint is not None:
+        checkpoint.remove()
     print("Done")
 
 
@@ -149,7 +751,9 @@ def show_help(argv):
     Receives the argv list and prints a help message.
     """
     print("Use:")
-    print(f"  python3 {argv[0]} process <files_directory_path>")
+    print(
+        f"  python3 {argv[0]} process <files_directory_path> [--workers N] [--backend NAME] [--resume]"
+    )
     print(f"  Requires: mesh, properties, ReportFile and EclipseLocator files")
     print(f"  python3 {argv[0]} viewm <files_directory_path>")
     print(f"  Requires: mesh and properties files")
@@ -0,0 +1,191 @@
+import numpy as np
+
+CLUSTER_SIZE = 16
+# Minimum distance of a vertex to the emitter plane to be considered in front of
+# it, relative to the mesh bounding box diagonal.
+PLANE_TOLERANCE = 1e-6
+PAIRS_CHUNK_SIZE = 2**18
+
+
+def element_clusters(mesh, cluster_size=CLUSTER_SIZE):
+    """
+    Receives a trimesh mesh object and the maximum amount of elements per cluster.
+    Splits the elements recursively by the median of their centroids along the
+    longest axis and returns a list with the element ids of each cluster and an
+    array (C, 2, 3) with the minimum and maximum corners of their bounding boxes.
+    """
+    centers = mesh.triangles_center
+    triangles = mesh.triangles
+    pending = [np.arange(len(centers))]
+    clusters = []
+    while pending:
+        element_ids = pending.pop()
+        if len(element_ids) <= cluster_size:
+            clusters.append(element_ids)
+            continue
+        axis = np.argmax(np.ptp(centers[element_ids], axis=0))
+        element_ids = element_ids[np.argsort(centers[element_ids, axis], kind="stable")]
+        half = len(element_ids) // 2
+        pending += [element_ids[half:], element_ids[:half]]
+
+    bounds = np.array(
+        [
+            [np.min(triangles[cluster], axis=(0, 1)), np.max(triangles[cluster], axis=(0, 1))]
+            for cluster in clusters
+        ]
+    ).reshape((-1, 2, 3))
+    return clusters, bounds
+
+
+def _signed_distances_bounds(bounds, plane_points, plane_normals):
+    """
+    Receives an array (C, 2, 3) of bounding boxes and E planes, and returns the
+    minimum and maximum signed distances (E, C) of the boxes to the planes.
+    """
+    box_centers = bounds.mean(axis=1)
+    box_half_extents = (bounds[:, 1] - bounds[:, 0]) / 2
+    center_distances = box_centers @ plane_normals.T - np.einsum(
+        "ek,ek->e", plane_points, plane_normals
+    )
+    radii = box_half_extents @ np.abs(plane_normals).T
+    return (center_distances - radii).T, (center_distances + radii).T
+
+
+def _candidate_pairs(candidates, cluster_elements):
+    """
+    Receives the candidate clusters (E, C) of some emitters and the element ids of
+    each cluster. Returns the emitter (sorted) and element of every candidate pair.
+    """
+    cluster_sizes = np.array([len(cluster) for cluster in cluster_elements])
+    cluster_offsets = np.concatenate(([0], np.cumsum(cluster_sizes)[:-1]))
+    pair_emitters, pair_clusters = np.nonzero(candidates)
+    pair_sizes = cluster_sizes[pair_clusters]
+    pair_starts = np.repeat(cluster_offsets[pair_clusters] - np.cumsum(pair_sizes) + pair_sizes, pair_sizes)
+    element_positions = pair_starts + np.arange(pair_starts.size)
+    return (
+        np.repeat(pair_emitters, pair_sizes),
+        np.concatenate(cluster_elements)[element_positions],
+    )
+
+
+def _candidate_clusters(mesh, emitter_ids, two_sides_emission, cluster_bounds):
+    """
+    Receives a trimesh mesh object, the ids of some emitting elements, whether each
+    one emits from both sides and the bounding boxes of the element clusters.
+    Returns a mask (E, C) of the clusters whose box reaches an emitting side of the
+    plane of each emitter.
+    """
+    tolerance = PLANE_TOLERANCE * mesh.scale
+    min_distances, max_distances = _signed_distances_bounds(
+        cluster_bounds, mesh.triangles_center[emitter_ids], mesh.face_normals[emitter_ids]
+    )
+    return (max_distances > tolerance) | (
+        (min_distances < -tolerance) & two_sides_emission[:, np.newaxis]
+    )
+
+
+def front_pairs(mesh, emitter_ids, two_sides_emission, clusters):
+    """
+    Receives a trimesh mesh object, the ids of some emitting elements, whether each
+    one emits from both sides and the element clusters of the mesh.
+    Returns the position of the emitter (sorted) and the element of every pair whose
+    element lies entirely on an emitting side of the emitter plane, found by testing
+    the cluster boxes first.
+    """
+    cluster_elements, cluster_bounds = clusters
+    tolerance = PLANE_TOLERANCE * mesh.scale
+    emitter_centers = mesh.triangles_center[emitter_ids]
+    emitter_normals = mesh.face_normals[emitter_ids]
+    candidates = _candidate_clusters(mesh, emitter_ids, two_sides_emission, cluster_bounds)
+    pair_emitters, pair_elements = _candidate_pairs(candidates, cluster_elements)
+
+    in_front = np.zeros(len(pair_emitters), dtype=bool)
+    for chunk_start in range(0, len(pair_emitters), PAIRS_CHUNK_SIZE):
+        chunk = slice(chunk_start, chunk_start + PAIRS_CHUNK_SIZE)
+        emitters = pair_emitters[chunk]
+        vertex_distances = np.einsum(
+            "pvk,pk->pv",
+            mesh.triangles[pair_elements[chunk]] - emitter_centers[emitters, np.newaxis],
+            emitter_normals[emitters],
+        )
+        in_front[chunk] = np.all(vertex_distances > tolerance, axis=1) | (
+            np.all(vertex_distances < -tolerance, axis=1) & two_sides_emission[emitters]
+        )
+    return pair_emitters[in_front], pair_elements[in_front]
+
+
+def potentially_visible_bounds(mesh, emitter_ids, two_sides_emission, clusters):
+    """
+    Receives a trimesh mesh object, the ids of some emitting elements, whether each
+    one emits from both sides and the element clusters of the mesh.
+    Returns an array (E, 2, 3) with the bounding box of the elements each emitter
+    may see, those with a vertex strictly on an emitting side of its plane, found
+    by testing the cluster boxes first. Emitters that see nothing get an empty box
+    (infinite minimum and negative infinite maximum).
+    """
+    cluster_elements, cluster_bounds = clusters
+    triangles = mesh.triangles
+    tolerance = PLANE_TOLERANCE * mesh.scale
+    emitter_centers = mesh.triangles_center[emitter_ids]
+    emitter_normals = mesh.face_normals[emitter_ids]
+
+    visible_bounds = np.empty((len(emitter_ids), 2, 3))
+    visible_bounds[:, 0] = np.inf
+    visible_bounds[:, 1] = -np.inf
+    candidates = _candidate_clusters(mesh, emitter_ids, two_sides_emission, cluster_bounds)
+    pair_emitters, pair_elements = _candidate_pairs(candidates, cluster_elements)
+
+    for chunk_start in range(0, len(pair_emitters), PAIRS_CHUNK_SIZE):
+        chunk = slice(chunk_start, chunk_start + PAIRS_CHUNK_SIZE)
+        emitters = pair_emitters[chunk]
+        elements_triangles = triangles[pair_elements[chunk]]
+        vertex_distances = np.einsum(
+            "pvk,pk->pv",
+            elements_triangles - emitter_centers[emitters, np.newaxis],
+            emitter_normals[emitters],
+        )
+        visible = np.any(vertex_distances > tolerance, axis=1) | (
+            np.any(vertex_distances < -tolerance, axis=1)
+            & two_sides_emission[emitters]
+        )
+        emitters = emitters[visible]
+        if emitters.size == 0:
+            continue
+        elements_triangles = elements_triangles[visible]
+        emitters_starts = np.flatnonzero(np.diff(emitters, prepend=-1))
+        emitters = emitters[emitters_starts]
+        visible_bounds[emitters, 0] = np.minimum(
+            visible_bounds[emitters, 0],
+            np.minimum.reduceat(np.min(elements_triangles, axis=1), emitters_starts),
+        )
+        visible_bounds[emitters, 1] = np.maximum(
+            visible_bounds[emitters, 1],
+            np.maximum.reduceat(np.max(elements_triangles, axis=1), emitters_starts),
+        )
+
+    visible_bounds[:, 0] -= tolerance
+    visible_bounds[:, 1] += tolerance
+    return visible_bounds
+
+
+def sees_something(visible_bounds):
+    """
+    Receives the potentially visible bounding boxes of some emitters and returns a
+    mask of the emitters whose box is not empty.
+    """
+    return np.all(visible_bounds[:, 0] <= visible_bounds[:, 1], axis=1)
+
+
+def rays_hit_bounds(ray_origins, ray_directions, bounds):
+    """
+    Receives the origins and directions of some rays and an array (R, 2, 3) with a
+    bounding box for each ray. Returns a mask of the rays that hit their box
+    (slab test), empty boxes are never hit.
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        inverse_directions = 1 / ray_directions
+        near_distances = (bounds[:, 0] - ray_origins) * inverse_directions
+        far_distances = (bounds[:, 1] - ray_origins) * inverse_directions
+    entry_distances = np.nanmax(np.minimum(near_distances, far_distances), axis=1)
+    exit_distances = np.nanmin(np.maximum(near_distances, far_distances), axis=1)
+    return (exit_distances >= np.maximum(entry_distances, 0)) & sees_something(bounds)
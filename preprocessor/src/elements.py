@@ -29,6 +29,37 @@ def random_points_in_element(element, amount):
     Receives an element and an amount.
     Returns an array of size "amount" of points inside the received element. 
     """
-    random_weights = np.random.rand(amount, 3)
-    random_weights /= np.sum(random_weights, axis=1).reshape(-1, 1)
-    return (random_weights[:, np.newaxis] @ element).reshape((amount, 3))
+    return random_points_in_elements(element[np.newaxis], amount)
+
+
+def random_points_in_elements(elements, amount, rng=np.random):
+    """
+    Receives an array of elements (N, 3, 3), an amount and optionally the
+    random generator to draw from.
+    Returns an array of size N * "amount" of points uniformly distributed where
+    the first "amount" points are inside the first element, the following ones
+    inside the second element and so on.
+    """
+    return unit_square_to_elements(elements, rng.random((len(elements), amount, 2)))
+
+
+def unit_square_to_elements(elements, samples):
+    """
+    Receives an array of elements (N, 3, 3) and an array (N, amount, 2) of
+    samples of the unit square.
+    Maps the samples uniformly onto the elements by folding the square over its
+    diagonal and returns an array of size N * amount of points, grouped by element.
+    """
+    u = samples[:, :, 0]
+    v = samples[:, :, 1]
+    folded = u + v > 1
+    u = np.where(folded, 1 - u, u)
+    v = np.where(folded, 1 - v, v)
+    edge1 = elements[:, 1] - elements[:, 0]
+    edge2 = elements[:, 2] - elements[:, 0]
+    points = (
+        elements[:, np.newaxis, 0]
+        + u[:, :, np.newaxis] * edge1[:, np.newaxis]
+        + v[:, :, np.newaxis] * edge2[:, np.newaxis]
+    )
+    return points.reshape((-1, 3))
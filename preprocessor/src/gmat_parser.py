@@ -211,10 +211,11 @@ def parse_eclipse_locator(eclipse_locator_filename, parameters):
         return eclipse_start_and_finish, period
 
 
-def parse_gmat(report_filename, eclipse_filename) -> GMATParameters:
+def parse_gmat(report_filename, eclipse_filename, all_orbits=False) -> GMATParameters:
     """
     Receives a report file and an eclipse locator file and returns a
     GMATParameters object.
+    Only the steps of the first orbit are kept unless all_orbits is true.
     """
     parameters = parse_report_file(report_filename)
 
@@ -222,11 +223,12 @@ def parse_gmat(report_filename, eclipse_filename) -> GMATParameters:
         eclipse_filename, parameters
     )
 
-    n_steps = 0
+    n_steps = len(parameters["ElapsedSecs"])
 
-    for elapsed_time in parameters["ElapsedSecs"]:
-        if float(elapsed_time) < float(period):
-            n_steps += 1
+    if not all_orbits:
+        n_steps = np.count_nonzero(
+            np.array(parameters["ElapsedSecs"], dtype=float) < float(period)
+        )
 
     altitude: float = float(parameters["Sat.Altitude"])
     beta_angle: float = float(parameters["BetaAngle"])
@@ -1,15 +1,15 @@
-import trimesh
-from . import vector_math
+import numpy as np
+from . import attitude
 
 def look_at(mesh, direction):
     """
     Receives a mesh and a direction in space and rotates the mesh
     so that mesh local z+ matches direction.
+    The process command doesn't rotate the mesh, it rotates the sun and earth
+    directions into the mesh frame instead (see attitude).
     """
-    _, phi, theta = vector_math.spherical_cordinates(direction)
-    rot_matrix = trimesh.transformations.rotation_matrix(theta, [1, 0, 0])
-    mesh.apply_transform(rot_matrix)
-    rot_matrix = trimesh.transformations.rotation_matrix(phi, [0, 0, 1])
+    rot_matrix = np.eye(4)
+    rot_matrix[:3, :3] = attitude.look_at_rotation(direction)
     mesh.apply_transform(rot_matrix)
 
 def element_amount(mesh):
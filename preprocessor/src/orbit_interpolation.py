@@ -0,0 +1,116 @@
+import numpy as np
+
+DEFAULT_ANCHORS_AMOUNT = 5
+
+
+def _step_angles(directions):
+    cosines = np.einsum("ij,ij->i", directions[1:], directions[:-1])
+    return np.arccos(np.clip(cosines, -1, 1))
+
+
+def division_angles(earth_directions, sun_directions):
+    """
+    Receives the directions towards the earth and the sun (D, 3) of each orbit
+    division in the mesh frame and returns the angle (D,) swept by them from
+    the first division, the parameter over which view factors are interpolated.
+    """
+    return np.concatenate(
+        ([0], np.cumsum(_step_angles(earth_directions) + _step_angles(sun_directions)))
+    )
+
+
+def _interpolated(angles, start, stop, start_values, stop_values, divisions):
+    """
+    Receives the angles of the divisions, an interval [start, stop] of divisions,
+    the values at both ends and some divisions inside it. Returns the values
+    linearly interpolated at those divisions.
+    """
+    span = angles[stop] - angles[start]
+    weights = (angles[divisions] - angles[start]) / span if span > 0 else 0.5
+    weights = np.reshape(weights, (-1, 1))
+    return (1 - weights) * start_values + weights * stop_values
+
+
+def interpolated_divisions(
+    angles, compute_divisions, tolerance, anchors_amount=DEFAULT_ANCHORS_AMOUNT
+):
+    """
+    Receives the angles of the orbit divisions (see division_angles), a function
+    that receives a list of division numbers and returns a list with the view
+    factors of each one (a tuple of (N,) arrays), the interpolation tolerance
+    and the amount of anchor divisions computed first (evenly spaced, the first
+    and last divisions included).
+    Each interval between computed divisions is checked by computing its middle
+    division: if it differs from the interpolation of the interval ends by more
+    than tolerance for any element, both halves are refined, otherwise the
+    divisions inside the interval are interpolated. The middle divisions of
+    every interval being checked are computed together.
+    Returns a list of arrays (D, N), one per view factor kind, the error estimate
+    (D, N) of each element at each division (the middle difference of its
+    interval, zero for computed divisions) and the computed division numbers.
+    """
+    divisions_amount = len(angles)
+    anchors = np.unique(
+        np.linspace(0, divisions_amount - 1, max(2, anchors_amount)).round()
+    ).astype(int)
+    computed = {}
+
+    def compute(division_numbers):
+        for division_number, values in zip(
+            division_numbers, compute_divisions(division_numbers)
+        ):
+            computed[division_number] = tuple(values)
+
+    compute(list(anchors))
+    pending = [(start, stop) for start, stop in zip(anchors[:-1], anchors[1:])]
+    accepted = []
+    while pending:
+        pending = [(start, stop) for start, stop in pending if stop - start > 1]
+        middles = [(start + stop) // 2 for start, stop in pending]
+        compute(middles)
+        refined = []
+        for (start, stop), middle in zip(pending, middles):
+            errors = np.max(
+                [
+                    np.abs(
+                        middle_values
+                        - _interpolated(
+                            angles, start, stop, start_values, stop_values, middle
+                        )[0]
+                    )
+                    for start_values, stop_values, middle_values in zip(
+                        computed[start], computed[stop], computed[middle]
+                    )
+                ],
+                axis=0,
+            )
+            if np.max(errors) > tolerance:
+                refined += [(start, middle), (middle, stop)]
+            else:
+                accepted += [(start, middle, errors), (middle, stop, errors)]
+        pending = refined
+
+    kinds_amount = len(computed[anchors[0]])
+    element_amount = len(computed[anchors[0]][0])
+    view_factors = [
+        np.zeros((divisions_amount, element_amount)) for _ in range(kinds_amount)
+    ]
+    errors = np.zeros((divisions_amount, element_amount))
+    for division_number, values in computed.items():
+        for kind, kind_values in enumerate(values):
+            view_factors[kind][division_number] = kind_values
+    for start, stop, interval_errors in accepted:
+        inner_divisions = np.arange(start + 1, stop)
+        if inner_divisions.size == 0:
+            continue
+        for kind in range(kinds_amount):
+            view_factors[kind][inner_divisions] = _interpolated(
+                angles,
+                start,
+                stop,
+                computed[start][kind],
+                computed[stop][kind],
+                inner_divisions,
+            )
+        errors[inner_divisions] = interval_errors
+    return view_factors, errors, sorted(computed)
@@ -0,0 +1,143 @@
+import os
+import pickle
+import shutil
+import tempfile
+import numpy as np
+import trimesh
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from . import ray_backends
+
+_worker_mesh = None
+_worker_ray_backend = None
+_worker_arguments_path = None
+_worker_arguments = None
+
+
+def _initialize_worker(vertices, faces, ray_backend_name):
+    """
+    Receives the mesh vertices and faces and the name of the ray backend and
+    builds the worker process read-only copy of the mesh and its ray backend.
+    """
+    global _worker_mesh, _worker_ray_backend
+    _worker_mesh = trimesh.Trimesh(vertices=vertices, faces=faces, process=False)
+    _worker_ray_backend = ray_backends.create_ray_backend(
+        _worker_mesh, ray_backend_name
+    )
+
+
+def _load_worker_arguments(arguments_path):
+    """
+    Receives the path of the shared arguments of a map and returns them, loading
+    them only on the first task of the map that the worker runs.
+    """
+    global _worker_arguments_path, _worker_arguments
+    if _worker_arguments_path != arguments_path:
+        with open(arguments_path, "rb") as arguments_file:
+            _worker_arguments = pickle.load(arguments_file)
+        _worker_arguments_path = arguments_path
+    return _worker_arguments
+
+
+def _run_worker_task(function, arguments_path, task):
+    arguments = _load_worker_arguments(arguments_path)
+    return function(_worker_mesh, _worker_ray_backend, *task, **arguments)
+
+
+class WorkerPool:
+    """
+    Implements a pool of worker processes that share a read-only copy of a mesh
+    and its ray backend (see ray_backends, the default one if no name is given).
+    The mesh and its backend are built once per worker, not once per task, and
+    reused by every view factor computed with the pool. The keyword arguments
+    shared by the tasks of a map are sent to each worker once per map, through
+    a file in a temporary directory of the pool, so tasks only carry their own
+    arguments. With a single worker tasks are run in the current process over
+    the original mesh.
+    """
+
+    def __init__(self, mesh, workers=1, ray_backend=None):
+        self.mesh = mesh
+        self.workers = max(1, workers)
+        self.ray_backend_name = ray_backend or ray_backends.default_ray_backend()
+        if self.ray_backend_name not in ray_backends.RAY_BACKENDS:
+            raise ValueError(f"Unknown ray backend {self.ray_backend_name}")
+        self._ray_backend = None
+        self.executor = None
+        self.arguments_directory = None
+        self.maps_amount = 0
+        if self.workers > 1:
+            self.arguments_directory = tempfile.mkdtemp(prefix="worker_pool_")
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_initialize_worker,
+                initargs=(
+                    np.asarray(mesh.vertices),
+                    np.asarray(mesh.faces),
+                    self.ray_backend_name,
+                ),
+            )
+
+    @property
+    def ray_backend(self):
+        """
+        Returns the ray backend of the mesh in the current process, built the
+        first time it is needed.
+        """
+        if self._ray_backend is None:
+            self._ray_backend = ray_backends.create_ray_backend(
+                self.mesh, self.ray_backend_name
+            )
+        return self._ray_backend
+
+    def map(self, function, tasks, **arguments):
+        """
+        Receives a function, a list of tasks (tuples of positional arguments) and
+        keyword arguments shared by every task.
+        Calls function(mesh, ray_backend, *task, **arguments) for each task and
+        yields the results in the same order as the tasks.
+        """
+        if self.executor is None:
+            for task in tasks:
+                yield function(self.mesh, self.ray_backend, *task, **arguments)
+            return
+        self.maps_amount += 1
+        arguments_path = os.path.join(
+            self.arguments_directory, f"arguments_{self.maps_amount}.pickle"
+        )
+        with open(arguments_path, "wb") as arguments_file:
+            pickle.dump(arguments, arguments_file, protocol=pickle.HIGHEST_PROTOCOL)
+        try:
+            yield from self.executor.map(
+                partial(_run_worker_task, function, arguments_path), tasks
+            )
+        finally:
+            os.remove(arguments_path)
+
+    def close(self):
+        """
+        Shuts down the worker processes and removes their shared arguments.
+        """
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+        if self.arguments_directory is not None:
+            shutil.rmtree(self.arguments_directory, ignore_errors=True)
+            self.arguments_directory = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+
+def blocks(amount, block_size):
+    """
+    Receives an amount of rows and a block size and returns a list of
+    (block_start, block_stop) tuples that cover every row.
+    """
+    return [
+        (block_start, min(block_start + block_size, amount))
+        for block_start in range(0, amount, block_size)
+    ]
@@ -0,0 +1,69 @@
+from .view_factors_cache import fingerprint
+
+
+class Stage:
+    """
+    Implements a pipeline stage: a named computation with declared inputs and
+    outputs. The compute function receives the inputs as keyword arguments and
+    returns a list with one value per output.
+    """
+
+    def __init__(self, name, inputs, outputs, compute, cached=True):
+        self.name = name
+        self.inputs = inputs
+        self.outputs = outputs
+        self.compute = compute
+        self.cached = cached
+
+
+class Pipeline:
+    """
+    Implements a sequence of stages. Each stage fingerprint is the hash of its
+    name and the fingerprints of its inputs, and the outputs of cached stages are
+    stored under it, so a stage is only recomputed when one of its inputs changed.
+    """
+
+    def __init__(self, stages, cache=None):
+        """
+        Receives the list of stages, in execution order, and optionally the
+        view factors cache where stage outputs are stored.
+        """
+        self.stages = stages
+        self.cache = cache
+
+    def _stage_outputs(self, stage, stage_fingerprint, values):
+        if self.cache is not None and stage.cached:
+            outputs = self.cache.load(stage_fingerprint)
+            if outputs is not None:
+                print(f"Reusing cached {stage.name} stage")
+                return outputs
+        outputs = stage.compute(**{name: values[name] for name in stage.inputs})
+        if self.cache is not None and stage.cached:
+            self.cache.store(stage_fingerprint, outputs)
+        return outputs
+
+    def run(self, values, fingerprints=None):
+        """
+        Receives a dictionary with the pipeline input values and optionally a
+        dictionary with precomputed fingerprints of some of them (i.e. of values
+        that can't be hashed directly, like meshes).
+        Runs every stage and returns a dictionary with the inputs and the
+        outputs of every stage.
+        """
+        values = dict(values)
+        fingerprints = dict(fingerprints or {})
+        for stage in self.stages:
+            input_fingerprints = []
+            for name in stage.inputs:
+                if name not in fingerprints:
+                    fingerprints[name] = fingerprint(values[name])
+                input_fingerprints.append(fingerprints[name])
+            stage_fingerprint = fingerprint(
+                "stage", stage.name, stage.outputs, input_fingerprints
+            )
+
+            outputs = self._stage_outputs(stage, stage_fingerprint, values)
+            for name, value in zip(stage.outputs, outputs):
+                values[name] = value
+                fingerprints[name] = fingerprint(stage_fingerprint, name)
+        return values
@@ -13,6 +13,7 @@ class PropertiesAtlas:
         self.materials = []
         self.material_by_element = np.full(elements_amount, -1)
         self.absortance_ir_by_element = np.zeros(elements_amount)
+        self.diffuse_fraction_by_element = np.zeros(elements_amount)
 
         material_json_props = properties_json["materials"]["properties"]
         material_json_elements = properties_json["materials"]["elements"]
@@ -20,14 +21,40 @@ class PropertiesAtlas:
             material_idx = len(self.materials)
             self.materials.append(material_json_props[material_name])
             self.materials[-1]["name"] = material_name
+            diffuse_fraction = self._material_diffuse_fraction(self.materials[-1])
             for element_id in material_elements:
                 self.material_by_element[element_id] = material_idx
                 self.absortance_ir_by_element[element_id] = self.materials[-1]["alpha_ir"]
+                self.diffuse_fraction_by_element[element_id] = diffuse_fraction
         
         for element_id, material_id in enumerate(self.material_by_element):
             if material_id < 0:
                 print(f"Warning: Element {element_id} does not have a material")
 
+    def _material_diffuse_fraction(self, material):
+        """
+        Receives the properties of a material and returns the fraction of its
+        reflections that are diffuse, given by diffuse_fraction or by the
+        complement of specular_fraction. Reflections are specular by default.
+        """
+        specular_fraction = material.get("specular_fraction", None)
+        diffuse_fraction = material.get(
+            "diffuse_fraction",
+            0 if specular_fraction is None else 1 - specular_fraction,
+        )
+        if specular_fraction is None:
+            specular_fraction = 1 - diffuse_fraction
+        if (
+            not 0 <= diffuse_fraction <= 1
+            or not 0 <= specular_fraction <= 1
+            or not np.isclose(diffuse_fraction + specular_fraction, 1)
+        ):
+            raise Exception(
+                f"Material {material['name']} diffuse and specular fractions "
+                "must be between 0 and 1 and add up to 1"
+            )
+        return diffuse_fraction
+
     def _build_condition_index(self, elements_amount, properties_json):
         self.two_sides_emission_by_element = np.zeros(elements_amount, dtype=bool)
     
@@ -64,7 +91,9 @@ class PropertiesAtlas:
             self.global_properties = self.properties_json["global_properties"]
             if orbit_report_file_path and orbit_eclipse_file_path:
                 self.orbit_properties = gmat_parser.parse_gmat(
-                    orbit_report_file_path, orbit_eclipse_file_path
+                    orbit_report_file_path,
+                    orbit_eclipse_file_path,
+                    all_orbits=self.global_properties.get("orbit_phase_folding", False),
                 )
             else:
                 self.orbit_properties = None
@@ -0,0 +1,304 @@
+import numpy as np
+import trimesh
+
+TRIMESH = "trimesh"
+EMBREE = "embree"
+OPEN3D = "open3d"
+NUMPY = "numpy"
+RAY_BACKENDS = (TRIMESH, EMBREE, OPEN3D, NUMPY)
+
+BVH_LEAF_SIZE = 8
+BVH_RAYS_CHUNK_SIZE = 2**14
+# Minimum absolute determinant of a ray-triangle intersection, rays closer to
+# parallel to a triangle than this don't hit it.
+INTERSECTION_EPSILON = 1e-12
+# Barycentric tolerance of a ray-triangle intersection, so rays that cross an
+# edge shared by two elements hit at least one of them despite rounding.
+BARYCENTRIC_EPSILON = 1e-9
+
+
+def default_ray_backend():
+    """
+    Returns the name of the backend used when none is selected: trimesh with
+    embree if it is installed, plain trimesh otherwise.
+    """
+    return EMBREE if trimesh.ray.has_embree else TRIMESH
+
+
+def create_ray_backend(mesh, name=None):
+    """
+    Receives a trimesh mesh object and optionally the name of a ray backend
+    (trimesh, embree, open3d or numpy, see default_ray_backend).
+    Builds the acceleration structure of the backend once and returns an object
+    with the intersects_id, intersects_first and intersects_any methods.
+    """
+    name = name or default_ray_backend()
+    if name == TRIMESH:
+        return TrimeshRayBackend(mesh)
+    if name == EMBREE:
+        return EmbreeRayBackend(mesh)
+    if name == OPEN3D:
+        return Open3dRayBackend(mesh)
+    if name == NUMPY:
+        return NumpyRayBackend(mesh)
+    raise ValueError(f"Unknown ray backend {name}")
+
+
+class TrimeshRayBackend:
+    """
+    Implements a ray backend over the trimesh pure python intersector.
+    Every method receives the ray origins and directions (N, 3).
+    """
+
+    def __init__(self, mesh):
+        self.intersector = trimesh.ray.ray_triangle.RayMeshIntersector(mesh)
+
+    def intersects_id(self, ray_origins, ray_directions):
+        """
+        Returns the element, the ray id and the location of the first hit of
+        every ray that hits the mesh.
+        """
+        return self.intersector.intersects_id(
+            ray_origins, ray_directions, return_locations=True, multiple_hits=False
+        )
+
+    def intersects_first(self, ray_origins, ray_directions):
+        """
+        Returns the element of the first hit of every ray, -1 if it doesn't hit.
+        """
+        return self.intersector.intersects_first(ray_origins, ray_directions)
+
+    def intersects_any(self, ray_origins, ray_directions):
+        """
+        Returns a mask of the rays that hit the mesh.
+        """
+        return self.intersector.intersects_any(ray_origins, ray_directions)
+
+
+class EmbreeRayBackend(TrimeshRayBackend):
+    """
+    Implements a ray backend over the trimesh embree intersector, which requires
+    the embreex package.
+    """
+
+    def __init__(self, mesh):
+        if not trimesh.ray.has_embree:
+            raise Exception("The embree ray backend requires the embreex package")
+        self.intersector = trimesh.ray.ray_pyembree.RayMeshIntersector(mesh)
+
+
+class Open3dRayBackend:
+    """
+    Implements a ray backend over an Open3D RaycastingScene, which requires the
+    open3d package. The scene is built once and reused by every cast, and the
+    rays of each cast are prepared in bulk as a single float32 tensor.
+    """
+
+    def __init__(self, mesh):
+        try:
+            import open3d
+        except ImportError:
+            raise Exception("The open3d ray backend requires the open3d package")
+        self.open3d = open3d
+        self.scene = open3d.t.geometry.RaycastingScene()
+        self.scene.add_triangles(
+            open3d.core.Tensor(np.asarray(mesh.vertices, dtype=np.float32)),
+            open3d.core.Tensor(np.asarray(mesh.faces, dtype=np.uint32)),
+        )
+
+    def _rays(self, ray_origins, ray_directions):
+        rays = np.empty((len(ray_origins), 6), dtype=np.float32)
+        rays[:, :3] = ray_origins
+        rays[:, 3:] = ray_directions
+        return self.open3d.core.Tensor.from_numpy(rays)
+
+    def _cast(self, ray_origins, ray_directions):
+        result = self.scene.cast_rays(self._rays(ray_origins, ray_directions))
+        element_ids = result["primitive_ids"].numpy().astype(np.int64)
+        element_ids[element_ids == self.scene.INVALID_ID] = -1
+        return result["t_hit"].numpy(), element_ids
+
+    def intersects_id(self, ray_origins, ray_directions):
+        distances, element_ids = self._cast(ray_origins, ray_directions)
+        hit_ray_ids = np.flatnonzero(element_ids >= 0)
+        hit_points = (
+            ray_origins[hit_ray_ids]
+            + distances[hit_ray_ids, np.newaxis] * ray_directions[hit_ray_ids]
+        )
+        return element_ids[hit_ray_ids], hit_ray_ids, hit_points
+
+    def intersects_first(self, ray_origins, ray_directions):
+        return self._cast(ray_origins, ray_directions)[1]
+
+    def intersects_any(self, ray_origins, ray_directions):
+        occluded = self.scene.test_occlusions(self._rays(ray_origins, ray_directions))
+        return occluded.numpy().astype(bool)
+
+
+class NumpyRayBackend:
+    """
+    Implements a ray backend over a bounding volume hierarchy written with numpy,
+    used when no compiled engine is available. Rays are traversed together
+    level by level as (ray, node) pairs.
+    """
+
+    def __init__(self, mesh):
+        triangles = np.asarray(mesh.triangles, dtype=float)
+        self.vertices_0 = triangles[:, 0]
+        self.edges_1 = triangles[:, 1] - triangles[:, 0]
+        self.edges_2 = triangles[:, 2] - triangles[:, 0]
+        self._build(triangles)
+
+    def _build(self, triangles):
+        """
+        Splits the elements recursively by the median of their centroids along
+        the longest axis until leaves have at most BVH_LEAF_SIZE elements.
+        """
+        centers = triangles.mean(axis=1)
+        element_ids = []
+        bounds = []
+        children = []
+        leaf_ranges = []
+        pending = [(np.arange(len(triangles)), -1, 0)]
+        while pending:
+            node_elements, parent, side = pending.pop()
+            node = len(bounds)
+            if parent >= 0:
+                children[parent][side] = node
+            node_triangles = triangles[node_elements]
+            bounds.append(
+                [node_triangles.min(axis=(0, 1)), node_triangles.max(axis=(0, 1))]
+            )
+            children.append([-1, -1])
+            if len(node_elements) <= BVH_LEAF_SIZE:
+                leaf_ranges.append(
+                    [len(element_ids), len(element_ids) + len(node_elements)]
+                )
+                element_ids += list(node_elements)
+                continue
+            leaf_ranges.append([0, 0])
+            axis = np.argmax(np.ptp(centers[node_elements], axis=0))
+            node_elements = node_elements[
+                np.argsort(centers[node_elements, axis], kind="stable")
+            ]
+            half = len(node_elements) // 2
+            pending += [(node_elements[half:], node, 1), (node_elements[:half], node, 0)]
+
+        self.element_ids = np.array(element_ids, dtype=int)
+        self.bounds = np.array(bounds).reshape((-1, 2, 3))
+        self.children = np.array(children, dtype=int).reshape((-1, 2))
+        self.leaf_ranges = np.array(leaf_ranges, dtype=int).reshape((-1, 2))
+
+    def _box_entries(self, ray_origins, inverse_directions, nodes):
+        """
+        Returns the distance at which each ray enters the box of its node, infinite
+        if it misses it.
+        """
+        with np.errstate(invalid="ignore"):
+            near_distances = (self.bounds[nodes, 0] - ray_origins) * inverse_directions
+            far_distances = (self.bounds[nodes, 1] - ray_origins) * inverse_directions
+        entries = np.nanmax(np.minimum(near_distances, far_distances), axis=1)
+        exits = np.nanmin(np.maximum(near_distances, far_distances), axis=1)
+        return np.where(exits >= np.maximum(entries, 0), entries, np.inf)
+
+    def _triangle_distances(self, ray_origins, ray_directions, element_ids):
+        """
+        Returns the distance at which each ray hits its element (Moller-Trumbore),
+        infinite if it misses it. Edges are widened by BARYCENTRIC_EPSILON so the
+        mesh stays watertight.
+        """
+        edges_1 = self.edges_1[element_ids]
+        edges_2 = self.edges_2[element_ids]
+        p = np.cross(ray_directions, edges_2)
+        determinants = np.einsum("ij,ij->i", edges_1, p)
+        valid = np.abs(determinants) > INTERSECTION_EPSILON
+        inverse_determinants = np.divide(
+            1, determinants, out=np.zeros_like(determinants), where=valid
+        )
+        t = ray_origins - self.vertices_0[element_ids]
+        u = np.einsum("ij,ij->i", t, p) * inverse_determinants
+        q = np.cross(t, edges_1)
+        v = np.einsum("ij,ij->i", ray_directions, q) * inverse_determinants
+        distances = np.einsum("ij,ij->i", edges_2, q) * inverse_determinants
+        valid &= (
+            (u >= -BARYCENTRIC_EPSILON)
+            & (v >= -BARYCENTRIC_EPSILON)
+            & (u + v <= 1 + BARYCENTRIC_EPSILON)
+            & (distances > 0)
+        )
+        return np.where(valid, distances, np.inf)
+
+    def _first_hits(self, ray_origins, ray_directions):
+        """
+        Returns the distance and the element of the first hit of every ray,
+        infinite and -1 if it doesn't hit.
+        """
+        with np.errstate(divide="ignore"):
+            inverse_directions = 1 / ray_directions
+        hit_distances = np.full(len(ray_origins), np.inf)
+        hit_element_ids = np.full(len(ray_origins), -1)
+        pair_rays = np.arange(len(ray_origins))
+        pair_nodes = np.zeros(len(ray_origins), dtype=int)
+
+        while pair_rays.size > 0:
+            entries = self._box_entries(
+                ray_origins[pair_rays], inverse_directions[pair_rays], pair_nodes
+            )
+            kept = entries < hit_distances[pair_rays]
+            pair_rays = pair_rays[kept]
+            pair_nodes = pair_nodes[kept]
+
+            leaves = self.children[pair_nodes, 0] < 0
+            leaf_rays = pair_rays[leaves]
+            leaf_starts, leaf_stops = self.leaf_ranges[pair_nodes[leaves]].T
+            leaf_sizes = leaf_stops - leaf_starts
+            element_rays = np.repeat(leaf_rays, leaf_sizes)
+            element_positions = np.repeat(
+                leaf_starts - np.cumsum(leaf_sizes) + leaf_sizes, leaf_sizes
+            ) + np.arange(element_rays.size)
+            element_ids = self.element_ids[element_positions]
+            distances = self._triangle_distances(
+                ray_origins[element_rays], ray_directions[element_rays], element_ids
+            )
+            np.minimum.at(hit_distances, element_rays, distances)
+            closest = (distances == hit_distances[element_rays]) & np.isfinite(distances)
+            hit_element_ids[element_rays[closest]] = element_ids[closest]
+
+            inner_rays = pair_rays[~leaves]
+            inner_nodes = pair_nodes[~leaves]
+            pair_rays = np.concatenate((inner_rays, inner_rays))
+            pair_nodes = np.concatenate(
+                (self.children[inner_nodes, 0], self.children[inner_nodes, 1])
+            )
+
+        return hit_distances, hit_element_ids
+
+    def _chunked_first_hits(self, ray_origins, ray_directions):
+        ray_origins = np.asarray(ray_origins, dtype=float)
+        ray_directions = np.asarray(ray_directions, dtype=float)
+        hits = [
+            self._first_hits(
+                ray_origins[chunk_start : chunk_start + BVH_RAYS_CHUNK_SIZE],
+                ray_directions[chunk_start : chunk_start + BVH_RAYS_CHUNK_SIZE],
+            )
+            for chunk_start in range(0, len(ray_origins), BVH_RAYS_CHUNK_SIZE)
+        ]
+        if not hits:
+            return np.zeros(0), np.zeros(0, dtype=int)
+        distances, element_ids = zip(*hits)
+        return np.concatenate(distances), np.concatenate(element_ids)
+
+    def intersects_id(self, ray_origins, ray_directions):
+        distances, element_ids = self._chunked_first_hits(ray_origins, ray_directions)
+        hit_ray_ids = np.flatnonzero(element_ids >= 0)
+        hit_points = (
+            ray_origins[hit_ray_ids]
+            + distances[hit_ray_ids, np.newaxis] * ray_directions[hit_ray_ids]
+        )
+        return element_ids[hit_ray_ids], hit_ray_ids, hit_points
+
+    def intersects_first(self, ray_origins, ray_directions):
+        return self._chunked_first_hits(ray_origins, ray_directions)[1]
+
+    def intersects_any(self, ray_origins, ray_directions):
+        return self.intersects_first(ray_origins, ray_directions) >= 0
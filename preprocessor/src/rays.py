@@ -1,5 +1,5 @@
 import numpy as np
-from . import vector_math
+from . import vector_math, sampling
 
 
 def aparent_element_area_multiplier(ray_directions, element_normals):
@@ -24,3 +24,38 @@ def reflected_rays(ray_directions, element_normals):
         ray_directions
         - 2 * ray_direction_element_normal_dot_product[:, np.newaxis] * element_normals
     )
+
+
+def reflection_side_normals(ray_directions, element_normals):
+    """
+    Receives an array of ray directions and element normals and returns the
+    element normals flipped, where needed, to point to the side the rays come from.
+    """
+    incoming_sides = np.where(
+        vector_math.array_array_dot(element_normals, ray_directions) > 0, -1, 1
+    )
+    return incoming_sides[:, np.newaxis] * element_normals
+
+
+def scattered_rays(ray_directions, element_normals, diffuse_fractions, rng=np.random):
+    """
+    Receives an array of ray directions, element normals, the diffuse fraction of
+    the reflection of each element and a random generator. Each ray is reflected
+    diffusely (cosine weighted around the normal, on the side the ray comes from)
+    with probability given by the diffuse fraction and specularly otherwise.
+    The lobe and the diffuse direction of every ray are sampled in a single draw.
+    Returns an array of the scattered rays.
+    """
+    scattered_directions = reflected_rays(ray_directions, element_normals)
+    if not np.any(diffuse_fractions > 0):
+        return scattered_directions
+    samples = rng.random((len(ray_directions), 3))
+    diffuse_ray_ids = np.flatnonzero(samples[:, 0] < diffuse_fractions)
+    scattered_directions[diffuse_ray_ids] = sampling.unit_square_to_hemisphere(
+        reflection_side_normals(
+            ray_directions[diffuse_ray_ids], element_normals[diffuse_ray_ids]
+        ),
+        samples[diffuse_ray_ids, np.newaxis, 1:],
+        cosine_weighted=True,
+    )
+    return scattered_directions
@@ -0,0 +1,114 @@
+import numpy as np
+from scipy import sparse
+from scipy.sparse import linalg as sparse_linalg
+
+ROW_SCALING_MAX_ITERATIONS = 200
+ROW_SCALING_TOLERANCE = 1e-10
+
+
+def emission_weights(areas, absorptance_by_element, two_sides_emission_by_element):
+    """
+    Receives the area, the absorptance and whether each element emits from both
+    sides. Returns the weight w of each element such that the element-element
+    view factors satisfy reciprocity, w_i F_ij = w_j F_ji.
+    """
+    sides = np.where(two_sides_emission_by_element, 2, 1)
+    return areas * absorptance_by_element * sides
+
+
+def reciprocity_residual(view_factors, weights):
+    """
+    Receives a view factors matrix (dense or sparse) and the emission weights.
+    Returns the relative reciprocity residual ||W F - (W F)^T|| / ||W F||.
+    """
+    exchange = sparse.diags(weights) @ sparse.csr_matrix(view_factors)
+    exchange_norm = sparse_linalg.norm(exchange)
+    if exchange_norm == 0:
+        return 0.0
+    return sparse_linalg.norm(exchange - exchange.T) / exchange_norm
+
+
+def row_sums_residual(view_factors, row_sums):
+    """
+    Receives a view factors matrix (dense or sparse) and the expected sum of
+    each row. Returns the maximum absolute deviation of the row sums.
+    """
+    actual_row_sums = np.asarray(view_factors.sum(axis=1)).ravel()
+    return np.max(np.abs(actual_row_sums - row_sums), initial=0)
+
+
+def _symmetric_row_scaling(exchange, expected_row_sums):
+    """
+    Receives a symmetric non negative CSR matrix and the expected row sums.
+    Returns the vector d such that diag(d) E diag(d) has the expected row sums.
+    """
+    scaling = (expected_row_sums > 0).astype(float)
+    for _ in range(ROW_SCALING_MAX_ITERATIONS):
+        exchange_scaling = exchange @ scaling
+        if np.all(
+            np.abs(scaling * exchange_scaling - expected_row_sums)
+            <= ROW_SCALING_TOLERANCE * expected_row_sums
+        ):
+            break
+        np.divide(
+            scaling * expected_row_sums,
+            exchange_scaling,
+            out=scaling,
+            where=exchange_scaling > 0,
+        )
+        np.sqrt(scaling, out=scaling)
+    return scaling
+
+
+def enforce_reciprocity(view_factors, weights, row_sums=None):
+    """
+    Receives a view factors matrix (dense or sparse), the emission weights of the
+    elements and optionally the expected sum of each row (the original row sums
+    by default).
+    Replaces the exchange matrix W F by its closest symmetric matrix in the least
+    squares sense, (W F + (W F)^T) / 2, and then scales it symmetrically so that
+    the rows sum what they are expected to. Elements with zero weight (that don't
+    absorb, so nobody sees them) or with zero expected row sum (that see nothing,
+    so their exchange can't be balanced) are left unbalanced: their rows and the
+    view factors of other elements towards them are left as they are.
+    Returns the consistent view factors, with the same type as the received ones,
+    and a dictionary with the reciprocity and row sums residuals before and after
+    and the amount of unbalanced elements that emit.
+    """
+    original_view_factors = sparse.csr_matrix(view_factors, dtype=float)
+    if row_sums is None:
+        row_sums = np.asarray(original_view_factors.sum(axis=1)).ravel()
+    emitters = weights > 0
+    balanced = emitters & (row_sums > 0)
+    inverse_weights = np.divide(1, weights, out=np.zeros(len(weights)), where=balanced)
+    balanced_diagonal = sparse.diags(balanced.astype(float))
+
+    balanced_view_factors = (
+        balanced_diagonal @ original_view_factors @ balanced_diagonal
+    )
+    kept_view_factors = original_view_factors - balanced_view_factors
+    kept_row_sums = np.asarray(kept_view_factors.sum(axis=1)).ravel()
+
+    exchange = sparse.diags(weights * balanced) @ balanced_view_factors
+    exchange = ((exchange + exchange.T) / 2).tocsr()
+    expected_exchange_sums = (
+        weights * np.maximum(row_sums - kept_row_sums, 0) * balanced
+    )
+    scaling = _symmetric_row_scaling(exchange, expected_exchange_sums)
+    consistent_view_factors = (
+        sparse.diags(inverse_weights * scaling) @ exchange @ sparse.diags(scaling)
+        + kept_view_factors
+    ).tocsr()
+    consistent_view_factors.eliminate_zeros()
+
+    residuals = {
+        "reciprocity_before": reciprocity_residual(original_view_factors, weights),
+        "reciprocity_after": reciprocity_residual(consistent_view_factors, weights),
+        "row_sums_before": row_sums_residual(original_view_factors, row_sums),
+        "row_sums_after": row_sums_residual(consistent_view_factors, row_sums),
+        "unbalanced_emitters": int(np.sum(emitters & ~balanced)),
+    }
+
+    if not sparse.issparse(view_factors):
+        consistent_view_factors = consistent_view_factors.toarray()
+    return consistent_view_factors, residuals
@@ -0,0 +1,168 @@
+import warnings
+import numpy as np
+from scipy.stats import qmc
+from . import vector_math, elements
+
+RANDOM = "random"
+STRATIFIED = "stratified"
+SOBOL = "sobol"
+HALTON = "halton"
+SAMPLING_METHODS = (RANDOM, STRATIFIED, SOBOL, HALTON)
+
+# Dimensions of an emission sample: two for the point in the element and
+# two for the direction in the hemisphere.
+_EMISSION_DIMENSIONS = 4
+
+
+def _stratified_unit_square(elements_amount, amount, rng):
+    """
+    Returns an (elements_amount, amount, 2) array of jittered stratified samples
+    of the unit square: floor(sqrt(amount))^2 samples of each element lie one in
+    each cell of a regular grid and the remaining ones are uniform. Samples are
+    shuffled per element so that independent sets can be paired.
+    """
+    grid_size = int(np.sqrt(amount))
+    cells = np.arange(grid_size**2)
+    grid_origins = np.column_stack((cells // grid_size, cells % grid_size)) / grid_size
+    samples = rng.random((elements_amount, amount, 2))
+    samples[:, : grid_size**2] = (
+        grid_origins + samples[:, : grid_size**2] / grid_size
+    )
+    order = np.argsort(rng.random((elements_amount, amount)), axis=1)
+    return np.take_along_axis(samples, order[:, :, np.newaxis], axis=1)
+
+
+def _low_discrepancy_sequence(method, amount):
+    """
+    Returns the first amount points of the unscrambled Sobol or Halton sequence
+    in the emission dimensions.
+    """
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", UserWarning)
+        if method == SOBOL:
+            return qmc.Sobol(_EMISSION_DIMENSIONS, scramble=False).random(amount)
+        return qmc.Halton(_EMISSION_DIMENSIONS, scramble=False).random(amount)
+
+
+def unit_hypercube_samples(elements_amount, amount, method, rng=np.random):
+    """
+    Receives an amount of elements, an amount of samples per element, the sampling
+    method and optionally the random generator.
+    Returns an (elements_amount, amount, 4) array of samples in [0, 1). Low
+    discrepancy sequences are shared by every element and decorrelated with a
+    random Cranley-Patterson rotation per element.
+    """
+    if method == RANDOM:
+        return rng.random((elements_amount, amount, _EMISSION_DIMENSIONS))
+    if method == STRATIFIED:
+        return np.concatenate(
+            (
+                _stratified_unit_square(elements_amount, amount, rng),
+                _stratified_unit_square(elements_amount, amount, rng),
+            ),
+            axis=2,
+        )
+    if method in (SOBOL, HALTON):
+        sequence = _low_discrepancy_sequence(method, amount)
+        rotations = rng.random((elements_amount, 1, _EMISSION_DIMENSIONS))
+        return np.mod(sequence[np.newaxis] + rotations, 1)
+    raise ValueError(f"Unknown sampling method {method}")
+
+
+def _orthonormal_basis(normals):
+    """
+    Receives an array of unit normals and returns two arrays of unit tangents
+    that form an orthonormal basis with them.
+    """
+    helper = np.zeros_like(normals)
+    helper[:, 0] = 1
+    helper[np.abs(normals[:, 0]) > 0.9] = [0, 1, 0]
+    tangents = np.cross(normals, helper)
+    tangents /= np.linalg.norm(tangents, axis=1)[:, np.newaxis]
+    bitangents = np.cross(normals, tangents)
+    return tangents, bitangents
+
+
+def unit_square_to_hemisphere(normals, samples, cosine_weighted=False):
+    """
+    Receives an array of unit normals (N, 3) and an (N, amount, 2) array of unit
+    square samples, and maps them onto the hemispheres around the normals,
+    uniformly or cosine weighted (lambertian). Returns an (N * amount, 3) array
+    of unit directions.
+    """
+    if cosine_weighted:
+        cos_theta = np.sqrt(1 - samples[:, :, 0])
+    else:
+        cos_theta = 1 - samples[:, :, 0]
+    sin_theta = np.sqrt(1 - cos_theta**2)
+    phi = 2 * np.pi * samples[:, :, 1]
+    tangents, bitangents = _orthonormal_basis(normals)
+    directions = (
+        (sin_theta * np.cos(phi))[:, :, np.newaxis] * tangents[:, np.newaxis]
+        + (sin_theta * np.sin(phi))[:, :, np.newaxis] * bitangents[:, np.newaxis]
+        + cos_theta[:, :, np.newaxis] * normals[:, np.newaxis]
+    )
+    return directions.reshape((-1, 3))
+
+
+def _two_sides_samples(elements_amount, amount, method, rng):
+    """
+    Returns an (elements_amount, amount, 4) array of samples whose first and last
+    halves are independent sample sets, one per emitting side, so that each side
+    of a two sides emitter covers the whole element and hemisphere (the two
+    halves of a single low discrepancy set would split it between the sides).
+    """
+    backwards_amount = amount // 2
+    return np.concatenate(
+        (
+            unit_hypercube_samples(
+                elements_amount, amount - backwards_amount, method, rng
+            ),
+            unit_hypercube_samples(elements_amount, backwards_amount, method, rng),
+        ),
+        axis=1,
+    )
+
+
+def emission_rays(
+    elements_array,
+    normals,
+    two_sides_emission,
+    amount,
+    rng=np.random,
+    method=RANDOM,
+    cosine_weighted=False,
+):
+    """
+    Receives an array of elements (N, 3, 3), their unit normals, whether each one
+    emits from both sides, the amount of rays per element, the random generator,
+    the sampling method and whether directions are cosine weighted.
+    Returns the origins and directions of the N * amount emitted rays, grouped
+    by element. The last half of the rays of a two sides emitter is emitted
+    backwards, and each half is sampled as a whole set (see _two_sides_samples).
+    """
+    if method == RANDOM and not cosine_weighted:
+        ray_origins = elements.random_points_in_elements(elements_array, amount, rng)
+        ray_directions = vector_math.random_unit_vectors(len(ray_origins), rng)
+        one_side_rays = ~np.repeat(two_sides_emission, amount)
+        one_side_ray_directions = ray_directions[one_side_rays]
+        vector_math.orient_towards_directions(
+            one_side_ray_directions, np.repeat(normals, amount, axis=0)[one_side_rays]
+        )
+        ray_directions[one_side_rays] = one_side_ray_directions
+        return ray_origins, ray_directions
+
+    samples = unit_hypercube_samples(len(elements_array), amount, method, rng)
+    if np.any(two_sides_emission):
+        samples[two_sides_emission] = _two_sides_samples(
+            np.count_nonzero(two_sides_emission), amount, method, rng
+        )
+    ray_origins = elements.unit_square_to_elements(elements_array, samples[:, :, :2])
+    ray_directions = unit_square_to_hemisphere(
+        normals, samples[:, :, 2:], cosine_weighted
+    )
+    backwards_rays = np.repeat(two_sides_emission, amount) & (
+        np.tile(np.arange(amount), len(elements_array)) >= amount - amount // 2
+    )
+    ray_directions[backwards_rays] *= -1
+    return ray_origins, ray_directions
@@ -1,30 +1,181 @@
 import numpy as np
+from scipy import sparse
 from typing import Tuple
+import shutil
 import struct
 
 FACTOR = (1 << 16) - 1
+# A dense matrix section starts with its rows amount, which is never zero,
+# so a zero marks a sparse matrix section.
+SPARSE_MATRIX_MARKER = 0
+
+ELEMENT_ROWS_MAGIC = b"VFRS"
+# Magic, sparse flag, rows, columns, completed rows, non zero entries and size
+# of the body in bytes.
+ELEMENT_ROWS_HEADER = ">4sBHHIQQ"
+ELEMENT_ROWS_HEADER_SIZE = struct.calcsize(ELEMENT_ROWS_HEADER)
+# Rows amount and non zero entries of a block of a sparse element rows file.
+ELEMENT_ROWS_BLOCK_HEADER = ">II"
+ELEMENT_ROWS_BLOCK_HEADER_SIZE = struct.calcsize(ELEMENT_ROWS_BLOCK_HEADER)
+COPY_BUFFER_SIZE = 1 << 20
 
 
 def _process_entry(x):
     return x * FACTOR
 
 
+def _quantized_sparse_matrix(m):
+    m = sparse.csr_matrix(m)
+    m.data = _process_entry(m.data).astype("u2")
+    m.eliminate_zeros()
+    m.sort_indices()
+    return m
+
+
+class ElementRowsWriter:
+    """
+    Implements a writer that streams quantized element view factors rows to an
+    element rows file as soon as they are computed, so they don't need to be
+    kept in memory. The header is reserved up front and rewritten after every
+    block, so the file always holds a consistent prefix of the rows.
+    Dense rows are stored as a (rows, columns) >u2 array after the header, which
+    is allocated up front and memory mapped (quantized_rows), so rows are quantized
+    straight into it and the matrix never lives in memory as floats. Sparse rows
+    are stored as a sequence of blocks, each one with its rows amount and non
+    zero entries followed by the non zero entries of each row (>u4), the column
+    indices (>u2) and the quantized values (>u2), as in a sparse section.
+    """
+
+    def __init__(self, filename: str, rows: int, columns: int, sparse_output=True):
+        """
+        Receives the element rows file name, the shape of the matrix and whether
+        the rows are stored sparsely.
+        """
+        self.rows = rows
+        self.columns = columns
+        self.sparse_output = sparse_output
+        self.completed_rows = 0
+        self.nnz = 0
+        self.body_size = 0
+        self.file = open(filename, "wb+")
+        self._write_header()
+        self.quantized_rows = None
+        if not sparse_output:
+            self.file.truncate(ELEMENT_ROWS_HEADER_SIZE + 2 * rows * columns)
+            self.quantized_rows = np.memmap(
+                self.file,
+                dtype=">u2",
+                mode="r+",
+                offset=ELEMENT_ROWS_HEADER_SIZE,
+                shape=(rows, columns),
+            )
+
+    def _write_header(self):
+        self.file.seek(0)
+        self.file.write(
+            struct.pack(
+                ELEMENT_ROWS_HEADER,
+                ELEMENT_ROWS_MAGIC,
+                self.sparse_output,
+                self.rows,
+                self.columns,
+                self.completed_rows,
+                self.nnz,
+                self.body_size,
+            )
+        )
+        self.file.flush()
+
+    def write_rows(self, rows_block: np.ndarray | sparse.csr_matrix):
+        """
+        Receives the next block of rows (dense or sparse), quantizes them and
+        appends them to the file.
+        """
+        if self.sparse_output:
+            self._write_sparse_rows(_quantized_sparse_matrix(rows_block))
+        else:
+            self._write_dense_rows(rows_block)
+        self._write_header()
+
+    def _write_sparse_rows(self, rows_block):
+        self.file.seek(ELEMENT_ROWS_HEADER_SIZE + self.body_size)
+        block_bytes = b"".join(
+            (
+                struct.pack(
+                    ELEMENT_ROWS_BLOCK_HEADER, rows_block.shape[0], rows_block.nnz
+                ),
+                np.ascontiguousarray(np.diff(rows_block.indptr), dtype=">u4").tobytes(),
+                np.ascontiguousarray(rows_block.indices, dtype=">u2").tobytes(),
+                np.ascontiguousarray(rows_block.data, dtype=">u2").tobytes(),
+            )
+        )
+        self.file.write(block_bytes)
+        self.file.flush()
+        self.completed_rows += rows_block.shape[0]
+        self.nnz += rows_block.nnz
+        self.body_size += len(block_bytes)
+
+    def _write_dense_rows(self, rows_block):
+        if sparse.issparse(rows_block):
+            rows_block = rows_block.toarray()
+        block_stop = self.completed_rows + rows_block.shape[0]
+        self.quantized_rows[self.completed_rows : block_stop] = _process_entry(
+            rows_block
+        ).astype("u2")
+        self.quantized_rows.flush()
+        self.completed_rows = block_stop
+        self.body_size = 2 * block_stop * self.columns
+
+    def close(self):
+        if self.quantized_rows is not None:
+            self.quantized_rows.flush()
+            self.quantized_rows = None
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+
+def _read_element_rows_header(file):
+    (
+        magic,
+        sparse_output,
+        rows,
+        columns,
+        completed_rows,
+        nnz,
+        body_size,
+    ) = struct.unpack(ELEMENT_ROWS_HEADER, file.read(ELEMENT_ROWS_HEADER_SIZE))
+    if magic != ELEMENT_ROWS_MAGIC:
+        raise Exception("Invalid element rows file")
+    return bool(sparse_output), rows, columns, completed_rows, nnz, body_size
+
+
 def serialize_view_factors(
     filename: str,
     earth_ir_view_factors: list[Tuple[np.ndarray, float]],
     earth_albedo_view_factors: list[Tuple[np.ndarray, float]],
     sun_view_factors: list[Tuple[np.ndarray, float]],
-    element_view_factors: np.matrix,
+    element_view_factors: np.matrix | sparse.csr_matrix | str,
 ):
     """
     Receives view factors matrices, serializes and stores them in
-    the filename file.
+    the filename file. The element view factors are stored in a sparse
+    section if they are received as a sparse matrix. They can also be received
+    as the file name of a complete element rows file (see ElementRowsWriter),
+    which is copied into the section block by block.
     """
     file = open(filename, "wb")
     _serialize_multiple_vectors(file, earth_ir_view_factors)
     _serialize_multiple_vectors(file, earth_albedo_view_factors)
     _serialize_multiple_vectors(file, sun_view_factors)
-    _serialize_matrix(file, element_view_factors)
+    if isinstance(element_view_factors, str):
+        _serialize_element_rows_file(file, element_view_factors)
+    else:
+        _serialize_matrix(file, element_view_factors)
     file.close()
 
 
@@ -35,7 +186,10 @@ def _serialize_multiple_vectors(file, values):
         _serialize_vector(file, m)
 
 
-def _serialize_matrix(file, m: np.ndarray):
+def _serialize_matrix(file, m: np.ndarray | sparse.csr_matrix):
+    if sparse.issparse(m):
+        _serialize_sparse_matrix(file, m)
+        return
     rows, columns = m.shape
     m = _process_entry(m).astype("u2")
     m = np.ascontiguousarray(m, dtype=">u2")
@@ -43,6 +197,78 @@ def _serialize_matrix(file, m: np.ndarray):
     file.write(m.tobytes(order="C"))
 
 
+def _serialize_sparse_matrix(file, m: sparse.csr_matrix):
+    """
+    Writes the marker, the shape, the amount of non zero entries and then
+    the CSR row pointers (>u4), column indices (>u2) and quantized values (>u2).
+    Entries that are zero once quantized are dropped.
+    """
+    m = _quantized_sparse_matrix(m)
+    rows, columns = m.shape
+    file.write(struct.pack(">HHHI", SPARSE_MATRIX_MARKER, rows, columns, m.nnz))
+    file.write(np.ascontiguousarray(m.indptr, dtype=">u4").tobytes(order="C"))
+    file.write(np.ascontiguousarray(m.indices, dtype=">u2").tobytes(order="C"))
+    file.write(np.ascontiguousarray(m.data, dtype=">u2").tobytes(order="C"))
+
+
+def _element_rows_blocks(rows_file, body_size):
+    """
+    Receives a sparse element rows file positioned after its header and yields
+    the rows amount, non zero entries and offset of the arrays of each block.
+    """
+    offset = ELEMENT_ROWS_HEADER_SIZE
+    while offset < ELEMENT_ROWS_HEADER_SIZE + body_size:
+        rows_file.seek(offset)
+        rows, nnz = struct.unpack(
+            ELEMENT_ROWS_BLOCK_HEADER, rows_file.read(ELEMENT_ROWS_BLOCK_HEADER_SIZE)
+        )
+        offset += ELEMENT_ROWS_BLOCK_HEADER_SIZE
+        yield rows, nnz, offset
+        offset += 4 * rows + 4 * nnz
+
+
+def _serialize_element_rows_file(file, rows_filename: str):
+    """
+    Copies a complete element rows file into a matrix section without loading
+    the matrix: dense rows are copied as they are and sparse blocks are copied
+    in three passes (row pointers, column indices and values).
+    """
+    with open(rows_filename, "rb") as rows_file:
+        (
+            sparse_output,
+            rows,
+            columns,
+            completed_rows,
+            nnz,
+            body_size,
+        ) = _read_element_rows_header(rows_file)
+        if completed_rows != rows:
+            raise Exception(
+                f"Element rows file is incomplete ({completed_rows} of {rows} rows)"
+            )
+
+        if not sparse_output:
+            # The mapped >u2 rows are already the dense section body
+            file.write(struct.pack(">HH", rows, columns))
+            shutil.copyfileobj(rows_file, file, COPY_BUFFER_SIZE)
+            return
+
+        file.write(struct.pack(">HHHI", SPARSE_MATRIX_MARKER, rows, columns, nnz))
+        file.write(np.zeros(1, dtype=">u4").tobytes())
+        row_pointer = 0
+        for block_rows, _, offset in _element_rows_blocks(rows_file, body_size):
+            rows_file.seek(offset)
+            indptr = row_pointer + np.cumsum(_read_array(rows_file, ">u4", block_rows))
+            file.write(np.ascontiguousarray(indptr, dtype=">u4").tobytes())
+            row_pointer = indptr[-1] if block_rows else row_pointer
+        for entries_offset in (0, 2):
+            for block_rows, block_nnz, offset in _element_rows_blocks(
+                rows_file, body_size
+            ):
+                rows_file.seek(offset + 4 * block_rows + entries_offset * block_nnz)
+                file.write(rows_file.read(2 * block_nnz))
+
+
 def _serialize_vector(file, data: Tuple[np.ndarray, float]):
     (v, start_time) = data
     size = len(v)
@@ -50,3 +276,48 @@ def _serialize_vector(file, data: Tuple[np.ndarray, float]):
     m = np.ascontiguousarray(m, dtype=">u2")
     file.write(struct.pack(">Hf", size, start_time))
     file.write(m.tobytes(order="C"))
+
+
+def deserialize_view_factors(filename: str):
+    """
+    Receives a view factors file name and returns the earth ir, earth albedo and
+    sun view factors lists of (vector, time) and the element view factors matrix,
+    which is sparse if it was stored in a sparse section.
+    """
+    with open(filename, "rb") as file:
+        earth_ir_view_factors = _deserialize_multiple_vectors(file)
+        earth_albedo_view_factors = _deserialize_multiple_vectors(file)
+        sun_view_factors = _deserialize_multiple_vectors(file)
+        element_view_factors = _deserialize_matrix(file)
+    return (
+        earth_ir_view_factors,
+        earth_albedo_view_factors,
+        sun_view_factors,
+        element_view_factors,
+    )
+
+
+def _read_array(file, dtype, size):
+    return np.frombuffer(file.read(np.dtype(dtype).itemsize * size), dtype=dtype)
+
+
+def _deserialize_multiple_vectors(file):
+    (values_len,) = struct.unpack(">H", file.read(2))
+    return [_deserialize_vector(file) for _ in range(values_len)]
+
+
+def _deserialize_vector(file):
+    size, start_time = struct.unpack(">Hf", file.read(6))
+    return _read_array(file, ">u2", size) / FACTOR, start_time
+
+
+def _deserialize_matrix(file):
+    (rows,) = struct.unpack(">H", file.read(2))
+    if rows == SPARSE_MATRIX_MARKER:
+        rows, columns, nnz = struct.unpack(">HHI", file.read(8))
+        indptr = _read_array(file, ">u4", rows + 1)
+        indices = _read_array(file, ">u2", nnz)
+        data = _read_array(file, ">u2", nnz) / FACTOR
+        return sparse.csr_matrix((data, indices, indptr), shape=(rows, columns))
+    (columns,) = struct.unpack(">H", file.read(2))
+    return _read_array(file, ">u2", rows * columns).reshape((rows, columns)) / FACTOR
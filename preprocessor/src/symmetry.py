@@ -0,0 +1,202 @@
+import numpy as np
+import trimesh
+from scipy import sparse
+from scipy.spatial import cKDTree
+
+MIRROR = "mirror"
+ROTATION = "rotation"
+# Maximum distance between an element centroid and the centroid of its image,
+# relative to the mesh bounding box diagonal.
+SYMMETRY_TOLERANCE = 1e-5
+NORMAL_TOLERANCE = 1e-5
+AUTO_DETECTED_ROTATION_FOLDS = (2, 3, 4, 6)
+MAX_GROUP_ORDER = 96
+_COORDINATE_AXES = np.eye(3)
+
+
+def mesh_center(mesh):
+    """
+    Receives a trimesh mesh object and returns the area weighted mean of the
+    element centroids.
+    """
+    return np.average(mesh.triangles_center, axis=0, weights=mesh.area_faces)
+
+
+def symmetry_transform(symmetry, center):
+    """
+    Receives a declared symmetry, a dictionary with a "type" (mirror or rotation),
+    a "normal" (mirror) or an "axis" and "folds" (rotation) and optionally a "point"
+    it goes through, and the point used when none is declared.
+    Returns the 4x4 homogeneous matrix of the transform.
+    """
+    point = np.array(symmetry.get("point", center), dtype=float)
+    if symmetry["type"] == MIRROR:
+        return trimesh.transformations.reflection_matrix(point, symmetry["normal"])
+    if symmetry["type"] == ROTATION:
+        return trimesh.transformations.rotation_matrix(
+            2 * np.pi / symmetry["folds"], symmetry["axis"], point
+        )
+    raise ValueError(f"Unknown symmetry type {symmetry['type']}")
+
+
+def element_permutation(
+    mesh,
+    transform,
+    absorptance_by_element,
+    two_sides_emission_by_element,
+    diffuse_fraction_by_element=None,
+):
+    """
+    Receives a trimesh mesh object, a 4x4 transform and the material properties
+    by element.
+    Returns the permutation p that maps each element i onto its image p[i], or
+    None if the transform is not a symmetry of the mesh and its materials.
+    """
+    centroids = mesh.triangles_center
+    tree = cKDTree(centroids)
+    distances, images = tree.query(
+        trimesh.transformations.transform_points(centroids, transform)
+    )
+    if np.any(distances > SYMMETRY_TOLERANCE * mesh.scale):
+        return None
+    if np.unique(images).size != images.size:
+        return None
+
+    transformed_normals = mesh.face_normals @ transform[:3, :3].T
+    normals_dot = np.einsum("ij,ij->i", transformed_normals, mesh.face_normals[images])
+    if np.any(normals_dot < 1 - NORMAL_TOLERANCE):
+        return None
+    if np.any(absorptance_by_element[images] != absorptance_by_element):
+        return None
+    if np.any(two_sides_emission_by_element[images] != two_sides_emission_by_element):
+        return None
+    if diffuse_fraction_by_element is not None and np.any(
+        diffuse_fraction_by_element[images] != diffuse_fraction_by_element
+    ):
+        return None
+    return images
+
+
+def _auto_detected_symmetries():
+    symmetries = [{"type": MIRROR, "normal": axis} for axis in _COORDINATE_AXES]
+    for axis in _COORDINATE_AXES:
+        for folds in AUTO_DETECTED_ROTATION_FOLDS:
+            symmetries.append({"type": ROTATION, "axis": axis, "folds": folds})
+    return symmetries
+
+
+def symmetry_group(
+    mesh,
+    absorptance_by_element,
+    two_sides_emission_by_element,
+    symmetries="auto",
+    diffuse_fraction_by_element=None,
+):
+    """
+    Receives a trimesh mesh object, the material properties by element and the
+    symmetries to use: "auto" tests mirror planes and rotations around the
+    coordinate axes through the mesh center, or a list of declared symmetries
+    (see symmetry_transform).
+    Returns an array (G, N) with the element permutations of every element of
+    the group generated by the symmetries that hold, the identity included.
+    Declared symmetries that don't hold raise an exception.
+    """
+    center = mesh_center(mesh)
+    element_amount = len(mesh.faces)
+    auto_detected = symmetries == "auto"
+    if auto_detected:
+        symmetries = _auto_detected_symmetries()
+
+    generators = []
+    for symmetry in symmetries:
+        permutation = element_permutation(
+            mesh,
+            symmetry_transform(symmetry, center),
+            absorptance_by_element,
+            two_sides_emission_by_element,
+            diffuse_fraction_by_element,
+        )
+        if permutation is None and not auto_detected:
+            raise Exception(f"Mesh is not symmetric under {symmetry}")
+        if permutation is not None:
+            generators.append(permutation)
+
+    group = {np.arange(element_amount).tobytes(): np.arange(element_amount)}
+    new_permutations = list(group.values())
+    while new_permutations:
+        composed_permutations = [
+            generator[permutation]
+            for permutation in new_permutations
+            for generator in generators
+        ]
+        new_permutations = []
+        for permutation in composed_permutations:
+            key = permutation.tobytes()
+            if key not in group:
+                group[key] = permutation
+                new_permutations.append(permutation)
+        if len(group) > MAX_GROUP_ORDER:
+            raise Exception(
+                f"Symmetry group has more than {MAX_GROUP_ORDER} elements, "
+                "check the symmetry tolerance"
+            )
+    return np.array(list(group.values()))
+
+
+def representatives(group):
+    """
+    Receives the element permutations of a symmetry group.
+    Returns the canonical representative of each orbit of elements (its smallest
+    element id), and for each element its representative and the index of a
+    group permutation that maps the element onto it.
+    """
+    representative_by_element = np.min(group, axis=0)
+    permutation_by_element = np.argmin(group, axis=0)
+    return (
+        np.unique(representative_by_element),
+        representative_by_element,
+        permutation_by_element,
+    )
+
+
+def expand_rows(representative_rows, group):
+    """
+    Receives the view factors rows of the representatives (dense or sparse, in
+    the order returned by representatives) and the symmetry group.
+    Returns the view factors of every element, filling each row by permuting
+    the columns of the row of its representative: if g maps i onto r,
+    F[i, j] = F[r, g[j]]. The result has the same type as the received rows.
+    """
+    unique_representatives, representative_by_element, permutation_by_element = (
+        representatives(group)
+    )
+    representative_rows_csr = sparse.csr_matrix(representative_rows)
+    row_by_element = np.searchsorted(unique_representatives, representative_by_element)
+
+    permuted_rows = []
+    permuted_elements = []
+    for permutation_id, permutation in enumerate(group):
+        elements = np.flatnonzero(permutation_by_element == permutation_id)
+        if elements.size == 0:
+            continue
+        permuted_rows.append(
+            representative_rows_csr[row_by_element[elements]][:, permutation]
+        )
+        permuted_elements.append(elements)
+    rows = sparse.vstack(permuted_rows, format="csr")
+    view_factors = rows[np.argsort(np.concatenate(permuted_elements))]
+
+    if not sparse.issparse(representative_rows):
+        return view_factors.toarray()
+    return view_factors
+
+
+def expand_values(representative_values, group):
+    """
+    Receives a value per representative (in the order returned by representatives)
+    and the symmetry group. Returns the value of the representative of each element.
+    """
+    unique_representatives, representative_by_element, _ = representatives(group)
+    return np.asarray(representative_values)[
+        np.searchsorted(unique_representatives, representative_by_element)
+    ]
@@ -44,14 +44,27 @@ def spherical_cordinates(vector):
     return norm, phi, theta
 
 
-def random_unit_vectors(amount):
+def random_unit_vectors(amount, rng=np.random):
     """
     Generates an array of unit vectors with pseudorandom directions.
+    Optionally receives the random generator to draw them from.
     """
-    random_vectors = np.random.normal(0, 1, (amount, 3))
+    random_vectors = rng.normal(0, 1, (amount, 3))
     return random_vectors / np.linalg.norm(random_vectors, axis=1)[:, np.newaxis]
 
 
+def sphere_unit_vectors(amount):
+    """
+    Generates an array of unit vectors evenly distributed over the
+    sphere (fibonacci lattice).
+    """
+    golden_angle = np.pi * (3 - np.sqrt(5))
+    z = 1 - (2 * np.arange(amount) + 1) / amount
+    radius = np.sqrt(1 - z**2)
+    theta = golden_angle * np.arange(amount)
+    return np.column_stack((radius * np.cos(theta), radius * np.sin(theta), z))
+
+
 def array_dot(vectors, other_vector):
     """
     Receives an array of vectors and returns an array of inner product
@@ -89,6 +102,15 @@ def orient_towards_direction(vectors, direction):
     vectors *= np.sign(vectors @ direction[:, np.newaxis])
 
 
+def orient_towards_directions(vectors, directions):
+    """
+    Receives an array of vectors and an array of directions and flips inplace
+    each vector whose inner product with the direction of the same index
+    is negative.
+    """
+    vectors *= np.sign(array_array_dot(vectors, directions))[:, np.newaxis]
+
+
 def _rotation_matrix(axis, theta):
     """
     Return the rotation matrix associated with counterclockwise rotation about
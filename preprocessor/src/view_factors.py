@@ -1,10 +1,24 @@
 import numpy as np
 import trimesh
-from . import mesh_ops, vector_math, elements, rays, visualization
+from scipy import sparse
+from . import mesh_ops, vector_math, elements, rays, visualization, parallel, sampling, view_factors_analytic, culling
 
 DEBUG_VISUALIZATION_ENABLED = False
 RAY_DISPLACEMENT = 1e-4
+# Sun directions equal up to this amount of decimals are traced once.
+SUN_DIRECTION_DECIMALS = 9
 IR_SCALE_FACTOR = 2.35
+ELEMENT_BLOCK_SIZE = 64
+# Random generators of different stages never share their seeds.
+ELEMENT_ELEMENT_SEED_TAG = 0
+ELEMENT_EARTH_SEED_TAG = 1
+EARTH_VISIBILITY_SEED_TAG = 2
+
+SAMPLED_REFLECTIONS = "sampled"
+WEIGHTED_REFLECTIONS = "weighted"
+REFLECTION_MODES = (SAMPLED_REFLECTIONS, WEIGHTED_REFLECTIONS)
+# Weighted rays whose weight falls under this value play Russian roulette.
+ROULETTE_WEIGHT = 0.1
 
 
 def albedo_edge(ray_sun_dot_product, penumbra_fraction=0):
@@ -18,195 +32,989 @@ def albedo_edge(ray_sun_dot_product, penumbra_fraction=0):
     return np.abs(ray_sun_dot_product)
 
 
+def _block_random_generator(seed, stage_tag, block_start, division=0):
+    """
+    Receives the run seed, the tag of the stage, the first element of a block and
+    the orbit division number and returns the random generator of the block.
+    Blocks only depend on the block size, so results don't depend on the amount
+    of workers, and no two stages, divisions or blocks share their samples.
+    """
+    return np.random.default_rng([seed, stage_tag, division, block_start])
+
+
+def _new_seed():
+    return np.random.SeedSequence().entropy
+
+
+def _element_earth_block(
+    mesh,
+    ray_backend,
+    block_start,
+    block_stop,
+    earth_direction,
+    sun_direction,
+    division,
+    penumbra_fraction,
+    ray_amount,
+    seed,
+):
+    """
+    Receives a trimesh mesh object, its ray backend, a block of elements
+    [block_start, block_stop), the orbit division number and the earth view
+    factors parameters.
+    Casts the rays of every element of the block together and returns the ir and
+    albedo view factors of the elements of the block.
+    """
+    rng = _block_random_generator(seed, ELEMENT_EARTH_SEED_TAG, block_start, division)
+    rows_amount = block_stop - block_start
+    ray_row_ids = np.repeat(np.arange(rows_amount), ray_amount)
+
+    ray_origins = elements.random_points_in_elements(
+        mesh.triangles[block_start:block_stop], ray_amount, rng
+    )
+    ray_directions = vector_math.random_unit_vectors(ray_row_ids.size, rng)
+    vector_math.orient_towards_direction(ray_directions, earth_direction)
+    ray_origins += ray_directions * RAY_DISPLACEMENT
+
+    if DEBUG_VISUALIZATION_ENABLED:
+        visualization.view_raycast(ray_origins, ray_directions, mesh, block_start)
+
+    hit_element_ids = ray_backend.intersects_first(ray_origins, ray_directions)
+    not_hit_mask = hit_element_ids < 0
+    not_hit_row_ids = ray_row_ids[not_hit_mask]
+    not_hit_ray_directions = vector_math.flip_around_axis(
+        ray_directions[not_hit_mask], earth_direction
+    )
+
+    ray_sat_dot_product = np.abs(
+        vector_math.array_array_dot(
+            not_hit_ray_directions,
+            mesh.face_normals[not_hit_row_ids + block_start],
+        )
+    )
+
+    # IR
+    ray_earth_dot_product = not_hit_ray_directions @ earth_direction
+    ray_earth_dot_product[ray_earth_dot_product < 0] = 0
+    ir_view_factors = (
+        IR_SCALE_FACTOR
+        * np.bincount(
+            not_hit_row_ids,
+            weights=ray_earth_dot_product * ray_sat_dot_product,
+            minlength=rows_amount,
+        )
+        / ray_amount
+    )
+
+    # Albedo
+    ray_sun_dot_product = not_hit_ray_directions @ -sun_direction
+    albedo_view_factor = (
+        ray_earth_dot_product
+        * ray_sat_dot_product
+        * albedo_edge(ray_sun_dot_product, penumbra_fraction=penumbra_fraction)
+    )
+    albedo_view_factors = (
+        np.bincount(not_hit_row_ids, weights=albedo_view_factor, minlength=rows_amount)
+        / ray_amount
+    )
+
+    return ir_view_factors, albedo_view_factors
+
+
 def element_earth(
-    mesh, earth_direction, sun_direction, penumbra_fraction=0, ray_amount=1000
+    mesh,
+    earth_direction,
+    sun_direction,
+    penumbra_fraction=0,
+    ray_amount=1000,
+    block_size=ELEMENT_BLOCK_SIZE,
+    pool=None,
+    seed=None,
+    division=0,
 ):
     """
     Receives a trimesh mesh object, a vector that represents the direction towards
     the earth and the amount of rays to be casted.
+    Optionally receives a worker pool to split the elements across processes,
+    the seed of the random generators and the orbit division number.
     Finds the view factors of the elements of the mesh with the earth and returns
     a list of the view factors.
     """
-    elements_amount = mesh_ops.element_amount(mesh)
-    element_normals = trimesh.triangles.normals(mesh.triangles)[0]
-    ir_view_factors = np.zeros(elements_amount)
-    albedo_view_factors = np.zeros(elements_amount)
+    return next(
+        element_earth_divisions(
+            mesh,
+            [earth_direction],
+            [sun_direction],
+            penumbra_fraction,
+            ray_amount,
+            block_size,
+            pool,
+            seed,
+            [division],
+        )
+    )
 
-    for element_id in range(elements_amount):
-        emitting_element = mesh.triangles[element_id]
-        emitting_element_normal = element_normals[element_id]
 
-        ray_origins = elements.random_points_in_element(emitting_element, ray_amount)
-        ray_directions = vector_math.random_unit_vectors(ray_amount)
-        vector_math.orient_towards_direction(ray_directions, earth_direction)
-        ray_origins += ray_directions * RAY_DISPLACEMENT
+def element_earth_divisions(
+    mesh,
+    earth_directions,
+    sun_directions,
+    penumbra_fraction=0,
+    ray_amount=1000,
+    block_size=ELEMENT_BLOCK_SIZE,
+    pool=None,
+    seed=None,
+    division_numbers=None,
+):
+    """
+    Receives a trimesh mesh object and the directions towards the earth and the
+    sun of some orbit divisions, the element_earth parameters and the numbers of
+    the divisions (their positions in the directions by default).
+    The blocks of elements of every division are dispatched to the worker pool
+    together, so workers are kept busy across divisions instead of waiting for
+    each division to finish. Each block keeps the random generator it has in
+    element_earth, seeded by its division number, so results don't depend on
+    how divisions are dispatched.
+    Yields the ir and albedo view factors of each division, in order, as soon
+    as the division finishes.
+    """
+    elements_amount = mesh_ops.element_amount(mesh)
+    pool = pool or parallel.WorkerPool(mesh)
+    seed = _new_seed() if seed is None else seed
+    if division_numbers is None:
+        division_numbers = range(len(earth_directions))
+
+    blocks = parallel.blocks(elements_amount, block_size)
+    blocks_view_factors = pool.map(
+        _element_earth_block,
+        [
+            (block_start, block_stop, earth_direction, sun_direction, division)
+            for earth_direction, sun_direction, division in zip(
+                earth_directions, sun_directions, division_numbers
+            )
+            for block_start, block_stop in blocks
+        ],
+        penumbra_fraction=penumbra_fraction,
+        ray_amount=ray_amount,
+        seed=seed,
+    )
+    for _ in range(len(earth_directions)):
+        ir_view_factors = np.zeros(elements_amount)
+        albedo_view_factors = np.zeros(elements_amount)
+        for (block_start, block_stop), (block_ir, block_albedo) in zip(
+            blocks, blocks_view_factors
+        ):
+            ir_view_factors[block_start:block_stop] = block_ir
+            albedo_view_factors[block_start:block_stop] = block_albedo
+        yield ir_view_factors, albedo_view_factors
+
+
+def _earth_visibility_block(
+    mesh, ray_backend, block_start, block_stop, directions, seed
+):
+    """
+    Receives a trimesh mesh object, its ray backend, a block of elements
+    [block_start, block_stop) and an array of directions. Casts one ray per element and direction from
+    a random point of the element and returns the visibility of the block packed
+    as bits, where a one means the ray did not hit the mesh.
+    """
+    rng = _block_random_generator(seed, EARTH_VISIBILITY_SEED_TAG, block_start)
+    rows_amount = block_stop - block_start
+    ray_origins = elements.random_points_in_elements(
+        mesh.triangles[block_start:block_stop], len(directions), rng
+    )
+    ray_directions = np.tile(directions, (rows_amount, 1))
+    ray_origins += ray_directions * RAY_DISPLACEMENT
+    hit = ray_backend.intersects_any(ray_origins, ray_directions)
+    return np.packbits(~hit.reshape((rows_amount, len(directions))), axis=1)
 
-        if DEBUG_VISUALIZATION_ENABLED:
-            visualization.view_raycast(ray_origins, ray_directions, mesh, element_id)
 
-        hit_element_ids = mesh.ray.intersects_first(ray_origins, ray_directions)
-        mask = np.ones(ray_amount, dtype=bool)
-        mask[hit_element_ids >= 0] = 0
-        not_hit_ray_directions = ray_directions[mask]
-        not_hit_ray_directions = vector_math.flip_around_axis(
-            not_hit_ray_directions, earth_direction
+def earth_visibility(
+    mesh, ray_amount=1000, block_size=ELEMENT_BLOCK_SIZE, pool=None, seed=None
+):
+    """
+    Receives a trimesh mesh object and the amount of rays casted towards the earth
+    hemisphere. Optionally receives a worker pool and the seed of the random generators.
+    Tests the occlusion of every element for a fixed set of 2 * ray_amount directions
+    over the sphere, which doesn't depend on the earth direction, and returns a
+    (directions, visibility) tuple to be reused by element_earth_from_visibility.
+    """
+    elements_amount = mesh_ops.element_amount(mesh)
+    pool = pool or parallel.WorkerPool(mesh)
+    seed = _new_seed() if seed is None else seed
+    directions = vector_math.sphere_unit_vectors(2 * ray_amount)
+
+    blocks = parallel.blocks(elements_amount, block_size)
+    visibility = np.vstack(
+        list(
+            pool.map(_earth_visibility_block, blocks, directions=directions, seed=seed)
         )
+    )
+    return directions, visibility
 
-        if not_hit_ray_directions.size == 0:
-            ir_view_factors[element_id] = 0
-            albedo_view_factors[element_id] = 0
-            continue
 
-        ray_sat_dot_product = np.abs(
-            vector_math.array_dot(not_hit_ray_directions, emitting_element_normal)
-        )
+def element_earth_from_visibility(
+    mesh,
+    visibility,
+    earth_direction,
+    sun_direction,
+    penumbra_fraction=0,
+    block_size=ELEMENT_BLOCK_SIZE,
+):
+    """
+    Receives a trimesh mesh object, the visibility returned by earth_visibility and
+    the directions towards the earth and the sun.
+    Finds the view factors of the elements of the mesh with the earth as element_earth
+    does, without casting any ray, and returns a list of the view factors.
+    """
+    directions, packed_visibility = visibility
+    elements_amount = mesh_ops.element_amount(mesh)
+    element_normals = mesh.face_normals
+    ir_view_factors = np.zeros(elements_amount)
+    albedo_view_factors = np.zeros(elements_amount)
 
-        # IR
-        ray_earth_dot_product = vector_math.array_dot(
-            not_hit_ray_directions, earth_direction
-        )
-        ray_earth_dot_product[ray_earth_dot_product < 0] = 0
-        ir_view_factor = IR_SCALE_FACTOR * ray_earth_dot_product * ray_sat_dot_product
-        ir_view_factors[element_id] = np.sum(ir_view_factor) / ray_amount
+    earth_hemisphere = (directions @ earth_direction) > 0
+    ray_amount = np.count_nonzero(earth_hemisphere)
+    flipped_ray_directions = vector_math.flip_around_axis(
+        directions[earth_hemisphere], earth_direction
+    )
+    ray_earth_dot_product = flipped_ray_directions @ earth_direction
+    ray_earth_dot_product[ray_earth_dot_product < 0] = 0
+    ray_sun_dot_product = albedo_edge(
+        flipped_ray_directions @ -sun_direction, penumbra_fraction=penumbra_fraction
+    )
 
-        # Albedo
-        ray_sun_dot_product = vector_math.array_dot(
-            not_hit_ray_directions, -sun_direction
-        )
-        albedo_view_factor = (
-            ray_earth_dot_product
-            * ray_sat_dot_product
-            * albedo_edge(ray_sun_dot_product, penumbra_fraction=penumbra_fraction)
+    for block_start, block_stop in parallel.blocks(elements_amount, block_size):
+        visible = np.unpackbits(
+            packed_visibility[block_start:block_stop], axis=1, count=len(directions)
+        )[:, earth_hemisphere]
+        ray_sat_dot_product = np.abs(
+            element_normals[block_start:block_stop] @ flipped_ray_directions.T
         )
-        albedo_view_factors[element_id] = np.sum(albedo_view_factor) / ray_amount
+        visible_ray_sat_dot_product = visible * ray_sat_dot_product
+        ir_view_factors[block_start:block_stop] = (
+            IR_SCALE_FACTOR * visible_ray_sat_dot_product @ ray_earth_dot_product
+        ) / ray_amount
+        albedo_view_factors[block_start:block_stop] = (
+            visible_ray_sat_dot_product @ (ray_earth_dot_product * ray_sun_dot_product)
+        ) / ray_amount
 
     return ir_view_factors, albedo_view_factors
 
 
-def element_sun(mesh, sun_direction):
+def _element_sun_block(mesh, ray_backend, block_start, block_stop, sun_directions):
     """
-    Receives a trimesh mesh object and and vector that represents the direction towards the sun.
-    Finds the view factors of the elements of the mesh with the sun and returns
-    a list of the view factors.
+    Receives a trimesh mesh object, its ray backend, a block of elements
+    [block_start, block_stop) and an array (D, 3) of directions towards the sun.
+    Casts one ray from the center of each element of the block towards each sun
+    direction, all of them in a single call, and returns the sun view factors
+    (D, block size) of the block.
     """
-    element_centers = np.array(
-        list(map(lambda x: (x[0] + x[1] + x[2]) / 3, mesh.triangles))
-    )
-    element_normals = trimesh.triangles.normals(mesh.triangles)[0]
-
-    ray_origins = element_centers + sun_direction * RAY_DISPLACEMENT
-    ray_directions = np.broadcast_to(sun_direction, (len(ray_origins), 3))
+    block_triangles = mesh.triangles[block_start:block_stop]
+    element_centers = block_triangles.mean(axis=1)
+    element_normals = trimesh.triangles.normals(block_triangles)[0]
+    elements_amount = len(element_centers)
+
+    ray_origins = (
+        element_centers[np.newaxis] + sun_directions[:, np.newaxis] * RAY_DISPLACEMENT
+    ).reshape((-1, 3))
+    ray_directions = np.repeat(sun_directions, elements_amount, axis=0)
     element_sun_view_factors = rays.aparent_element_area_multiplier(
-        ray_directions, element_normals
+        ray_directions, np.tile(element_normals, (len(sun_directions), 1))
     )
-    intersected = mesh.ray.intersects_any(ray_origins, ray_directions)
+    intersected = ray_backend.intersects_any(ray_origins, ray_directions)
     element_sun_view_factors[intersected] = 0
 
-    return element_sun_view_factors
+    return element_sun_view_factors.reshape((len(sun_directions), elements_amount))
+
+
+def element_sun_divisions(
+    mesh, sun_directions, pool=None, block_size=ELEMENT_BLOCK_SIZE
+):
+    """
+    Receives a trimesh mesh object and an array (D, 3) with the direction towards
+    the sun at each orbit division.
+    Optionally receives a worker pool, whose ray backend is reused, to split the
+    blocks of block_size elements across processes.
+    Directions that coincide (up to SUN_DIRECTION_DECIMALS decimals) are traced
+    once, and the shadow rays of every distinct direction are casted together, so
+    each block casts block_size rays per distinct direction in a single call.
+    Returns an array (D, N) with the sun view factors of each division.
+    """
+    elements_amount = mesh_ops.element_amount(mesh)
+    pool = pool or parallel.WorkerPool(mesh)
+    sun_directions = np.asarray(sun_directions, dtype=float).reshape((-1, 3))
+    _, unique_ids, division_ids = np.unique(
+        np.round(sun_directions, SUN_DIRECTION_DECIMALS),
+        axis=0,
+        return_index=True,
+        return_inverse=True,
+    )
+    unique_view_factors = np.concatenate(
+        list(
+            pool.map(
+                _element_sun_block,
+                parallel.blocks(elements_amount, block_size),
+                sun_directions=sun_directions[unique_ids],
+            )
+        ),
+        axis=1,
+    )
+    return unique_view_factors[division_ids.reshape(-1)]
+
+
+def element_sun(mesh, sun_direction, pool=None, block_size=ELEMENT_BLOCK_SIZE):
+    """
+    Receives a trimesh mesh object and and vector that represents the direction towards the sun.
+    Optionally receives a worker pool, whose ray backend is reused, to split the
+    blocks of block_size elements across processes.
+    Finds the view factors of the elements of the mesh with the sun and returns
+    a list of the view factors.
+    """
+    return element_sun_divisions(mesh, [sun_direction], pool, block_size)[0]
 
 
 def _filter_reflected_rays_by_element_absorptance(
-    absorptance, hit_points, hit_ray_ids, hit_element_ids
+    absorptance, hit_points, hit_ray_ids, hit_element_ids, rng
 ):
-    random_values = np.random.rand(hit_element_ids.size)
+    random_values = rng.random(hit_element_ids.size)
     reflected_mask = random_values > absorptance[hit_element_ids]
     absorbed_mask = random_values <= absorptance[hit_element_ids]
 
     reflected_hit_points = hit_points[reflected_mask]
     reflected_hit_ray_ids = hit_ray_ids[reflected_mask]
     reflected_element_ids = hit_element_ids[reflected_mask]
+    absorbed_ray_ids = hit_ray_ids[absorbed_mask]
     absorbed_element_ids = hit_element_ids[absorbed_mask]
     return (
         reflected_hit_points,
         reflected_hit_ray_ids,
         reflected_element_ids,
+        absorbed_ray_ids,
         absorbed_element_ids,
     )
 
 
-def element_element(
+def _weight_reflected_rays(
+    absorptance, ray_weights, hit_points, hit_ray_ids, hit_element_ids, rng
+):
+    """
+    Receives the absorptance by element, the weight of each traced ray and the hits
+    of the rays. Each hit deposits the absorbed fraction of the weight of its ray on
+    the hit element, and the ray is reflected with the rest of its weight. Rays whose
+    remaining weight is lower than ROULETTE_WEIGHT play Russian roulette: they survive
+    with probability weight / ROULETTE_WEIGHT carrying ROULETTE_WEIGHT, so rays that
+    barely contribute are not traced while the estimate stays unbiased.
+    Returns the reflected hit points, ray ids, element ids and weights, and the ray
+    ids, element ids and weights of the deposits.
+    """
+    hit_weights = ray_weights[hit_ray_ids]
+    absorbed_weights = hit_weights * absorptance[hit_element_ids]
+    reflected_weights = hit_weights - absorbed_weights
+    survival_probabilities = np.minimum(1, reflected_weights / ROULETTE_WEIGHT)
+    reflected_mask = rng.random(hit_element_ids.size) < survival_probabilities
+    absorbed_mask = absorbed_weights > 0
+    return (
+        hit_points[reflected_mask],
+        hit_ray_ids[reflected_mask],
+        hit_element_ids[reflected_mask],
+        reflected_weights[reflected_mask] / survival_probabilities[reflected_mask],
+        hit_ray_ids[absorbed_mask],
+        hit_element_ids[absorbed_mask],
+        absorbed_weights[absorbed_mask],
+    )
+
+
+def _absorb_hits(
+    reflection_mode,
+    absorptance,
+    ray_weights,
+    hit_points,
+    hit_ray_ids,
+    hit_element_ids,
+    rng,
+):
+    """
+    Receives the reflection mode, the absorptance by element, the weight of each
+    traced ray (None for sampled reflections) and the hits of the rays.
+    Returns the reflected hit points, ray ids, element ids and weights, and the ray
+    ids, element ids and weights (None for sampled reflections) of the absorbed hits.
+    """
+    if reflection_mode == WEIGHTED_REFLECTIONS:
+        return _weight_reflected_rays(
+            absorptance, ray_weights, hit_points, hit_ray_ids, hit_element_ids, rng
+        )
+    (
+        reflected_hit_points,
+        reflected_hit_ray_ids,
+        reflected_element_ids,
+        absorbed_ray_ids,
+        absorbed_element_ids,
+    ) = _filter_reflected_rays_by_element_absorptance(
+        absorptance, hit_points, hit_ray_ids, hit_element_ids, rng
+    )
+    return (
+        reflected_hit_points,
+        reflected_hit_ray_ids,
+        reflected_element_ids,
+        None,
+        absorbed_ray_ids,
+        absorbed_element_ids,
+        None,
+    )
+
+
+def _accumulate_absorbed_rays(
+    absorbed_hits,
+    ray_row_ids,
+    absorbed_ray_ids,
+    absorbed_element_ids,
+    element_amount,
+    absorbed_weights=None,
+):
+    """
+    Receives the list of absorbed hits of a block of emitters, the block row of
+    each traced ray, the ids of the rays absorbed, the elements that absorbed
+    them and optionally the absorbed weights (one by default).
+    Appends the hits (flattened row-element indices) and their weights inplace.
+    """
+    absorbed_hits.append(
+        (
+            ray_row_ids[absorbed_ray_ids] * element_amount + absorbed_element_ids,
+            absorbed_weights,
+        )
+    )
+
+
+def _hit_counts(absorbed_hits, rows_amount, element_amount):
+    """
+    Receives the list of absorbed hits of a block of rows_amount emitters.
+    Returns the sorted ids (flattened row-element indices) of the hit pairs, the
+    amount of hits (or the sum of the hit weights) of each pair and the sum of
+    the squared hit weights of each pair, accumulated with bincount.
+    """
+    pairs_amount = rows_amount * element_amount
+    ids = np.concatenate([hit_ids for hit_ids, _ in absorbed_hits])
+    if all(hit_weights is None for _, hit_weights in absorbed_hits):
+        counts = np.bincount(ids, minlength=pairs_amount)
+        hit_ids = np.flatnonzero(counts)
+        return hit_ids, counts[hit_ids], counts[hit_ids]
+
+    weights = np.concatenate(
+        [
+            np.ones(len(hit_ids)) if hit_weights is None else hit_weights
+            for hit_ids, hit_weights in absorbed_hits
+        ]
+    )
+    counts = np.bincount(ids, weights=weights, minlength=pairs_amount)
+    squares = np.bincount(ids, weights=weights**2, minlength=pairs_amount)
+    hit_ids = np.flatnonzero(counts)
+    return hit_ids, counts[hit_ids], squares[hit_ids]
+
+
+def _rows_standard_errors(
+    hit_ids, hit_counts, hit_squares, rows_ray_amounts, element_amount
+):
+    """
+    Receives the absorbed hit ids, counts and squared weights of a block of emitters
+    and the amount of rays casted by each row, and returns the maximum standard error
+    of the view factors of each row.
+    """
+    rows = hit_ids // element_amount
+    view_factors = hit_counts / rows_ray_amounts[rows]
+    variances = (
+        np.maximum(hit_squares / rows_ray_amounts[rows] - view_factors**2, 0)
+        / rows_ray_amounts[rows]
+    )
+    rows_variances = np.zeros(len(rows_ray_amounts))
+    np.maximum.at(rows_variances, rows, variances)
+    return np.sqrt(rows_variances)
+
+
+def _sparse_rows(hit_ids, hit_counts, rows_ray_amounts, element_amount, threshold):
+    """
+    Receives the absorbed hit ids and counts of a block of emitters and the amount
+    of rays casted by each row and returns the view factors rows of the block as a
+    CSR matrix, dropping the entries that are lower than threshold.
+    """
+    rows, columns = np.divmod(hit_ids, element_amount)
+    view_factors = hit_counts / rows_ray_amounts[rows]
+    kept = view_factors >= threshold
+    return sparse.csr_matrix(
+        (view_factors[kept], (rows[kept], columns[kept])),
+        shape=(len(rows_ray_amounts), element_amount),
+    )
+
+
+def _trace_element_rays(
     mesh,
+    ray_backend,
+    block_emitters,
+    emitting_rows,
+    ray_amount,
     absorptance_by_element,
     two_sides_emission_by_element,
-    ray_amount,
     max_reflections_amount,
+    rng,
+    sampling_method=sampling.RANDOM,
+    cosine_weighted=False,
+    visible_bounds=None,
+    reflection_mode=SAMPLED_REFLECTIONS,
+    diffuse_fraction_by_element=None,
 ):
     """
-    Receives a trimesh mesh object, a function that returns the material properties of an element,
-    the amount of rays to be casted, the maximum amount of reflections and a boolean that
-    indicates if the element emits light internally.
-    Finds the view factors of the elements of the mesh with the other elements and returns
-    a list of the view factors.
+    Receives a trimesh mesh object, its ray backend, the elements of a block of
+    emitters, the block rows that emit rays, the amount of rays per row, the material properties
+    by element, the maximum amount of reflections and how emission rays are sampled.
+    Hits are absorbed or reflected with probability given by the absorptance (sampled
+    reflections), or rays carry a weight that each hit partially absorbs (weighted
+    reflections, see _weight_reflected_rays).
+    Reflections are specular, or diffuse with probability given by the diffuse fraction
+    of the hit element if diffuse_fraction_by_element is given (see rays.scattered_rays).
+    If the potentially visible bounding box of each block row is given, emitted rays
+    that miss it are not casted since they can't hit anything.
+    Casts the rays and returns a list of the absorbed hits (flattened row-element indices
+    and weights), whose first item holds the hits of the direct emission.
     """
     element_amount = mesh_ops.element_amount(mesh)
-    element_normals = trimesh.triangles.normals(mesh.triangles)[0]
-    view_factors = np.zeros((element_amount, element_amount))
-
-    for element_id in range(element_amount):
-        emitting_element = mesh.triangles[element_id]
-        emitting_element_normal = element_normals[element_id]
-        view_factors_row = np.zeros(element_amount)
-
-        # Original emission
-        ray_origins = elements.random_points_in_element(emitting_element, ray_amount)
-        ray_directions = vector_math.random_unit_vectors(ray_amount)
-        if not two_sides_emission_by_element[element_id]:
-            vector_math.orient_towards_direction(
-                ray_directions, emitting_element_normal
+    element_normals = mesh.face_normals
+    absorbed_hits = []
+    ray_row_ids = np.repeat(emitting_rows, ray_amount)
+
+    # Original emission
+    emitting_elements = block_emitters[emitting_rows]
+    ray_origins, ray_directions = sampling.emission_rays(
+        mesh.triangles[emitting_elements],
+        element_normals[emitting_elements],
+        two_sides_emission_by_element[emitting_elements],
+        ray_amount,
+        rng,
+        sampling_method,
+        cosine_weighted,
+    )
+
+    ray_origins += ray_directions * RAY_DISPLACEMENT
+    ray_weights = None
+    if reflection_mode == WEIGHTED_REFLECTIONS:
+        ray_weights = np.ones(len(ray_origins))
+
+    if DEBUG_VISUALIZATION_ENABLED:
+        visualization.view_raycast(
+            ray_origins, ray_directions, mesh, block_emitters[0]
+        )
+
+    if visible_bounds is None:
+        hit_element_ids, hit_ray_ids, hit_points = ray_backend.intersects_id(
+            ray_origins, ray_directions
+        )
+    else:
+        cast_ray_ids = np.flatnonzero(
+            culling.rays_hit_bounds(
+                ray_origins, ray_directions, visible_bounds[ray_row_ids]
             )
+        )
+        hit_element_ids, hit_ray_ids, hit_points = ray_backend.intersects_id(
+            ray_origins[cast_ray_ids], ray_directions[cast_ray_ids]
+        )
+        hit_ray_ids = cast_ray_ids[hit_ray_ids]
+    (
+        hit_points,
+        hit_ray_ids,
+        hit_element_ids,
+        reflected_weights,
+        absorbed_ray_ids,
+        absorbed_element_ids,
+        absorbed_weights,
+    ) = _absorb_hits(
+        reflection_mode,
+        absorptance_by_element,
+        ray_weights,
+        hit_points,
+        hit_ray_ids,
+        hit_element_ids,
+        rng,
+    )
+    _accumulate_absorbed_rays(
+        absorbed_hits,
+        ray_row_ids,
+        absorbed_ray_ids,
+        absorbed_element_ids,
+        element_amount,
+        absorbed_weights,
+    )
 
-        ray_origins += ray_directions * RAY_DISPLACEMENT
+    # Reflexions
+    for _ in range(max_reflections_amount):
+        if hit_element_ids.size == 0:
+            break
+
+        incoming_directions = ray_directions[hit_ray_ids]
+        hit_normals = element_normals[hit_element_ids]
+        hit_points += RAY_DISPLACEMENT * rays.reflection_side_normals(
+            incoming_directions, hit_normals
+        )
+
+        if diffuse_fraction_by_element is None:
+            ray_directions = rays.reflected_rays(incoming_directions, hit_normals)
+        else:
+            ray_directions = rays.scattered_rays(
+                incoming_directions,
+                hit_normals,
+                diffuse_fraction_by_element[hit_element_ids],
+                rng,
+            )
+        ray_row_ids = ray_row_ids[hit_ray_ids]
+        ray_weights = reflected_weights
 
         if DEBUG_VISUALIZATION_ENABLED:
-            visualization.view_raycast(ray_origins, ray_directions, mesh, element_id)
+            visualization.view_raycast(
+                hit_points, ray_directions, mesh, block_emitters[0]
+            )
 
-        hit_element_ids, hit_ray_ids, hit_points = mesh.ray.intersects_id(
-            ray_origins, ray_directions, return_locations=True, multiple_hits=False
+        hit_element_ids, hit_ray_ids, hit_points = ray_backend.intersects_id(
+            hit_points, ray_directions
         )
         (
             hit_points,
             hit_ray_ids,
             hit_element_ids,
+            reflected_weights,
+            absorbed_ray_ids,
+            absorbed_element_ids,
+            absorbed_weights,
+        ) = _absorb_hits(
+            reflection_mode,
+            absorptance_by_element,
+            ray_weights,
+            hit_points,
+            hit_ray_ids,
+            hit_element_ids,
+            rng,
+        )
+        _accumulate_absorbed_rays(
+            absorbed_hits,
+            ray_row_ids,
+            absorbed_ray_ids,
             absorbed_element_ids,
-        ) = _filter_reflected_rays_by_element_absorptance(
-            absorptance_by_element, hit_points, hit_ray_ids, hit_element_ids
+            element_amount,
+            absorbed_weights,
         )
 
-        for absorbed_element_id in absorbed_element_ids:
-            view_factors_row[absorbed_element_id] += 1
+    return absorbed_hits
 
-        # Reflexions
-        for _ in range(max_reflections_amount):
-            if hit_element_ids.size == 0:
-                break
 
-            hit_points += RAY_DISPLACEMENT * element_normals[hit_element_ids]
+def _analytic_direct_hits(
+    mesh,
+    ray_backend,
+    block_emitters,
+    direct_hits,
+    hit_ids,
+    hit_counts,
+    rows_ray_amounts,
+    absorptance_by_element,
+    two_sides_emission_by_element,
+    clusters,
+):
+    """
+    Receives a trimesh mesh object, its ray backend, the elements of a block of
+    emitters, the absorbed hits of the direct emission, the absorbed hit ids and counts of the block, the
+    amount of rays casted by each row, the material properties by element and the
+    element clusters of the mesh.
+    Finds the pairs that are fully visible among the elements in front of each
+    emitter, whether rays hit them or not, replaces their direct hit counts by the
+    expected counts given by their analytic view factors, and returns the hit ids
+    and (fractional) counts.
+    """
+    element_amount = mesh_ops.element_amount(mesh)
+    rows, receiver_ids = culling.front_pairs(
+        mesh,
+        block_emitters,
+        two_sides_emission_by_element[block_emitters],
+        clusters,
+    )
+    emitted_rows = rows_ray_amounts[rows] > 0
+    rows = rows[emitted_rows]
+    receiver_ids = receiver_ids[emitted_rows]
+    emitter_ids = block_emitters[rows]
+    two_sides_emission = two_sides_emission_by_element[emitter_ids]
+    visible = view_factors_analytic.fully_visible_pairs(
+        mesh,
+        emitter_ids,
+        receiver_ids,
+        two_sides_emission,
+        RAY_DISPLACEMENT,
+        ray_backend,
+    )
 
-            ray_directions = rays.reflected_rays(
-                ray_directions[hit_ray_ids], element_normals[hit_element_ids]
-            )
+    analytic_values = view_factors_analytic.triangle_view_factors(
+        mesh.triangles[emitter_ids[visible]], mesh.triangles[receiver_ids[visible]]
+    )
+    analytic_values[two_sides_emission[visible]] /= 2
+    expected_counts = (
+        analytic_values
+        * absorptance_by_element[receiver_ids[visible]]
+        * rows_ray_amounts[rows[visible]]
+    )
+    visible_ids = rows[visible] * element_amount + receiver_ids[visible]
 
-            if DEBUG_VISUALIZATION_ENABLED:
-                visualization.view_raycast(
-                    ray_origins, ray_directions, mesh, element_id
-                )
+    direct_ids, direct_counts, _ = _hit_counts(
+        direct_hits, len(rows_ray_amounts), element_amount
+    )
+    visible_direct = np.isin(direct_ids, visible_ids)
+    hit_ids, hit_positions = np.unique(
+        np.concatenate((hit_ids, visible_ids, direct_ids[visible_direct])),
+        return_inverse=True,
+    )
+    hit_counts = np.bincount(
+        hit_positions,
+        weights=np.concatenate(
+            (hit_counts, expected_counts, -direct_counts[visible_direct])
+        ),
+        minlength=len(hit_ids),
+    )
+    return hit_ids, hit_counts
 
-            hit_element_ids, hit_ray_ids, hit_points = mesh.ray.intersects_id(
-                hit_points, ray_directions, return_locations=True, multiple_hits=False
-            )
-            (
-                hit_points,
-                hit_ray_ids,
-                hit_element_ids,
-                absorbed_element_ids,
-            ) = _filter_reflected_rays_by_element_absorptance(
-                absorptance_by_element, hit_points, hit_ray_ids, hit_element_ids
-            )
 
-            for absorbed_element_id in absorbed_element_ids:
-                view_factors_row[absorbed_element_id] += 1
+def _element_element_block(
+    mesh,
+    ray_backend,
+    block_start,
+    block_stop,
+    emitters,
+    absorptance_by_element,
+    two_sides_emission_by_element,
+    ray_amount,
+    max_reflections_amount,
+    seed,
+    threshold,
+    tolerance,
+    max_ray_amount,
+    sampling_method=sampling.RANDOM,
+    cosine_weighted=False,
+    analytic_direct=False,
+    clusters=None,
+    culling_enabled=True,
+    reflection_mode=SAMPLED_REFLECTIONS,
+    diffuse_fraction_by_element=None,
+):
+    """
+    Receives a trimesh mesh object, its ray backend, a block [block_start, block_stop)
+    of the emitting elements, the emitting elements, the material properties by element and the ray casting parameters.
+    Casts the rays of every emitting element of the block together and returns
+    the view factors rows of the block as a CSR matrix and the standard error of
+    each row. If a tolerance is given, rays are casted in batches of ray_amount
+    rays per row until the row standard error is lower than tolerance or
+    max_ray_amount rays were casted. If analytic_direct is true, the direct
+    component of the fully visible pairs is computed analytically, finding the pairs
+    with the element clusters. If the clusters are given and culling is enabled,
+    emitters that see nothing are skipped and emitted rays are culled against the
+    potentially visible bounding box of their emitter.
+    Reflections are traced with reflection_mode and diffuse_fraction_by_element (see
+    _trace_element_rays).
+    """
+    rng = _block_random_generator(seed, ELEMENT_ELEMENT_SEED_TAG, block_start)
+    element_amount = mesh_ops.element_amount(mesh)
+    block_emitters = emitters[block_start:block_stop]
+    rows_amount = block_stop - block_start
+    rows_ray_amounts = np.zeros(rows_amount)
+    active_rows = np.arange(rows_amount)
+    visible_bounds = None
+    if clusters is not None and culling_enabled:
+        visible_bounds = culling.potentially_visible_bounds(
+            mesh,
+            block_emitters,
+            two_sides_emission_by_element[block_emitters],
+            clusters,
+        )
+        active_rows = np.flatnonzero(culling.sees_something(visible_bounds))
+    hit_ids = np.zeros(0, dtype=int)
+    hit_counts = np.zeros(0, dtype=int)
+    rows_errors = np.zeros(rows_amount)
+    absorbed_hits = []
+    direct_hits = []
+
+    while active_rows.size > 0:
+        traced_hits = _trace_element_rays(
+            mesh,
+            ray_backend,
+            block_emitters,
+            active_rows,
+            ray_amount,
+            absorptance_by_element,
+            two_sides_emission_by_element,
+            max_reflections_amount,
+            rng,
+            sampling_method,
+            cosine_weighted,
+            visible_bounds,
+            reflection_mode,
+            diffuse_fraction_by_element,
+        )
+        direct_hits.append(traced_hits[0])
+        absorbed_hits += traced_hits
+        rows_ray_amounts[active_rows] += ray_amount
+        hit_ids, hit_counts, hit_squares = _hit_counts(
+            absorbed_hits, rows_amount, element_amount
+        )
+        rows_errors = _rows_standard_errors(
+            hit_ids, hit_counts, hit_squares, rows_ray_amounts, element_amount
+        )
+        if tolerance is None:
+            break
+        active_rows = np.flatnonzero(
+            (rows_errors > tolerance) & (rows_ray_amounts < max_ray_amount)
+        )
+
+    if analytic_direct and direct_hits:
+        hit_ids, hit_counts = _analytic_direct_hits(
+            mesh,
+            ray_backend,
+            block_emitters,
+            direct_hits,
+            hit_ids,
+            hit_counts,
+            rows_ray_amounts,
+            absorptance_by_element,
+            two_sides_emission_by_element,
+            clusters,
+        )
+
+    return (
+        _sparse_rows(hit_ids, hit_counts, rows_ray_amounts, element_amount, threshold),
+        rows_errors,
+    )
+
 
-        view_factors_row /= ray_amount
-        view_factors[element_id] = view_factors_row
+def _element_block_name(block_start):
+    return f"element_block_{block_start}"
 
+
+def element_element(
+    mesh,
+    absorptance_by_element,
+    two_sides_emission_by_element,
+    ray_amount,
+    max_reflections_amount,
+    block_size=ELEMENT_BLOCK_SIZE,
+    pool=None,
+    seed=None,
+    threshold=0,
+    sparse_output=False,
+    tolerance=None,
+    max_ray_amount=None,
+    return_errors=False,
+    sampling_method=sampling.RANDOM,
+    cosine_weighted=False,
+    emitters=None,
+    analytic_direct=False,
+    culling_enabled=False,
+    rows_writer=None,
+    checkpoint=None,
+    reflection_mode=SAMPLED_REFLECTIONS,
+    diffuse_fraction_by_element=None,
+):
+    """
+    Receives a trimesh mesh object, a function that returns the material properties of an element,
+    the amount of rays to be casted, the maximum amount of reflections and a boolean that
+    indicates if the element emits light internally.
+    Emitting elements are processed in blocks of block_size elements whose rays are
+    traced together, so memory grows with block_size * ray_amount. Optionally receives
+    a worker pool to split the blocks across processes and the seed of the random generators.
+    Rows are accumulated sparsely and view factors lower than threshold are dropped.
+    If a tolerance is given, each emitter keeps casting batches of ray_amount rays until
+    the maximum standard error of its row is lower than tolerance or max_ray_amount rays
+    (ten times ray_amount by default) were casted.
+    Emission rays are sampled with sampling_method (random, stratified, sobol or halton),
+    uniformly over the emitting hemisphere or cosine weighted if cosine_weighted is true.
+    If emitters is given, only the rows of those elements are traced, in the given order.
+    If analytic_direct is true, the direct (not reflected) view factors of the pairs of
+    elements that are fully visible are computed analytically instead of counting rays,
+    which requires cosine weighted emission.
+    If culling_enabled is true, a coarse hierarchy of element clusters is used to find the
+    elements each emitter may see, so emitters that see nothing (i.e. facing open space)
+    are skipped and rays that can't hit anything are not casted.
+    If a rows writer is given (see serializer.ElementRowsWriter), the rows of each block
+    are written as soon as the block finishes instead of being kept in memory, and no
+    matrix is returned (None is returned in its place).
+    If a checkpoint is given (see view_factors_checkpoint), the rows of each block are
+    stored in it as soon as the block finishes and blocks already stored are loaded
+    instead of traced.
+    Reflections are traced with reflection_mode: sampled (each hit is absorbed or
+    reflected with probability given by the absorptance) or weighted (rays carry a
+    weight that each hit partially absorbs and are terminated by Russian roulette).
+    Reflections are specular unless diffuse_fraction_by_element is given, in which case
+    each reflection is diffuse (lambertian) with probability given by the diffuse
+    fraction of the hit element.
+    Finds the view factors of the elements of the mesh with the other elements and returns
+    a matrix of the view factors, as a CSR matrix if sparse_output is true or as a dense
+    array otherwise. If return_errors is true it also returns the achieved standard error
+    of each row.
+    """
+    element_amount = mesh_ops.element_amount(mesh)
+    pool = pool or parallel.WorkerPool(mesh)
+    seed = _new_seed() if seed is None else seed
+    if max_ray_amount is None:
+        max_ray_amount = 10 * ray_amount
+    if emitters is None:
+        emitters = np.arange(element_amount)
+    if reflection_mode not in REFLECTION_MODES:
+        raise ValueError(f"Unknown reflection mode {reflection_mode}")
+    if analytic_direct and not cosine_weighted:
+        raise Exception("Analytic view factors require cosine weighted emission rays")
+    clusters = None
+    if culling_enabled or analytic_direct:
+        clusters = culling.element_clusters(mesh)
+
+    blocks = parallel.blocks(len(emitters), block_size)
+    stored_blocks = set()
+    if checkpoint is not None:
+        stored_blocks = {
+            block
+            for block in blocks
+            if checkpoint.contains(_element_block_name(block[0]))
+        }
+    traced_blocks = [block for block in blocks if block not in stored_blocks]
+    traced_view_factors = pool.map(
+        _element_element_block,
+        traced_blocks,
+        emitters=emitters,
+        absorptance_by_element=absorptance_by_element,
+        two_sides_emission_by_element=two_sides_emission_by_element,
+        ray_amount=ray_amount,
+        max_reflections_amount=max_reflections_amount,
+        seed=seed,
+        threshold=threshold,
+        tolerance=tolerance,
+        max_ray_amount=max_ray_amount,
+        sampling_method=sampling_method,
+        cosine_weighted=cosine_weighted,
+        analytic_direct=analytic_direct,
+        clusters=clusters,
+        culling_enabled=culling_enabled,
+        reflection_mode=reflection_mode,
+        diffuse_fraction_by_element=diffuse_fraction_by_element,
+    )
+    blocks_rows = []
+    blocks_errors = []
+    for block in blocks:
+        block_name = _element_block_name(block[0])
+        if block in stored_blocks:
+            block_rows, block_errors = checkpoint.load(block_name)
+        else:
+            block_rows, block_errors = next(traced_view_factors)
+            if checkpoint is not None:
+                checkpoint.store(block_name, [block_rows, block_errors])
+        blocks_errors.append(block_errors)
+        if rows_writer is None:
+            blocks_rows.append(block_rows)
+        else:
+            rows_writer.write_rows(block_rows)
+
+    view_factors = None
+    if rows_writer is None:
+        view_factors = sparse.vstack(blocks_rows, format="csr")
+        if not sparse_output:
+            view_factors = view_factors.toarray()
+    if return_errors:
+        return view_factors, np.concatenate(blocks_errors)
     return view_factors
@@ -0,0 +1,117 @@
+import numpy as np
+from . import ray_backends
+
+QUADRATURE_ORDER = 8
+PAIRS_CHUNK_SIZE = 1024
+# Shadow rays join the centroids and the vertices of both elements moved this
+# fraction of the way towards their centroids.
+SHADOW_POINTS_SHRINK = 0.2
+# Minimum distance of the vertices of an element to the plane of the other one,
+# relative to the mesh bounding box diagonal.
+PLANE_TOLERANCE = 1e-6
+
+
+def triangle_view_factors(emitters, receivers, quadrature_order=QUADRATURE_ORDER):
+    """
+    Receives two arrays of triangles (P, 3, 3), the emitters and the receivers,
+    and optionally the Gauss-Legendre order used on each edge.
+    Returns the view factor from each emitter to its receiver, assuming they are
+    fully visible, computed with the contour integral
+    A_i F_ij = 1 / (2 pi) * sum_edges of the double integral of ln(r) ds_i . ds_j.
+    Pairs of elements that touch are not supported (the integrand is singular).
+    """
+    nodes, weights = np.polynomial.legendre.leggauss(quadrature_order)
+    nodes = (nodes + 1) / 2
+    weights = weights / 2
+    view_factors = np.empty(len(emitters))
+
+    for chunk_start in range(0, len(emitters), PAIRS_CHUNK_SIZE):
+        chunk = slice(chunk_start, chunk_start + PAIRS_CHUNK_SIZE)
+        emitter_edges = np.roll(emitters[chunk], -1, axis=1) - emitters[chunk]
+        receiver_edges = np.roll(receivers[chunk], -1, axis=1) - receivers[chunk]
+        # (pairs, edges, nodes, coordinates)
+        emitter_points = (
+            emitters[chunk][:, :, np.newaxis]
+            + nodes[:, np.newaxis] * emitter_edges[:, :, np.newaxis]
+        )
+        receiver_points = (
+            receivers[chunk][:, :, np.newaxis]
+            + nodes[:, np.newaxis] * receiver_edges[:, :, np.newaxis]
+        )
+        # (pairs, emitter edges, receiver edges, emitter nodes, receiver nodes, coordinates)
+        differences = (
+            emitter_points[:, :, np.newaxis, :, np.newaxis]
+            - receiver_points[:, np.newaxis, :, np.newaxis]
+        )
+        log_distances = np.log(np.einsum("...k,...k->...", differences, differences)) / 2
+        edges_dot = np.einsum("pak,pbk->pab", emitter_edges, receiver_edges)
+        contour_integrals = np.einsum(
+            "pabmn,m,n,pab->p", log_distances, weights, weights, edges_dot
+        )
+        emitter_areas = (
+            np.linalg.norm(np.cross(emitter_edges[:, 0], emitter_edges[:, 1]), axis=1) / 2
+        )
+        view_factors[chunk] = np.abs(contour_integrals) / (2 * np.pi * emitter_areas)
+    return view_factors
+
+
+def _plane_distances(points, plane_points, plane_normals):
+    return np.einsum("pvk,pk->pv", points - plane_points[:, np.newaxis], plane_normals)
+
+
+def fully_visible_pairs(
+    mesh,
+    emitter_ids,
+    receiver_ids,
+    two_sides_emission,
+    ray_displacement,
+    ray_backend=None,
+):
+    """
+    Receives a trimesh mesh object, the element ids of the emitter and receiver of
+    each pair, whether each emitter emits from both sides, the displacement
+    of the ray origins and optionally the ray backend of the mesh.
+    Returns a mask of the pairs whose receiver is entirely on the emitting side
+    of the emitter plane, whose emitter is entirely on one side of the receiver
+    plane and that are joined by a few unobstructed shadow rays.
+    """
+    triangles = mesh.triangles
+    centers = mesh.triangles_center
+    normals = mesh.face_normals
+    tolerance = PLANE_TOLERANCE * mesh.scale
+
+    receiver_distances = _plane_distances(
+        triangles[receiver_ids], centers[emitter_ids], normals[emitter_ids]
+    )
+    emitter_distances = _plane_distances(
+        triangles[emitter_ids], centers[receiver_ids], normals[receiver_ids]
+    )
+    in_front = np.all(receiver_distances > tolerance, axis=1)
+    behind = np.all(receiver_distances < -tolerance, axis=1)
+    visible = (in_front | (behind & two_sides_emission)) & (
+        np.all(emitter_distances > tolerance, axis=1)
+        | np.all(emitter_distances < -tolerance, axis=1)
+    )
+
+    candidate_ids = np.flatnonzero(visible)
+    if candidate_ids.size == 0:
+        return visible
+
+    def shadow_points(element_ids):
+        element_centers = centers[element_ids][:, np.newaxis]
+        vertices = element_centers + (1 - SHADOW_POINTS_SHRINK) * (
+            triangles[element_ids] - element_centers
+        )
+        return np.concatenate((element_centers, vertices), axis=1).reshape((-1, 3))
+
+    ray_origins = shadow_points(emitter_ids[candidate_ids])
+    ray_targets = shadow_points(receiver_ids[candidate_ids])
+    ray_directions = ray_targets - ray_origins
+    ray_directions /= np.linalg.norm(ray_directions, axis=1)[:, np.newaxis]
+    ray_backend = ray_backend or ray_backends.create_ray_backend(mesh)
+    first_hits = ray_backend.intersects_first(
+        ray_origins + ray_directions * ray_displacement, ray_directions
+    )
+    reaches_receiver = first_hits == np.repeat(receiver_ids[candidate_ids], 4)
+    visible[candidate_ids] = np.all(reaches_receiver.reshape((-1, 4)), axis=1)
+    return visible
@@ -0,0 +1,161 @@
+import os
+import hashlib
+import numpy as np
+from scipy import sparse
+
+CACHE_DIRECTORY_NAME = ".view_factors_cache"
+DEFAULT_MAX_SIZE_MB = 2048
+_SPARSE_SUFFIXES = ("data", "indices", "indptr", "shape")
+
+
+def fingerprint(*values):
+    """
+    Receives any amount of values (arrays, sparse matrices, numbers, strings,
+    lists or None) and returns a hexadecimal hash of their content.
+    Numbers and strings are hashed in a fixed form, so python and numpy scalars
+    of the same value hash the same regardless of the numpy version.
+    """
+    digest = hashlib.sha256()
+    for value in values:
+        if sparse.issparse(value):
+            value = sparse.csr_matrix(value)
+            value = [value.shape, value.data, value.indices, value.indptr]
+        if isinstance(value, (list, tuple)):
+            digest.update(b"[")
+            digest.update(fingerprint(*value).encode())
+            digest.update(b"]")
+        elif isinstance(value, np.ndarray):
+            value = np.ascontiguousarray(value)
+            digest.update(f"{value.dtype.str}{value.shape}".encode())
+            digest.update(value.tobytes())
+        elif isinstance(value, (bool, np.bool_)):
+            digest.update(f"b{bool(value)}".encode())
+        elif isinstance(value, (int, np.integer)):
+            digest.update(f"i{int(value)}".encode())
+        elif isinstance(value, (float, np.floating)):
+            digest.update(f"f{float(value).hex()}".encode())
+        elif isinstance(value, str):
+            digest.update(f"s{len(value)}:{value}".encode())
+        else:
+            digest.update(repr(value).encode())
+        digest.update(b"|")
+    return digest.hexdigest()
+
+
+def mesh_fingerprint(mesh):
+    """
+    Receives a trimesh mesh object and returns the hash of its vertices and faces.
+    """
+    return fingerprint(np.asarray(mesh.vertices), np.asarray(mesh.faces))
+
+
+class ViewFactorsCache:
+    """
+    Implements a content addressed on-disk cache of computed view factors.
+    Each entry is a npz file named after its key that holds a list of arrays
+    or sparse matrices. When the cache grows over its maximum size the least
+    recently used entries are evicted. The size of the cache is tracked as entries
+    are stored, so the directory is only scanned when it may be over its maximum.
+    """
+
+    def __init__(self, directory, max_size_mb=DEFAULT_MAX_SIZE_MB):
+        """
+        Receives the directory where entries are stored and its maximum size in MB.
+        """
+        self.directory = directory
+        self.max_size = max_size_mb * 1024 * 1024
+        self.size = None
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _entry_path(self, key):
+        return os.path.join(self.directory, f"{key}.npz")
+
+    def contains(self, key):
+        """
+        Receives a key and returns whether there is an entry stored under it.
+        """
+        return os.path.exists(self._entry_path(key))
+
+    def load(self, key):
+        """
+        Receives a key and returns the list of values stored under it, or None
+        if there is no such entry.
+        """
+        path = self._entry_path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path) as entry:
+                values = _unpack_values(entry)
+        except (OSError, ValueError, KeyError):
+            os.remove(path)
+            return None
+        os.utime(path)
+        return values
+
+    def store(self, key, values):
+        """
+        Receives a key and a list of arrays or sparse matrices and stores them.
+        """
+        path = self._entry_path(key)
+        temporary_path = f"{path}.tmp.npz"
+        np.savez(temporary_path, **_pack_values(values))
+        replaced_size = os.path.getsize(path) if os.path.exists(path) else 0
+        os.replace(temporary_path, path)
+        if np.isinf(self.max_size):
+            return
+        if self.size is None:
+            self._evict()
+            return
+        self.size += os.path.getsize(path) - replaced_size
+        if self.size > self.max_size:
+            self._evict()
+
+    def _evict(self):
+        """
+        Scans the directory, removes the least recently used entries until the
+        cache fits its maximum size and updates the tracked size.
+        """
+        entries = []
+        for filename in os.listdir(self.directory):
+            path = os.path.join(self.directory, filename)
+            if filename.endswith(".npz") and os.path.isfile(path):
+                entries.append((os.path.getmtime(path), os.path.getsize(path), path))
+        entries.sort()
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, path in entries[:-1]:
+            if total_size <= self.max_size:
+                break
+            os.remove(path)
+            total_size -= size
+        self.size = total_size
+
+
+def _pack_values(values):
+    packed_values = {}
+    for index, value in enumerate(values):
+        if sparse.issparse(value):
+            value = sparse.csr_matrix(value)
+            packed_values[f"sparse_{index}_data"] = value.data
+            packed_values[f"sparse_{index}_indices"] = value.indices
+            packed_values[f"sparse_{index}_indptr"] = value.indptr
+            packed_values[f"sparse_{index}_shape"] = np.array(value.shape)
+        else:
+            packed_values[f"dense_{index}"] = np.asarray(value)
+    return packed_values
+
+
+def _unpack_values(entry):
+    values = {}
+    for name in entry.files:
+        kind, index, *suffix = name.split("_")
+        if kind == "dense":
+            values[int(index)] = entry[name]
+        elif suffix[0] == _SPARSE_SUFFIXES[0]:
+            data, indices, indptr, shape = (
+                entry[f"sparse_{index}_{suffix}"] for suffix in _SPARSE_SUFFIXES
+            )
+            values[int(index)] = sparse.csr_matrix(
+                (data, indices, indptr), shape=tuple(shape)
+            )
+    return [values[index] for index in range(len(values))]
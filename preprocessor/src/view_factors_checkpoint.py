@@ -0,0 +1,88 @@
+import os
+import json
+import shutil
+import numpy as np
+from .view_factors_cache import ViewFactorsCache
+
+CHECKPOINT_DIRECTORY_NAME = ".view_factors_checkpoint"
+MANIFEST_FILE_NAME = "checkpoint.json"
+
+
+class ViewFactorsCheckpoint:
+    """
+    Implements the checkpoint of a process run. The results of every finished block
+    of element rows and orbit division are stored in a directory as soon as they are
+    computed, along with the fingerprint of the run inputs and the run seed. Random
+    generators are seeded by the run seed, the stage, the orbit division and the
+    block, so the seed is the whole random state and a resumed run produces the same result as an
+    uninterrupted one.
+    """
+
+    def __init__(self, directory, run_fingerprint, seed, resume=False):
+        """
+        Receives the checkpoint directory, the fingerprint of the run inputs, the
+        seed of the run and whether to resume the checkpoint found in the directory.
+        A checkpoint created with different inputs can't be resumed. Without resume,
+        any previous checkpoint is discarded.
+        """
+        self.directory = directory
+        self.manifest_path = os.path.join(directory, MANIFEST_FILE_NAME)
+        manifest = self._read_manifest()
+        self.resumed = resume and manifest is not None
+        if self.resumed:
+            if manifest["run_fingerprint"] != run_fingerprint:
+                raise Exception(
+                    "The checkpoint was created with different inputs, "
+                    "run without --resume to start over"
+                )
+            self.seed = manifest["seed"]
+        else:
+            shutil.rmtree(directory, ignore_errors=True)
+            self.seed = seed
+        self.entries = ViewFactorsCache(directory, max_size_mb=np.inf)
+        if not self.resumed:
+            with open(self.manifest_path, "w") as manifest_file:
+                json.dump(
+                    {"run_fingerprint": run_fingerprint, "seed": seed}, manifest_file
+                )
+
+    def _read_manifest(self):
+        if not os.path.exists(self.manifest_path):
+            return None
+        with open(self.manifest_path) as manifest_file:
+            return json.load(manifest_file)
+
+    def contains(self, name):
+        """
+        Receives the name of a result and returns whether it is stored.
+        """
+        return self.entries.contains(name)
+
+    def load(self, name):
+        """
+        Receives the name of a result and returns its stored list of values, or
+        None if it wasn't stored.
+        """
+        return self.entries.load(name)
+
+    def store(self, name, values):
+        """
+        Receives the name of a result and its list of arrays or sparse matrices
+        and stores them.
+        """
+        self.entries.store(name, values)
+
+    def stored_amount(self, prefix):
+        """
+        Returns the amount of stored results whose name starts with prefix.
+        """
+        return sum(
+            filename.startswith(prefix) and filename.endswith(".npz")
+            for filename in os.listdir(self.directory)
+        )
+
+    def remove(self):
+        """
+        Deletes the checkpoint once the run finished.
+        """
+        shutil.rmtree(self.directory, ignore_errors=True)
@@ -3,7 +3,7 @@ import os
 
 ICOSPHERE_GEOMETRY_PATH = "./test/models/icosphere.vtk"
 ICOSPHERE_PROPERTIES_PATH = "./test/models/icosphere.json"
-ICOSPHERE_OUTPUT_PROPERTIES_PATH = "./test/icosphere_output.json"
+ICOSPHERE_OUTPUT_PROPERTIES_FILE_NAME = "icosphere_output.json"
 ICOSPHERE_EXPECTED_OUTPUT_PROPERTIES_PATH = (
     "./test/models/expected_icosphere_output.json"
 )
@@ -0,0 +1,88 @@
+from test_config import *
+from src import culling, vtk_io, view_factors
+import numpy as np
+import trimesh
+
+
+def _annulus():
+    mesh = trimesh.creation.annulus(0.5, 1, 1, sections=16)
+    element_amount = len(mesh.faces)
+    return mesh, np.ones(element_amount), np.zeros(element_amount, dtype=bool)
+
+
+def test_element_clusters_cover_every_element():
+    mesh = vtk_io.load_vtk(ICOSPHERE_GEOMETRY_PATH)
+    clusters, bounds = culling.element_clusters(mesh, cluster_size=8)
+    element_ids = np.sort(np.concatenate(clusters))
+    assert np.array_equal(element_ids, np.arange(len(mesh.faces)))
+    for cluster, cluster_bounds in zip(clusters, bounds):
+        assert len(cluster) <= 8
+        assert np.all(mesh.triangles[cluster] >= cluster_bounds[0])
+        assert np.all(mesh.triangles[cluster] <= cluster_bounds[1])
+
+
+def test_convex_mesh_emitters_see_nothing():
+    mesh = vtk_io.load_vtk(ICOSPHERE_GEOMETRY_PATH)
+    element_ids = np.arange(len(mesh.faces))
+    visible_bounds = culling.potentially_visible_bounds(
+        mesh,
+        element_ids,
+        np.zeros(len(element_ids), dtype=bool),
+        culling.element_clusters(mesh, cluster_size=8),
+    )
+    assert not np.any(culling.sees_something(visible_bounds))
+
+
+def test_two_sides_emitters_see_the_other_side():
+    mesh = vtk_io.load_vtk(ICOSPHERE_GEOMETRY_PATH)
+    element_ids = np.arange(len(mesh.faces))
+    visible_bounds = culling.potentially_visible_bounds(
+        mesh,
+        element_ids,
+        np.ones(len(element_ids), dtype=bool),
+        culling.element_clusters(mesh, cluster_size=8),
+    )
+    assert np.all(culling.sees_something(visible_bounds))
+
+
+def test_rays_hit_bounds():
+    bounds = np.array([[[1, -1, -1], [2, 1, 1]]] * 4, dtype=float)
+    bounds[3] = [[np.inf] * 3, [-np.inf] * 3]
+    ray_origins = np.zeros((4, 3))
+    ray_directions = np.array([[1, 0, 0], [-1, 0, 0], [0, 1, 0], [1, 0, 0]], dtype=float)
+    assert np.array_equal(
+        culling.rays_hit_bounds(ray_origins, ray_directions, bounds),
+        [True, False, False, False],
+    )
+
+
+def test_element_element_culling_does_not_change_view_factors():
+    mesh, absorptance, two_sides_emission = _annulus()
+    view_factors_arguments = [mesh, absorptance, two_sides_emission, 500, 0]
+    element_element_view_factors = view_factors.element_element(
+        *view_factors_arguments, block_size=1, seed=7
+    )
+    culled_element_element_view_factors = view_factors.element_element(
+        *view_factors_arguments, block_size=1, seed=7, culling_enabled=True
+    )
+    # Culling only drops the grazing rays that numerically hit their own emitter
+    off_diagonal = ~np.eye(len(mesh.faces), dtype=bool)
+    assert np.any(element_element_view_factors > 0)
+    assert np.array_equal(
+        element_element_view_factors[off_diagonal],
+        culled_element_element_view_factors[off_diagonal],
+    )
+
+
+def test_element_element_culling_of_convex_mesh():
+    mesh = vtk_io.load_vtk(ICOSPHERE_GEOMETRY_PATH)
+    element_amount = len(mesh.faces)
+    element_element_view_factors = view_factors.element_element(
+        mesh,
+        np.ones(element_amount),
+        np.zeros(element_amount, dtype=bool),
+        100,
+        5,
+        culling_enabled=True,
+    )
+    assert not np.any(element_element_view_factors)
@@ -23,3 +23,12 @@ def test_generate_random_points_in_elements():
     points = elements.random_points_in_element(element0, 10000)
     for point in points:
         assert elements.is_point_in_element(element0, point) == True
+
+
+def test_generate_random_points_in_many_elements():
+    points = elements.random_points_in_elements(test_element_array, 1000)
+    assert points.shape == (2000, 3)
+    for point in points[:1000]:
+        assert elements.is_point_in_element(element0, point) == True
+    for point in points[1000:]:
+        assert elements.is_point_in_element(element1, point) == True
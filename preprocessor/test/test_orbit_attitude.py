@@ -0,0 +1,75 @@
+from test_config import *
+from src import attitude, mesh_ops, view_factors, vtk_io
+import numpy as np
+import pytest
+
+
+def _circular_orbit(steps_amount):
+    elapsed_secs = np.linspace(0, 5400, steps_amount, endpoint=False)
+    angles = 2 * np.pi * elapsed_secs / 5400
+    sat_position = 7000 * np.stack(
+        (np.cos(angles), np.sin(angles), np.zeros(steps_amount)), axis=1
+    )
+    return sat_position, elapsed_secs
+
+
+def test_sun_pointing_keeps_sun_on_mesh_z():
+    sat_position, elapsed_secs = _circular_orbit(12)
+    sun_direction = np.array([1, 2, 3]) / np.sqrt(14)
+    sun_directions, earth_directions = attitude.division_directions(
+        attitude.SUN_POINTING, sun_direction, sat_position, elapsed_secs, [0, 3, 6]
+    )
+    assert np.allclose(sun_directions, [0, 0, 1])
+    rotation = attitude.look_at_rotation(sun_direction)
+    assert np.allclose(
+        earth_directions @ rotation.T, -sat_position[[0, 3, 6]] / 7000
+    )
+
+
+def test_nadir_pointing_keeps_earth_on_mesh_z():
+    sat_position, elapsed_secs = _circular_orbit(12)
+    sun_direction = np.array([0, 1, 0])
+    sun_directions, earth_directions = attitude.division_directions(
+        attitude.NADIR_POINTING, sun_direction, sat_position, elapsed_secs, [0, 3]
+    )
+    assert np.allclose(earth_directions, [0, 0, 1])
+    # At step 0 the velocity is +y, at step 3 (a quarter of orbit later) it is -x.
+    assert np.allclose(sun_directions, [[1, 0, 0], [0, 0, -1]], atol=1e-9)
+
+
+def test_inertial_attitude_keeps_directions():
+    sat_position, elapsed_secs = _circular_orbit(12)
+    sun_direction = np.array([0, 0, 1])
+    sun_directions, earth_directions = attitude.division_directions(
+        attitude.INERTIAL, sun_direction, sat_position, elapsed_secs, [0, 6]
+    )
+    assert np.allclose(sun_directions, sun_direction)
+    assert np.allclose(earth_directions, [[-1, 0, 0], [1, 0, 0]])
+
+
+def test_unknown_attitude():
+    with pytest.raises(ValueError):
+        attitude.body_rotations("unknown", np.array([0, 0, 1]), np.zeros((1, 3)), None)
+
+
+def test_body_frame_view_factors_match_rotated_mesh():
+    sun_direction = np.array([1, 2, 0.5]) / np.sqrt(5.25)
+    earth_direction = np.array([0, -1, 0])
+    mesh = vtk_io.load_vtk(ICOSPHERE_GEOMETRY_PATH)
+    rotation = attitude.look_at_rotation(sun_direction)[np.newaxis]
+    body_sun_direction = attitude.to_body_frame(rotation, sun_direction)[0]
+    body_earth_direction = attitude.to_body_frame(rotation, earth_direction)[0]
+    body_view_factors = view_factors.element_earth(
+        mesh, body_earth_direction, body_sun_direction, 0, 20000, seed=1
+    )
+    body_sun_view_factors = view_factors.element_sun(mesh, body_sun_direction)
+
+    mesh_ops.look_at(mesh, sun_direction)
+    rotated_view_factors = view_factors.element_earth(
+        mesh, earth_direction, sun_direction, 0, 20000, seed=1
+    )
+    for body_values, rotated_values in zip(body_view_factors, rotated_view_factors):
+        assert np.allclose(body_values, rotated_values, atol=0.05)
+    assert np.allclose(
+        body_sun_view_factors, view_factors.element_sun(mesh, sun_direction)
+    )
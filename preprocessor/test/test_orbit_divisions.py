@@ -0,0 +1,68 @@
+from test_config import *
+from src import commands, gmat_parser
+import numpy as np
+
+
+def _loop_division_steps(elapsed_secs, orbit_period, orbit_divisions):
+    # Division selection of the former per step loop, used as reference.
+    division_time = orbit_period / orbit_divisions
+    division_steps = []
+    for step in range(len(elapsed_secs)):
+        target_time = division_time * len(division_steps)
+        if step < len(elapsed_secs) - 1 and not (
+            elapsed_secs[step + 1] > target_time
+            and abs(target_time - elapsed_secs[step])
+            < abs(target_time - elapsed_secs[step + 1])
+        ):
+            continue
+        division_steps.append(step)
+        if len(division_steps) == orbit_divisions:
+            break
+    return division_steps
+
+
+def test_division_steps_match_step_loop():
+    rng = np.random.default_rng(0)
+    for steps_amount, orbit_divisions in [(200, 10), (200, 37), (50, 60), (7, 3)]:
+        elapsed_secs = np.cumsum(rng.uniform(0.5, 60, steps_amount))
+        elapsed_secs -= elapsed_secs[0]
+        orbit_period = elapsed_secs[-1] * rng.uniform(0.8, 1.2)
+        division_steps, division_secs = commands._orbit_division_steps(
+            elapsed_secs, orbit_period, orbit_divisions
+        )
+        assert list(division_steps) == _loop_division_steps(
+            elapsed_secs, orbit_period, orbit_divisions
+        )
+        assert np.array_equal(division_secs, elapsed_secs[division_steps])
+
+
+def test_division_steps_of_regular_report():
+    elapsed_secs = np.arange(0, 6000, 10.0)
+    division_steps, division_secs = commands._orbit_division_steps(
+        elapsed_secs, 6000, 8
+    )
+    assert np.array_equal(division_steps, np.arange(8) * 75)
+    assert np.array_equal(division_secs, np.arange(8) * 750.0)
+
+
+def test_division_steps_with_phase_folding():
+    parameters = gmat_parser.parse_report_file(GMAT_REPORT_FILE_PATH)
+    _, orbit_period = gmat_parser.parse_eclipse_locator(
+        GMAT_ECLIPSE_LOCATOR_FILE_PATH, parameters
+    )
+    orbit = gmat_parser.parse_gmat(
+        GMAT_REPORT_FILE_PATH, GMAT_ECLIPSE_LOCATOR_FILE_PATH, all_orbits=True
+    )
+    elapsed_secs = np.array(orbit.elapsed_secs)
+    assert elapsed_secs[-1] > orbit_period
+
+    division_steps, division_secs = commands._orbit_division_steps(
+        elapsed_secs, orbit_period, 40, phase_folding=True
+    )
+    assert np.all(np.diff(division_secs) > 0)
+    assert np.allclose(division_secs, np.mod(elapsed_secs[division_steps], orbit_period))
+    assert np.any(elapsed_secs[division_steps] >= orbit_period)
+    first_orbit_steps, _ = commands._orbit_division_steps(
+        elapsed_secs[elapsed_secs < orbit_period], orbit_period, 40
+    )
+    assert len(division_steps) >= len(first_orbit_steps)
@@ -0,0 +1,72 @@
+from test_config import *
+from src import orbit_interpolation
+import numpy as np
+
+
+def _counted(function, computed):
+    def compute_divisions(division_numbers):
+        computed.extend(division_numbers)
+        return [function(division_number) for division_number in division_numbers]
+
+    return compute_divisions
+
+
+def test_division_angles_follow_earth_and_sun():
+    angles = np.linspace(0, np.pi, 5)
+    earth_directions = np.stack(
+        (np.cos(angles), np.sin(angles), np.zeros(5)), axis=1
+    )
+    sun_directions = np.tile([0, 0, 1.0], (5, 1))
+    assert np.allclose(
+        orbit_interpolation.division_angles(earth_directions, sun_directions), angles
+    )
+    assert np.allclose(
+        orbit_interpolation.division_angles(sun_directions, earth_directions), angles
+    )
+
+
+def test_linear_view_factors_only_compute_anchors():
+    angles = np.linspace(0, 2 * np.pi, 97)
+    computed = []
+    view_factors, errors, computed_divisions = orbit_interpolation.interpolated_divisions(
+        angles,
+        _counted(lambda division: (angles[division] * np.ones(3), np.ones(3)), computed),
+        1e-6,
+        anchors_amount=5,
+    )
+    assert len(computed) == len(set(computed)) == len(computed_divisions) < 10
+    assert np.allclose(view_factors[0], angles[:, np.newaxis] * np.ones(3))
+    assert np.allclose(view_factors[1], 1)
+    assert np.all(errors < 1e-6)
+
+
+def test_sharp_changes_are_refined():
+    angles = np.linspace(0, 2 * np.pi, 201)
+    terminator = np.pi * 0.9
+
+    def division_view_factors(division):
+        values = np.array([np.cos(angles[division]), angles[division] > terminator])
+        return (values, values / 2)
+
+    computed = []
+    view_factors, errors, computed_divisions = orbit_interpolation.interpolated_divisions(
+        angles, _counted(division_view_factors, computed), 0.02
+    )
+    expected = np.array([division_view_factors(division)[0] for division in range(201)])
+    assert len(computed_divisions) < 100
+    assert np.max(np.abs(view_factors[0] - expected)) < 0.05
+    assert np.allclose(view_factors[1], view_factors[0] / 2)
+    step_division = np.searchsorted(angles, terminator, side="right")
+    assert {step_division - 1, step_division} <= set(computed_divisions)
+    assert np.all(errors[computed_divisions] == 0)
+    assert np.all(errors <= 0.02)
+
+
+def test_zero_tolerance_computes_every_division():
+    angles = np.linspace(0, 1, 20)
+    computed = []
+    view_factors, _, computed_divisions = orbit_interpolation.interpolated_divisions(
+        angles, _counted(lambda division: (np.array([angles[division] ** 2]),), computed), 0
+    )
+    assert computed_divisions == list(range(20))
+    assert np.allclose(view_factors[0][:, 0], angles**2)
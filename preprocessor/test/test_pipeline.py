@@ -0,0 +1,64 @@
+from test_config import *
+from src import pipeline, view_factors_cache
+import numpy as np
+
+
+def _counting_pipeline(cache, computations):
+    def double(values):
+        computations.append("double")
+        return [values * 2]
+
+    def add(doubled_values, offset):
+        computations.append("add")
+        return [doubled_values + offset]
+
+    return pipeline.Pipeline(
+        [
+            pipeline.Stage("double", ["values"], ["doubled_values"], double),
+            pipeline.Stage("add", ["doubled_values", "offset"], ["result"], add),
+        ],
+        cache,
+    )
+
+
+def test_pipeline_computes_every_stage():
+    computations = []
+    outputs = _counting_pipeline(None, computations).run(
+        {"values": np.array([1, 2]), "offset": 1}
+    )
+    assert np.array_equal(outputs["result"], [3, 5])
+    assert computations == ["double", "add"]
+
+
+def test_pipeline_only_recomputes_stages_whose_inputs_changed(tmp_path):
+    cache = view_factors_cache.ViewFactorsCache(str(tmp_path))
+    computations = []
+    _counting_pipeline(cache, computations).run({"values": np.array([1, 2]), "offset": 1})
+    computations.clear()
+
+    outputs = _counting_pipeline(cache, computations).run(
+        {"values": np.array([1, 2]), "offset": 2}
+    )
+    assert np.array_equal(outputs["result"], [4, 6])
+    assert computations == ["add"]
+
+    computations.clear()
+    outputs = _counting_pipeline(cache, computations).run(
+        {"values": np.array([1, 3]), "offset": 2}
+    )
+    assert np.array_equal(outputs["result"], [4, 8])
+    assert computations == ["double", "add"]
+
+
+def test_pipeline_uses_given_fingerprints(tmp_path):
+    cache = view_factors_cache.ViewFactorsCache(str(tmp_path))
+    computations = []
+    _counting_pipeline(cache, computations).run(
+        {"values": np.array([1, 2]), "offset": 1}, fingerprints={"values": "a"}
+    )
+    computations.clear()
+    outputs = _counting_pipeline(cache, computations).run(
+        {"values": np.array([5, 5]), "offset": 1}, fingerprints={"values": "a"}
+    )
+    assert np.array_equal(outputs["result"], [3, 5])
+    assert computations == []
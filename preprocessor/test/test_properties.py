@@ -1,6 +1,8 @@
 from test_config import *
 from src import mesh_ops, vtk_io, properties_atlas, vector_math
 import json
+import numpy as np
+import pytest
 
 test_property = {"a": 0, "b": [1, 2, 3]}
 
@@ -23,17 +25,39 @@ def test_properties_loading():
             assert material["color"] == [0, 255, 0, 255]
 
 
-def test_property_dump():
+def test_property_dump(tmp_path):
     mesh = vtk_io.load_vtk(ICOSPHERE_GEOMETRY_PATH)
     properties = properties_atlas.PropertiesAtlas(
         len(mesh.triangles), ICOSPHERE_PROPERTIES_PATH
     )
-    properties.dump(ICOSPHERE_OUTPUT_PROPERTIES_PATH)
+    output_properties_path = tmp_path / ICOSPHERE_OUTPUT_PROPERTIES_FILE_NAME
+    properties.dump(output_properties_path)
 
-    output_properties_file = open(ICOSPHERE_OUTPUT_PROPERTIES_PATH)
+    output_properties_file = open(output_properties_path)
     expected_output_properties_file = open(ICOSPHERE_EXPECTED_OUTPUT_PROPERTIES_PATH)
     output_properties = json.load(output_properties_file)
     expected_output_properties = json.load(expected_output_properties_file)
     assert json.dumps(output_properties, sort_keys=True) == json.dumps(
         expected_output_properties, sort_keys=True
     )
+
+
+def test_properties_diffuse_fraction(tmp_path):
+    with open(ICOSPHERE_PROPERTIES_PATH) as properties_file:
+        properties_json = json.load(properties_file)
+    properties_path = tmp_path / "properties.json"
+    properties_path.write_text(json.dumps(properties_json))
+    properties = properties_atlas.PropertiesAtlas(20, properties_path)
+    assert np.all(properties.diffuse_fraction_by_element == 0)
+
+    materials = properties_json["materials"]["properties"]
+    materials["MaterialA"]["diffuse_fraction"] = 0.25
+    materials["MaterialB"]["specular_fraction"] = 0.75
+    properties_path.write_text(json.dumps(properties_json))
+    properties = properties_atlas.PropertiesAtlas(20, properties_path)
+    assert np.allclose(properties.diffuse_fraction_by_element, 0.25)
+
+    materials["MaterialB"]["diffuse_fraction"] = 0.5
+    properties_path.write_text(json.dumps(properties_json))
+    with pytest.raises(Exception):
+        properties_atlas.PropertiesAtlas(20, properties_path)
@@ -0,0 +1,155 @@
+from test_config import *
+from src import ray_backends, parallel, vector_math, view_factors, vtk_io
+import numpy as np
+import trimesh
+import pytest
+
+
+def _mesh_and_rays(ray_amount):
+    mesh = trimesh.util.concatenate(
+        [
+            trimesh.creation.icosphere(2),
+            trimesh.creation.box().apply_translation([0.3, 0, 0]),
+        ]
+    )
+    rng = np.random.default_rng(0)
+    ray_origins = rng.uniform(-2, 2, (ray_amount, 3))
+    ray_directions = vector_math.random_unit_vectors(ray_amount, rng)
+    return mesh, ray_origins, ray_directions
+
+
+def _assert_backends_agree(backend, reference, ray_origins, ray_directions):
+    first_hits = backend.intersects_first(ray_origins, ray_directions)
+    assert np.array_equal(
+        first_hits, reference.intersects_first(ray_origins, ray_directions)
+    )
+    assert np.array_equal(
+        backend.intersects_any(ray_origins, ray_directions), first_hits >= 0
+    )
+
+    hit_element_ids, hit_ray_ids, hit_points = backend.intersects_id(
+        ray_origins, ray_directions
+    )
+    (
+        reference_hit_element_ids,
+        reference_hit_ray_ids,
+        reference_hit_points,
+    ) = reference.intersects_id(ray_origins, ray_directions)
+    order = np.argsort(hit_ray_ids)
+    reference_order = np.argsort(reference_hit_ray_ids)
+    assert np.array_equal(hit_ray_ids[order], reference_hit_ray_ids[reference_order])
+    assert np.array_equal(
+        hit_element_ids[order], reference_hit_element_ids[reference_order]
+    )
+    assert np.allclose(
+        hit_points[order], reference_hit_points[reference_order], atol=1e-5
+    )
+
+
+@pytest.mark.parametrize(
+    "name", [ray_backends.NUMPY, ray_backends.EMBREE, ray_backends.OPEN3D]
+)
+def test_ray_backends_agree_with_trimesh(name):
+    if name == ray_backends.EMBREE and not trimesh.ray.has_embree:
+        pytest.skip("embreex is not installed")
+    if name == ray_backends.OPEN3D:
+        pytest.importorskip("open3d")
+    mesh, ray_origins, ray_directions = _mesh_and_rays(500)
+    _assert_backends_agree(
+        ray_backends.create_ray_backend(mesh, name),
+        ray_backends.create_ray_backend(mesh, ray_backends.TRIMESH),
+        ray_origins,
+        ray_directions,
+    )
+
+
+def test_numpy_ray_backend_handles_many_rays():
+    mesh, ray_origins, ray_directions = _mesh_and_rays(
+        2 * ray_backends.BVH_RAYS_CHUNK_SIZE + 1
+    )
+    backend = ray_backends.create_ray_backend(mesh, ray_backends.NUMPY)
+    first_hits = backend.intersects_first(ray_origins, ray_directions)
+    assert first_hits.shape == (len(ray_origins),)
+    assert np.array_equal(
+        first_hits, mesh.ray.intersects_first(ray_origins, ray_directions)
+    )
+
+
+def test_numpy_ray_backend_blocks_rays_through_shared_edges():
+    mesh = trimesh.creation.icosphere(2)
+    edges = mesh.edges_unique
+    rng = np.random.default_rng(0)
+    edge_weights = rng.uniform(0, 1, (len(edges), 1))
+    edge_points = mesh.vertices[edges[:, 0]] + edge_weights * (
+        mesh.vertices[edges[:, 1]] - mesh.vertices[edges[:, 0]]
+    )
+    ray_origins = np.zeros_like(edge_points)
+    ray_directions = edge_points / np.linalg.norm(edge_points, axis=1)[:, np.newaxis]
+    backend = ray_backends.create_ray_backend(mesh, ray_backends.NUMPY)
+    assert np.all(backend.intersects_first(ray_origins, ray_directions) >= 0)
+    assert np.all(backend.intersects_any(ray_origins, ray_directions))
+
+
+def test_unknown_ray_backend():
+    mesh = trimesh.creation.box()
+    with pytest.raises(ValueError):
+        ray_backends.create_ray_backend(mesh, "unknown")
+    with pytest.raises(ValueError):
+        parallel.WorkerPool(mesh, ray_backend="unknown")
+
+
+def test_element_sun_with_numpy_ray_backend():
+    mesh = vtk_io.load_vtk(ICOSPHERE_GEOMETRY_PATH)
+    sun_direction = np.array([0, 0, 1])
+    with parallel.WorkerPool(mesh, ray_backend=ray_backends.NUMPY) as pool:
+        numpy_view_factors = view_factors.element_sun(mesh, sun_direction, pool=pool)
+    assert np.array_equal(
+        numpy_view_factors, view_factors.element_sun(mesh, sun_direction)
+    )
+
+
+def test_element_element_with_numpy_ray_backend():
+    mesh = trimesh.creation.annulus(0.5, 1, 1, sections=16)
+    element_amount = len(mesh.faces)
+    absorptance = np.full(element_amount, 0.5)
+    two_sides_emission = np.zeros(element_amount, dtype=bool)
+    with parallel.WorkerPool(mesh, ray_backend=ray_backends.NUMPY) as pool:
+        numpy_view_factors = view_factors.element_element(
+            mesh, absorptance, two_sides_emission, 500, 2, pool=pool, seed=3
+        )
+    default_view_factors = view_factors.element_element(
+        mesh, absorptance, two_sides_emission, 500, 2, seed=3
+    )
+    assert np.allclose(
+        numpy_view_factors.sum(axis=1), default_view_factors.sum(axis=1), atol=0.05
+    )
+
+
+def test_worker_pool_builds_ray_backend_once(monkeypatch):
+    created_backends = []
+    create_ray_backend = ray_backends.create_ray_backend
+
+    def counted_create_ray_backend(mesh, name=None):
+        created_backends.append(name)
+        return create_ray_backend(mesh, name)
+
+    monkeypatch.setattr(ray_backends, "create_ray_backend", counted_create_ray_backend)
+    mesh = trimesh.creation.annulus(0.5, 1, 1, sections=8)
+    element_amount = len(mesh.faces)
+    sun_direction = np.array([0, 0, 1])
+    with parallel.WorkerPool(mesh) as pool:
+        view_factors.element_sun(mesh, sun_direction, pool=pool)
+        for earth_direction in np.eye(3):
+            view_factors.element_earth(
+                mesh, earth_direction, sun_direction, ray_amount=10, pool=pool, seed=1
+            )
+        view_factors.element_element(
+            mesh,
+            np.ones(element_amount),
+            np.zeros(element_amount, dtype=bool),
+            10,
+            1,
+            pool=pool,
+            seed=1,
+        )
+    assert len(created_backends) == 1
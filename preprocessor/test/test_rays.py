@@ -1,5 +1,5 @@
 from test_config import *
-from src import rays
+from src import rays, vector_math
 import numpy as np
 
 
@@ -26,3 +26,44 @@ def test_reflected_rays_against_element_normals():
     reflected_rays = rays.reflected_rays(ray_directions, element_normals)
     expected_reflected_rays = np.array([[0, 0, -1], [0, 1, -1], [0, -1, -0]])
     assert np.allclose(reflected_rays, expected_reflected_rays)
+
+
+def test_scattered_rays_without_diffuse_fraction_are_reflected_rays():
+    rng = np.random.default_rng(0)
+    ray_directions = vector_math.random_unit_vectors(100, rng)
+    element_normals = vector_math.random_unit_vectors(100, rng)
+    state = rng.bit_generator.state
+    scattered_rays = rays.scattered_rays(
+        ray_directions, element_normals, np.zeros(100), rng
+    )
+    assert np.array_equal(
+        scattered_rays, rays.reflected_rays(ray_directions, element_normals)
+    )
+    assert rng.bit_generator.state == state
+
+
+def test_diffuse_scattered_rays_are_cosine_weighted_on_the_incoming_side():
+    rng = np.random.default_rng(0)
+    ray_amount = 20000
+    ray_directions = vector_math.random_unit_vectors(ray_amount, rng)
+    element_normals = np.tile([0, 0, 1.0], (ray_amount, 1))
+    scattered_rays = rays.scattered_rays(
+        ray_directions, element_normals, np.ones(ray_amount), rng
+    )
+    assert np.allclose(np.linalg.norm(scattered_rays, axis=1), 1)
+    incoming_sides = -np.sign(ray_directions[:, 2])
+    cosines = scattered_rays[:, 2] * incoming_sides
+    assert np.all(cosines >= 0)
+    assert abs(np.mean(cosines) - 2 / 3) < 0.01
+
+
+def test_scattered_rays_mix_lobes_by_diffuse_fraction():
+    rng = np.random.default_rng(0)
+    ray_amount = 20000
+    ray_directions = np.tile([0, 0, -1.0], (ray_amount, 1))
+    element_normals = np.tile([0, 0, 1.0], (ray_amount, 1))
+    scattered_rays = rays.scattered_rays(
+        ray_directions, element_normals, np.full(ray_amount, 0.25), rng
+    )
+    specular_fraction = np.mean(np.all(scattered_rays == [0, 0, 1], axis=1))
+    assert abs(specular_fraction - 0.75) < 0.02
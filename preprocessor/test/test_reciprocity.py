@@ -0,0 +1,119 @@
+from test_config import *
+from src import reciprocity, view_factors, vtk_io, mesh_ops, properties_atlas
+from scipy import sparse
+import numpy as np
+
+BACKWARDS_PYRAMID_GEOMETRY_PATH = "./test/models/backwards_pyramid.vtk"
+BACKWARDS_PYRAMID_PROPERTIES_PATH_NO_REFLECTIONS = (
+    "./test/models/backwards_pyramid_no_reflections.json"
+)
+
+
+def _traced_backwards_pyramid(ray_amount):
+    mesh = vtk_io.load_vtk(BACKWARDS_PYRAMID_GEOMETRY_PATH)
+    properties = properties_atlas.PropertiesAtlas(
+        mesh_ops.element_amount(mesh), BACKWARDS_PYRAMID_PROPERTIES_PATH_NO_REFLECTIONS
+    )
+    weights = reciprocity.emission_weights(
+        mesh.area_faces,
+        properties.absortance_ir_by_element,
+        properties.two_sides_emission_by_element,
+    )
+    element_element_view_factors = view_factors.element_element(
+        mesh,
+        properties.absortance_ir_by_element,
+        properties.two_sides_emission_by_element,
+        ray_amount,
+        0,
+        seed=7,
+    )
+    return element_element_view_factors, weights
+
+
+def test_emission_weights():
+    weights = reciprocity.emission_weights(
+        np.array([1, 2, 3]), np.array([0.5, 1, 0]), np.array([True, False, False])
+    )
+    assert np.allclose(weights, [1, 2, 0])
+
+
+def test_reciprocity_residual_of_reciprocal_view_factors_is_zero():
+    reciprocal_view_factors = np.array([[0, 0.5, 0.5], [0.25, 0.5, 0.25], [0.5, 0.5, 0]])
+    weights = np.array([1, 2, 1])
+    assert reciprocity.reciprocity_residual(reciprocal_view_factors, weights) < 1e-12
+
+
+def test_enforce_reciprocity_backwards_pyramid():
+    traced_view_factors, weights = _traced_backwards_pyramid(1000)
+    consistent_view_factors, residuals = reciprocity.enforce_reciprocity(
+        traced_view_factors, weights
+    )
+    assert isinstance(consistent_view_factors, np.ndarray)
+    assert residuals["reciprocity_before"] > 1e-3
+    assert residuals["reciprocity_after"] < 1e-6
+    assert residuals["row_sums_after"] < 1e-6
+    assert np.allclose(
+        np.sum(consistent_view_factors, axis=1), np.sum(traced_view_factors, axis=1)
+    )
+    assert np.all(np.abs(consistent_view_factors - traced_view_factors) < 0.05)
+
+
+def test_enforce_reciprocity_sparse_is_as_dense():
+    traced_view_factors, weights = _traced_backwards_pyramid(1000)
+    dense_view_factors, _ = reciprocity.enforce_reciprocity(traced_view_factors, weights)
+    sparse_view_factors, _ = reciprocity.enforce_reciprocity(
+        sparse.csr_matrix(traced_view_factors), weights
+    )
+    assert sparse.issparse(sparse_view_factors)
+    assert np.allclose(sparse_view_factors.toarray(), dense_view_factors)
+
+
+def test_enforce_reciprocity_keeps_non_emitters_rows():
+    traced_view_factors = np.array(
+        [[0, 0.6, 0.4, 0], [0.45, 0.1, 0.45, 0], [0.35, 0.45, 0.2, 0], [0.3, 0.3, 0.4, 0]]
+    )
+    weights = np.array([1, 1, 1, 0])
+    consistent_view_factors, residuals = reciprocity.enforce_reciprocity(
+        traced_view_factors, weights
+    )
+    assert np.array_equal(consistent_view_factors[3], traced_view_factors[3])
+    assert residuals["reciprocity_after"] < 1e-6
+    assert residuals["row_sums_after"] < 1e-6
+
+
+def test_enforce_reciprocity_does_not_increase_row_sums_residual_of_open_mesh():
+    mesh = vtk_io.load_vtk(ICOSPHERE_GEOMETRY_PATH)
+    properties = properties_atlas.PropertiesAtlas(
+        mesh_ops.element_amount(mesh), ICOSPHERE_PROPERTIES_PATH
+    )
+    weights = reciprocity.emission_weights(
+        mesh.area_faces,
+        properties.absortance_ir_by_element,
+        properties.two_sides_emission_by_element,
+    )
+    traced_view_factors = view_factors.element_element(
+        mesh,
+        properties.absortance_ir_by_element,
+        properties.two_sides_emission_by_element,
+        300,
+        2,
+        seed=3,
+    )
+    _, residuals = reciprocity.enforce_reciprocity(traced_view_factors, weights)
+    assert residuals["unbalanced_emitters"] > 0
+    assert residuals["row_sums_after"] <= residuals["row_sums_before"] + 1e-9
+    assert residuals["reciprocity_after"] <= residuals["reciprocity_before"] + 1e-9
+
+
+def test_enforce_reciprocity_keeps_exchange_towards_rows_that_see_nothing():
+    traced_view_factors = np.array(
+        [[0, 0.6, 0.3, 0.1], [0.45, 0.1, 0.4, 0.05], [0.35, 0.45, 0.2, 0], [0, 0, 0, 0]]
+    )
+    weights = np.array([1, 1, 1, 1])
+    consistent_view_factors, residuals = reciprocity.enforce_reciprocity(
+        traced_view_factors, weights
+    )
+    assert residuals["unbalanced_emitters"] == 1
+    assert np.array_equal(consistent_view_factors[:, 3], traced_view_factors[:, 3])
+    assert np.allclose(consistent_view_factors[:3, :3], consistent_view_factors[:3, :3].T)
+    assert residuals["row_sums_after"] < 1e-6
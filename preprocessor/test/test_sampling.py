@@ -0,0 +1,120 @@
+from test_config import *
+from src import sampling, elements
+import numpy as np
+
+ELEMENT = np.array([[[0, 0, 0], [1, 0, 0], [0, 1, 0]]], dtype=float)
+NORMAL = np.array([[0, 0, 1]], dtype=float)
+
+
+def test_random_points_in_elements_are_uniform():
+    points = elements.random_points_in_elements(
+        ELEMENT, 40000, np.random.default_rng(0)
+    )
+    assert np.all(points[:, 0] + points[:, 1] <= 1)
+    assert np.all(np.abs(np.mean(points, axis=0) - [1 / 3, 1 / 3, 0]) < 0.01)
+    corner_fraction = np.mean(points[:, 0] + points[:, 1] < 0.5)
+    assert np.abs(corner_fraction - 0.25) < 0.01
+
+
+def test_unit_hypercube_samples_are_in_unit_hypercube():
+    for method in sampling.SAMPLING_METHODS:
+        samples = sampling.unit_hypercube_samples(
+            3, 100, method, np.random.default_rng(0)
+        )
+        assert samples.shape == (3, 100, 4)
+        assert np.all((samples >= 0) & (samples < 1))
+
+
+def test_stratified_samples_cover_every_stratum():
+    samples = sampling.unit_hypercube_samples(
+        1, 100, sampling.STRATIFIED, np.random.default_rng(0)
+    )
+    strata = np.floor(samples[0, :, :2] * 10).astype(int)
+    assert len(np.unique(strata[:, 0] * 10 + strata[:, 1])) == 100
+
+
+def test_low_discrepancy_samples_are_rotated_per_element():
+    for method in [sampling.SOBOL, sampling.HALTON]:
+        samples = sampling.unit_hypercube_samples(
+            2, 64, method, np.random.default_rng(0)
+        )
+        rotation = np.mod(samples[1] - samples[0], 1)
+        assert not np.allclose(samples[0], samples[1])
+        assert np.allclose(rotation, rotation[0])
+
+
+def test_emission_rays_are_in_hemisphere():
+    for method in sampling.SAMPLING_METHODS:
+        for cosine_weighted in [False, True]:
+            origins, directions = sampling.emission_rays(
+                ELEMENT,
+                NORMAL,
+                np.array([False]),
+                1000,
+                np.random.default_rng(0),
+                method,
+                cosine_weighted,
+            )
+            assert origins.shape == (1000, 3)
+            assert np.allclose(np.linalg.norm(directions, axis=1), 1)
+            assert np.all(directions[:, 2] >= 0)
+
+
+def test_emission_rays_cosine_distribution():
+    for method in sampling.SAMPLING_METHODS:
+        _, uniform_directions = sampling.emission_rays(
+            ELEMENT, NORMAL, np.array([False]), 4096, np.random.default_rng(0), method
+        )
+        _, cosine_directions = sampling.emission_rays(
+            ELEMENT,
+            NORMAL,
+            np.array([False]),
+            4096,
+            np.random.default_rng(0),
+            method,
+            cosine_weighted=True,
+        )
+        assert np.abs(np.mean(uniform_directions[:, 2]) - 1 / 2) < 0.02
+        assert np.abs(np.mean(cosine_directions[:, 2]) - 2 / 3) < 0.02
+
+
+def test_two_sides_emission_rays_use_both_hemispheres():
+    _, directions = sampling.emission_rays(
+        ELEMENT,
+        NORMAL,
+        np.array([True]),
+        1000,
+        np.random.default_rng(0),
+        sampling.SOBOL,
+        cosine_weighted=True,
+    )
+    assert np.sum(directions[:, 2] < 0) == 500
+
+
+def _two_sides_origin_means_deviation(method):
+    forward_means = []
+    backward_means = []
+    for seed in range(60):
+        origins, directions = sampling.emission_rays(
+            ELEMENT,
+            NORMAL,
+            np.array([True]),
+            256,
+            np.random.default_rng(seed),
+            method,
+            cosine_weighted=True,
+        )
+        forward = directions @ NORMAL[0] > 0
+        forward_means.append(np.mean(origins[forward], axis=0))
+        backward_means.append(np.mean(origins[~forward], axis=0))
+    centroid = np.mean(ELEMENT[0], axis=0)
+    assert np.allclose(np.mean(forward_means, axis=0), centroid, atol=0.01)
+    assert np.allclose(np.mean(backward_means, axis=0), centroid, atol=0.01)
+    return np.std(forward_means, axis=0).max(), np.std(backward_means, axis=0).max()
+
+
+def test_two_sides_low_discrepancy_emission_covers_element_from_each_side():
+    random_deviations = _two_sides_origin_means_deviation(sampling.RANDOM)
+    for method in (sampling.SOBOL, sampling.HALTON):
+        deviations = _two_sides_origin_means_deviation(method)
+        assert np.all(np.array(deviations) <= np.array(random_deviations))
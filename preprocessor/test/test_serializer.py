@@ -0,0 +1,106 @@
+from test_config import *
+from src import serializer
+from scipy import sparse
+import numpy as np
+import pytest
+
+VIEW_FACTORS_OUTPUT_FILE_NAME = "view_factors_output.vf"
+ELEMENT_ROWS_FILE_NAME = "element_view_factors_output.rows"
+
+
+def _serialize_and_deserialize(directory, element_view_factors):
+    earth_view_factors = [(np.array([0.0, 0.5, 1.0]), 0.0), (np.array([1.0, 0.5, 0.0]), 60.0)]
+    sun_view_factors = [(np.array([0.25, 0.25, 0.25]), 0.0)]
+    output_path = directory / VIEW_FACTORS_OUTPUT_FILE_NAME
+    serializer.serialize_view_factors(
+        output_path,
+        earth_view_factors,
+        earth_view_factors,
+        sun_view_factors,
+        element_view_factors,
+    )
+    return serializer.deserialize_view_factors(output_path)
+
+
+def test_serialize_dense_element_view_factors(tmp_path):
+    element_view_factors = np.array([[0, 0.5, 0.5], [0.25, 0, 0.75], [1.0, 0, 0]])
+    earth_ir, _, sun, deserialized_view_factors = _serialize_and_deserialize(
+        tmp_path, element_view_factors
+    )
+    assert not sparse.issparse(deserialized_view_factors)
+    assert np.allclose(deserialized_view_factors, element_view_factors, atol=1e-4)
+    assert np.allclose(earth_ir[1][0], [1.0, 0.5, 0.0], atol=1e-4)
+    assert earth_ir[1][1] == 60.0
+    assert np.allclose(sun[0][0], [0.25, 0.25, 0.25], atol=1e-4)
+
+
+def test_serialize_sparse_element_view_factors(tmp_path):
+    element_view_factors = np.array([[0, 0.5, 0.5], [0.25, 0, 0.75], [1.0, 0, 1e-6]])
+    _, _, _, deserialized_view_factors = _serialize_and_deserialize(
+        tmp_path, sparse.csr_matrix(element_view_factors)
+    )
+    assert sparse.issparse(deserialized_view_factors)
+    assert deserialized_view_factors.nnz == 5
+    assert np.allclose(
+        deserialized_view_factors.toarray(), element_view_factors, atol=1e-4
+    )
+
+
+def _streamed_file_bytes(directory, element_view_factors, sparse_output, block_size):
+    rows, columns = element_view_factors.shape
+    rows_path = str(directory / ELEMENT_ROWS_FILE_NAME)
+    with serializer.ElementRowsWriter(
+        rows_path, rows, columns, sparse_output
+    ) as rows_writer:
+        for block_start in range(0, rows, block_size):
+            rows_writer.write_rows(
+                sparse.csr_matrix(element_view_factors[block_start : block_start + block_size])
+            )
+    _serialize_and_deserialize(directory, rows_path)
+    with open(directory / VIEW_FACTORS_OUTPUT_FILE_NAME, "rb") as file:
+        return file.read()
+
+
+def test_streamed_element_rows_match_in_memory_serialization(tmp_path):
+    rng = np.random.default_rng(0)
+    element_view_factors = rng.random((7, 7)) * (rng.random((7, 7)) < 0.3)
+    element_view_factors[3] = 0
+
+    for sparse_output in (True, False):
+        streamed_bytes = _streamed_file_bytes(
+            tmp_path, element_view_factors, sparse_output, 3
+        )
+        if sparse_output:
+            _serialize_and_deserialize(tmp_path, sparse.csr_matrix(element_view_factors))
+        else:
+            _serialize_and_deserialize(tmp_path, element_view_factors)
+        with open(tmp_path / VIEW_FACTORS_OUTPUT_FILE_NAME, "rb") as file:
+            assert file.read() == streamed_bytes
+
+
+def test_incomplete_element_rows_file_is_not_serialized(tmp_path):
+    rows_path = str(tmp_path / ELEMENT_ROWS_FILE_NAME)
+    rows_writer = serializer.ElementRowsWriter(rows_path, 4, 4)
+    rows_writer.write_rows(np.ones((2, 4)) / 4)
+    rows_writer.close()
+    with pytest.raises(Exception, match="incomplete"):
+        _serialize_and_deserialize(tmp_path, rows_path)
+
+
+def test_dense_element_rows_are_quantized_into_a_memory_map(tmp_path):
+    element_view_factors = np.array([[0, 0.5, 0.5], [0.25, 0, 0.75], [1.0, 0, 0]])
+    rows_path = str(tmp_path / ELEMENT_ROWS_FILE_NAME)
+    with serializer.ElementRowsWriter(
+        rows_path, 3, 3, sparse_output=False
+    ) as rows_writer:
+        assert isinstance(rows_writer.quantized_rows, np.memmap)
+        rows_writer.write_rows(element_view_factors[:2])
+        assert np.array_equal(
+            rows_writer.quantized_rows[:2],
+            (element_view_factors[:2] * serializer.FACTOR).astype("u2"),
+        )
+        rows_writer.write_rows(element_view_factors[2:])
+    _, _, _, deserialized_view_factors = _serialize_and_deserialize(
+        tmp_path, rows_path
+    )
+    assert np.allclose(deserialized_view_factors, element_view_factors, atol=1e-4)
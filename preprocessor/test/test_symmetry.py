@@ -0,0 +1,101 @@
+from test_config import *
+from src import symmetry, view_factors
+from scipy import sparse
+import numpy as np
+import trimesh
+import pytest
+
+
+def _annulus():
+    mesh = trimesh.creation.annulus(0.5, 1, 1, sections=8)
+    element_amount = len(mesh.faces)
+    return mesh, np.ones(element_amount), np.zeros(element_amount, dtype=bool)
+
+
+def test_declared_mirror_symmetry_permutation():
+    box = trimesh.creation.box()
+    box.apply_translation([1, 0, 0])
+    mirrored_box = box.copy()
+    mirrored_box.apply_transform(
+        trimesh.transformations.reflection_matrix([0, 0, 0], [1, 0, 0])
+    )
+    mesh = trimesh.util.concatenate(box, mirrored_box)
+    element_amount = len(mesh.faces)
+    transform = symmetry.symmetry_transform(
+        {"type": "mirror", "normal": [1, 0, 0]}, symmetry.mesh_center(mesh)
+    )
+    permutation = symmetry.element_permutation(
+        mesh, transform, np.ones(element_amount), np.zeros(element_amount, dtype=bool)
+    )
+    assert permutation is not None
+    mirrored_centroids = mesh.triangles_center * [-1, 1, 1]
+    assert np.allclose(mesh.triangles_center[permutation], mirrored_centroids)
+
+
+def test_materials_break_symmetry():
+    mesh, absorptance, two_sides_emission = _annulus()
+    absorptance[0] = 0.5
+    transform = symmetry.symmetry_transform(
+        {"type": "rotation", "axis": [0, 0, 1], "folds": 4}, symmetry.mesh_center(mesh)
+    )
+    assert (
+        symmetry.element_permutation(mesh, transform, absorptance, two_sides_emission)
+        is None
+    )
+
+
+def test_declared_symmetry_that_does_not_hold_raises():
+    mesh, absorptance, two_sides_emission = _annulus()
+    with pytest.raises(Exception):
+        symmetry.symmetry_group(
+            mesh,
+            absorptance,
+            two_sides_emission,
+            [{"type": "rotation", "axis": [1, 0, 0], "folds": 4}],
+        )
+
+
+def test_auto_detected_symmetry_group_is_a_group():
+    mesh, absorptance, two_sides_emission = _annulus()
+    group = symmetry.symmetry_group(mesh, absorptance, two_sides_emission)
+    group_keys = {permutation.tobytes() for permutation in group}
+    assert len(group) > 1
+    assert np.arange(len(mesh.faces)).tobytes() in group_keys
+    for permutation in group:
+        for other_permutation in group:
+            assert permutation[other_permutation].tobytes() in group_keys
+
+
+def test_expand_rows_of_symmetric_view_factors():
+    mesh, absorptance, two_sides_emission = _annulus()
+    group = symmetry.symmetry_group(mesh, absorptance, two_sides_emission)
+    representatives, _, _ = symmetry.representatives(group)
+    random_view_factors = np.random.default_rng(0).random((len(mesh.faces),) * 2)
+    symmetric_view_factors = np.mean(
+        [random_view_factors[np.ix_(permutation, permutation)] for permutation in group],
+        axis=0,
+    )
+    expanded_view_factors = symmetry.expand_rows(
+        symmetric_view_factors[representatives], group
+    )
+    assert np.allclose(expanded_view_factors, symmetric_view_factors)
+    expanded_sparse_view_factors = symmetry.expand_rows(
+        sparse.csr_matrix(symmetric_view_factors[representatives]), group
+    )
+    assert sparse.issparse(expanded_sparse_view_factors)
+    assert np.allclose(expanded_sparse_view_factors.toarray(), symmetric_view_factors)
+
+
+def test_symmetric_element_element_is_similar_to_full():
+    mesh, absorptance, two_sides_emission = _annulus()
+    group = symmetry.symmetry_group(mesh, absorptance, two_sides_emission)
+    representatives, _, _ = symmetry.representatives(group)
+    full_view_factors = view_factors.element_element(
+        mesh, absorptance, two_sides_emission, 5000, 0, seed=7
+    )
+    representative_view_factors = view_factors.element_element(
+        mesh, absorptance, two_sides_emission, 5000, 0, seed=7, emitters=representatives
+    )
+    assert len(representative_view_factors) < len(mesh.faces)
+    symmetric_view_factors = symmetry.expand_rows(representative_view_factors, group)
+    assert np.all(np.abs(symmetric_view_factors - full_view_factors) < 0.03)
@@ -132,3 +132,18 @@ def test_flip_around_axis():
     for i in range(len(vectors)):
         flipped_vectors = vector_math.flip_around_axis(vectors[i], axis[i])
         assert np.allclose(flipped_vectors, expected_vectors[i])
+
+
+def test_orient_towards_directions():
+    vectors = np.array([[1.0, 0, 0], [0, -1, 0], [0, 0, 1], [-1, -1, 0]])
+    directions = np.array([[1.0, 0, 0], [0, 1, 0], [0, 0, -1], [1, 0, 0]])
+    vector_math.orient_towards_directions(vectors, directions)
+    expected_vectors = np.array([[1, 0, 0], [0, 1, 0], [0, 0, -1], [1, 1, 0]])
+    assert np.array_equal(vectors, expected_vectors)
+
+
+def test_sphere_unit_vectors_are_evenly_distributed():
+    unit_vectors = vector_math.sphere_unit_vectors(10000)
+    assert np.allclose(np.linalg.norm(unit_vectors, axis=1), 1)
+    assert np.allclose(np.mean(unit_vectors, axis=0), 0, atol=1e-3)
+    assert np.abs(np.count_nonzero(unit_vectors[:, 0] > 0) - 5000) < 50
@@ -1,6 +1,7 @@
 from test_config import *
-from src import vtk_io, properties_atlas, view_factors, mesh_ops
+from src import vtk_io, properties_atlas, view_factors, mesh_ops, parallel, serializer
 import numpy as np
+from scipy import sparse
 
 
 def _is_in_interval(value, center, epsilon):
@@ -42,6 +43,21 @@ def test_element_sun_view_factors_are_as_expected():
         assert _is_in_interval(sun_view_factors[i], expected_view_factors[i], 0.02)
 
 
+def test_element_earth_view_factors_do_not_depend_on_workers():
+    earth_direction = np.array([1, 0, 0])
+    sun_direction = np.array([-1, 0, 0])
+    mesh = vtk_io.load_vtk(ICOSPHERE_GEOMETRY_PATH)
+    serial_view_factors = view_factors.element_earth(
+        mesh, earth_direction, sun_direction, 0, 1000, block_size=4, seed=7
+    )
+    with parallel.WorkerPool(mesh, 2) as pool:
+        parallel_view_factors = view_factors.element_earth(
+            mesh, earth_direction, sun_direction, 0, 1000, block_size=4, pool=pool, seed=7
+        )
+    assert np.array_equal(serial_view_factors[0], parallel_view_factors[0])
+    assert np.array_equal(serial_view_factors[1], parallel_view_factors[1])
+
+
 def test_element_earth_visible_faces():
     earth_direction = np.array([1, 0, 0])
     sun_direction = np.array([1, 0, 0])
@@ -57,13 +73,21 @@ def test_element_earth_visible_faces():
     assert np.array_equal(earth_view_factors, expected_view_factors)
 
 
-def _test_element_earth_view_factors_are_as_expected(penumbra_fraction):
+def _test_element_earth_view_factors_are_as_expected(
+    penumbra_fraction, precomputed_visibility=False
+):
     earth_direction = np.array([1, 0, 0])
     sun_direction = np.array([-1, 0, 0])
     mesh = vtk_io.load_vtk(ICOSPHERE_GEOMETRY_PATH)
-    earth_view_factors, _ = view_factors.element_earth(
-        mesh, earth_direction, sun_direction, penumbra_fraction, 10000
-    )
+    if precomputed_visibility:
+        visibility = view_factors.earth_visibility(mesh, 10000)
+        earth_view_factors, _ = view_factors.element_earth_from_visibility(
+            mesh, visibility, earth_direction, sun_direction, penumbra_fraction
+        )
+    else:
+        earth_view_factors, _ = view_factors.element_earth(
+            mesh, earth_direction, sun_direction, penumbra_fraction, 10000
+        )
     expected_view_factors = (
         np.array(
             [
@@ -105,6 +129,26 @@ def test_element_earth_view_factors_are_as_expected_with_penumbra():
     _test_element_earth_view_factors_are_as_expected(0.5)
 
 
+def test_element_earth_view_factors_are_as_expected_with_precomputed_visibility():
+    _test_element_earth_view_factors_are_as_expected(0, precomputed_visibility=True)
+
+
+def test_element_earth_precomputed_visibility_matches_raycasting():
+    SUN_VECTOR = np.array([1, 0, 0])
+    mesh = vtk_io.load_vtk(RING_GEOMETRY_PATH)
+    visibility = view_factors.earth_visibility(mesh, 5000)
+    for angle in np.linspace(0, 2 * np.pi, 5):
+        earth_vector = np.array([np.cos(angle), np.sin(angle), 0])
+        raycast_view_factors = view_factors.element_earth(
+            mesh, earth_vector, SUN_VECTOR, 0.5, 5000
+        )
+        precomputed_view_factors = view_factors.element_earth_from_visibility(
+            mesh, visibility, earth_vector, SUN_VECTOR, 0.5
+        )
+        for raycast, precomputed in zip(raycast_view_factors, precomputed_view_factors):
+            assert np.all(np.abs(raycast - precomputed) < 0.05)
+
+
 def _test_earth_albedo(expected_lit_fractions, penumbra_fraction):
     SUBDIVISIONS = 16
     SUN_VECTOR = np.array([1, 0, 0])
@@ -188,7 +232,7 @@ def test_earth_albedo_no_umbra():
     _test_earth_albedo(expected_lit_fractions, 1.0)
 
 
-def _element_element_backwards_pyramid(properties_path, ray_amount):
+def _element_element_backwards_pyramid(properties_path, ray_amount, **kwargs):
     mesh = vtk_io.load_vtk(BACKWARDS_PYRAMID_GEOMETRY_PATH)
     properties = properties_atlas.PropertiesAtlas(
         mesh_ops.element_amount(mesh), properties_path
@@ -199,6 +243,7 @@ def _element_element_backwards_pyramid(properties_path, ray_amount):
         properties.two_sides_emission_by_element,
         ray_amount,
         50,
+        **kwargs,
     )
 
 
@@ -223,6 +268,101 @@ def test_element_element_backwards_pyramid_view_factors_rows_are_similar():
         assert np.all(row > 1 / 3 - element_element_view_factors_epsilon)
 
 
+def test_element_element_backwards_pyramid_view_factors_block_sizes_are_similar():
+    single_element_blocks_view_factors = _element_element_backwards_pyramid(
+        BACKWARDS_PYRAMID_PROPERTIES_PATH_HALF_REFLECTIONS, 10000, block_size=1
+    )
+    whole_mesh_block_view_factors = _element_element_backwards_pyramid(
+        BACKWARDS_PYRAMID_PROPERTIES_PATH_HALF_REFLECTIONS, 10000, block_size=3
+    )
+    view_factors_errors = np.abs(
+        single_element_blocks_view_factors - whole_mesh_block_view_factors
+    )
+    assert np.all(np.less(view_factors_errors, 0.05))
+
+
+def test_element_element_backwards_pyramid_view_factors_do_not_depend_on_workers():
+    mesh = vtk_io.load_vtk(BACKWARDS_PYRAMID_GEOMETRY_PATH)
+    serial_view_factors = _element_element_backwards_pyramid(
+        BACKWARDS_PYRAMID_PROPERTIES_PATH_HALF_REFLECTIONS, 1000, block_size=1, seed=7
+    )
+    with parallel.WorkerPool(mesh, 2) as pool:
+        parallel_view_factors = _element_element_backwards_pyramid(
+            BACKWARDS_PYRAMID_PROPERTIES_PATH_HALF_REFLECTIONS,
+            1000,
+            block_size=1,
+            seed=7,
+            pool=pool,
+        )
+    assert np.array_equal(serial_view_factors, parallel_view_factors)
+
+
+def test_element_element_backwards_pyramid_sparse_view_factors_are_as_dense():
+    dense_view_factors = _element_element_backwards_pyramid(
+        BACKWARDS_PYRAMID_PROPERTIES_PATH_NO_REFLECTIONS, 1000, seed=7
+    )
+    sparse_view_factors = _element_element_backwards_pyramid(
+        BACKWARDS_PYRAMID_PROPERTIES_PATH_NO_REFLECTIONS,
+        1000,
+        seed=7,
+        sparse_output=True,
+    )
+    assert sparse.issparse(sparse_view_factors)
+    assert np.array_equal(sparse_view_factors.toarray(), dense_view_factors)
+
+
+def test_element_element_backwards_pyramid_view_factors_threshold():
+    view_factors_threshold = 0.5
+    element_element_view_factors = _element_element_backwards_pyramid(
+        BACKWARDS_PYRAMID_PROPERTIES_PATH_NO_REFLECTIONS,
+        1000,
+        threshold=view_factors_threshold,
+        sparse_output=True,
+    )
+    assert np.all(element_element_view_factors.data >= view_factors_threshold)
+
+
+def test_element_element_backwards_pyramid_adaptive_view_factors_reach_tolerance():
+    view_factors_tolerance = 0.01
+    element_element_view_factors, errors = _element_element_backwards_pyramid(
+        BACKWARDS_PYRAMID_PROPERTIES_PATH_NO_REFLECTIONS,
+        500,
+        tolerance=view_factors_tolerance,
+        return_errors=True,
+    )
+    assert np.all(errors < view_factors_tolerance)
+    for element_id in range(len(element_element_view_factors)):
+        row = np.delete(element_element_view_factors[element_id], element_id)
+        assert np.all(np.abs(row - 1 / 3) < 0.05)
+
+
+def test_element_element_backwards_pyramid_adaptive_view_factors_max_ray_amount():
+    _, errors = _element_element_backwards_pyramid(
+        BACKWARDS_PYRAMID_PROPERTIES_PATH_NO_REFLECTIONS,
+        500,
+        tolerance=1e-6,
+        max_ray_amount=1000,
+        return_errors=True,
+    )
+    expected_error = np.sqrt((1 / 3) * (2 / 3) / 1000)
+    assert np.all(np.abs(errors - expected_error) < 0.005)
+
+
+def test_element_element_backwards_pyramid_low_discrepancy_view_factors_are_similar():
+    element_element_view_factors_epsilon = 0.03
+    for sampling_method in ["stratified", "sobol", "halton"]:
+        element_element_view_factors = _element_element_backwards_pyramid(
+            BACKWARDS_PYRAMID_PROPERTIES_PATH_NO_REFLECTIONS,
+            1000,
+            sampling_method=sampling_method,
+            cosine_weighted=True,
+            seed=7,
+        )
+        for element_id in range(len(element_element_view_factors)):
+            row = np.delete(element_element_view_factors[element_id], element_id)
+            assert np.all(np.abs(row - 1 / 3) < element_element_view_factors_epsilon)
+
+
 def test_view_factors_full_reflections():
     element_element_view_factors = _element_element_backwards_pyramid(
         BACKWARDS_PYRAMID_PROPERTIES_PATH_FULL_REFLECTIONS, 10000
@@ -357,3 +497,261 @@ def test_element_element_backwards_pyramid_view_factors_mixed_emissions():
     )
     print(element_element_view_factors)
     assert np.all(np.less(view_factors_errors, 0.10))
+
+
+def test_element_sun_view_factors_do_not_depend_on_workers():
+    sun_direction = np.array([0, 0, 1])
+    mesh = vtk_io.load_vtk(ICOSPHERE_GEOMETRY_PATH)
+    with parallel.WorkerPool(mesh, 2) as pool:
+        parallel_view_factors = view_factors.element_sun(mesh, sun_direction, pool=pool)
+    assert np.array_equal(
+        view_factors.element_sun(mesh, sun_direction), parallel_view_factors
+    )
+
+
+def _shared_arguments_block(mesh, ray_backend, block_start, block_stop, values):
+    return values[block_start:block_stop].sum()
+
+
+def test_worker_pool_shares_map_arguments_once():
+    mesh = vtk_io.load_vtk(ICOSPHERE_GEOMETRY_PATH)
+    values = np.arange(1000)
+    blocks = parallel.blocks(len(values), 64)
+    with parallel.WorkerPool(mesh, 2) as pool:
+        for _ in range(2):
+            block_sums = list(pool.map(_shared_arguments_block, blocks, values=values))
+            assert block_sums == [values[start:stop].sum() for start, stop in blocks]
+            assert os.listdir(pool.arguments_directory) == []
+        arguments_directory = pool.arguments_directory
+    assert not os.path.exists(arguments_directory)
+
+
+def test_element_element_streamed_rows_match_in_memory_rows(tmp_path):
+    mesh = vtk_io.load_vtk(BACKWARDS_PYRAMID_GEOMETRY_PATH)
+    element_amount = mesh_ops.element_amount(mesh)
+    absorptance = np.full(element_amount, 0.5)
+    two_sides_emission = np.zeros(element_amount, dtype=bool)
+    rows_path = str(tmp_path / "element_view_factors_output.rows")
+    with serializer.ElementRowsWriter(
+        rows_path, element_amount, element_amount
+    ) as rows_writer:
+        streamed_view_factors = view_factors.element_element(
+            mesh,
+            absorptance,
+            two_sides_emission,
+            1000,
+            2,
+            block_size=2,
+            seed=5,
+            rows_writer=rows_writer,
+        )
+    in_memory_view_factors = view_factors.element_element(
+        mesh,
+        absorptance,
+        two_sides_emission,
+        1000,
+        2,
+        block_size=2,
+        seed=5,
+        sparse_output=True,
+    )
+    assert streamed_view_factors is None
+
+    output_path = tmp_path / "view_factors_output.vf"
+    serializer.serialize_view_factors(output_path, [], [], [], rows_path)
+    _, _, _, deserialized_view_factors = serializer.deserialize_view_factors(output_path)
+    assert np.allclose(
+        deserialized_view_factors.toarray(), in_memory_view_factors.toarray(), atol=1e-4
+    )
+
+
+def test_element_element_weighted_reflections_agree_with_sampled_reflections():
+    mesh = vtk_io.load_vtk(BACKWARDS_PYRAMID_GEOMETRY_PATH)
+    element_amount = mesh_ops.element_amount(mesh)
+    absorptance = np.full(element_amount, 0.3)
+    two_sides_emission = np.zeros(element_amount, dtype=bool)
+    sampled_view_factors = view_factors.element_element(
+        mesh, absorptance, two_sides_emission, 20000, 30, seed=1
+    )
+    weighted_view_factors = view_factors.element_element(
+        mesh,
+        absorptance,
+        two_sides_emission,
+        20000,
+        30,
+        seed=1,
+        reflection_mode=view_factors.WEIGHTED_REFLECTIONS,
+    )
+    assert np.allclose(weighted_view_factors, sampled_view_factors, atol=0.02)
+    assert np.allclose(weighted_view_factors.sum(axis=1), 1, atol=0.01)
+
+
+def test_hit_counts_accumulate_weights():
+    absorbed_hits = [
+        (np.array([3, 1, 3]), None),
+        (np.array([1, 5]), np.array([0.5, 0.25])),
+    ]
+    hit_ids, hit_counts, hit_squares = view_factors._hit_counts(absorbed_hits, 2, 3)
+    assert np.array_equal(hit_ids, [1, 3, 5])
+    assert np.allclose(hit_counts, [1.5, 2, 0.25])
+    assert np.allclose(hit_squares, [1.25, 2, 0.0625])
+
+
+def test_element_element_diffuse_reflections_keep_row_sums():
+    mesh = vtk_io.load_vtk(BACKWARDS_PYRAMID_GEOMETRY_PATH)
+    element_amount = mesh_ops.element_amount(mesh)
+    absorptance = np.full(element_amount, 0.3)
+    two_sides_emission = np.zeros(element_amount, dtype=bool)
+    specular_view_factors = view_factors.element_element(
+        mesh, absorptance, two_sides_emission, 2000, 30, seed=1
+    )
+    assert np.array_equal(
+        view_factors.element_element(
+            mesh,
+            absorptance,
+            two_sides_emission,
+            2000,
+            30,
+            seed=1,
+            diffuse_fraction_by_element=np.zeros(element_amount),
+        ),
+        specular_view_factors,
+    )
+    diffuse_view_factors = view_factors.element_element(
+        mesh,
+        absorptance,
+        two_sides_emission,
+        2000,
+        30,
+        seed=1,
+        diffuse_fraction_by_element=np.ones(element_amount),
+    )
+    assert np.allclose(
+        diffuse_view_factors.sum(axis=1), specular_view_factors.sum(axis=1), atol=0.05
+    )
+
+
+def test_element_sun_divisions_match_single_directions():
+    mesh = vtk_io.load_vtk(ICOSPHERE_GEOMETRY_PATH)
+    sun_directions = np.array([[1, 0, 0], [0, 0, 1], [1, 0, 0], [0, -1, 0]])
+    divisions_view_factors = view_factors.element_sun_divisions(mesh, sun_directions)
+    assert divisions_view_factors.shape == (4, mesh_ops.element_amount(mesh))
+    for sun_direction, division_view_factors in zip(
+        sun_directions, divisions_view_factors
+    ):
+        assert np.array_equal(
+            division_view_factors, view_factors.element_sun(mesh, sun_direction)
+        )
+
+
+def test_element_sun_divisions_cast_distinct_directions_together():
+    mesh = vtk_io.load_vtk(ICOSPHERE_GEOMETRY_PATH)
+    element_amount = mesh_ops.element_amount(mesh)
+    sun_directions = np.tile([[0, 0, 1], [0, 1, 0]], (5, 1))
+    with parallel.WorkerPool(mesh) as pool:
+        casted_rays = []
+        intersects_any = pool.ray_backend.intersects_any
+        pool.ray_backend.intersects_any = lambda ray_origins, ray_directions: (
+            casted_rays.append(len(ray_origins))
+            or intersects_any(ray_origins, ray_directions)
+        )
+        view_factors.element_sun_divisions(
+            mesh, sun_directions, pool=pool, block_size=element_amount
+        )
+    assert casted_rays == [2 * element_amount]
+
+
+def test_element_sun_divisions_bound_rays_per_call():
+    mesh = vtk_io.load_vtk(ICOSPHERE_GEOMETRY_PATH)
+    element_amount = mesh_ops.element_amount(mesh)
+    sun_directions = np.array([[0, 0, 1], [0, 1, 0], [1, 0, 0]])
+    with parallel.WorkerPool(mesh) as pool:
+        casted_rays = []
+        intersects_any = pool.ray_backend.intersects_any
+        pool.ray_backend.intersects_any = lambda ray_origins, ray_directions: (
+            casted_rays.append(len(ray_origins))
+            or intersects_any(ray_origins, ray_directions)
+        )
+        blocks_view_factors = view_factors.element_sun_divisions(
+            mesh, sun_directions, pool=pool, block_size=7
+        )
+    assert max(casted_rays) == 3 * 7
+    assert sum(casted_rays) == 3 * element_amount
+    assert np.array_equal(
+        blocks_view_factors, view_factors.element_sun_divisions(mesh, sun_directions)
+    )
+
+
+def test_element_earth_divisions_match_element_earth():
+    mesh = vtk_io.load_vtk(ICOSPHERE_GEOMETRY_PATH)
+    earth_directions = np.array([[0, 0, -1], [1, 0, 0], [0, -1, 0]])
+    sun_directions = np.array([[-1, 0, 0], [0, 0, 1], [0, 0, 1]])
+    with parallel.WorkerPool(mesh, workers=2) as pool:
+        divisions_view_factors = list(
+            view_factors.element_earth_divisions(
+                mesh,
+                earth_directions,
+                sun_directions,
+                ray_amount=500,
+                block_size=4,
+                pool=pool,
+                seed=5,
+            )
+        )
+    assert len(divisions_view_factors) == 3
+    for division, (
+        earth_direction,
+        sun_direction,
+        (ir_view_factors, albedo_view_factors),
+    ) in enumerate(zip(earth_directions, sun_directions, divisions_view_factors)):
+        expected_ir, expected_albedo = view_factors.element_earth(
+            mesh,
+            earth_direction,
+            sun_direction,
+            ray_amount=500,
+            block_size=4,
+            seed=5,
+            division=division,
+        )
+        assert np.array_equal(ir_view_factors, expected_ir)
+        assert np.array_equal(albedo_view_factors, expected_albedo)
+
+
+def test_element_earth_divisions_draw_different_samples():
+    mesh = vtk_io.load_vtk(ICOSPHERE_GEOMETRY_PATH)
+    earth_directions = np.array([[0, 0, -1], [0, 0, -1]])
+    sun_directions = np.array([[-1, 0, 0], [-1, 0, 0]])
+    first_ir, second_ir = (
+        ir_view_factors
+        for ir_view_factors, _ in view_factors.element_earth_divisions(
+            mesh, earth_directions, sun_directions, ray_amount=50, seed=5
+        )
+    )
+    assert not np.array_equal(first_ir, second_ir)
+    resumed_ir, _ = next(
+        view_factors.element_earth_divisions(
+            mesh,
+            earth_directions[1:],
+            sun_directions[1:],
+            ray_amount=50,
+            seed=5,
+            division_numbers=[1],
+        )
+    )
+    assert np.array_equal(resumed_ir, second_ir)
+
+
+def test_stages_draw_different_samples():
+    seed = 5
+    element_samples = view_factors._block_random_generator(
+        seed, view_factors.ELEMENT_ELEMENT_SEED_TAG, 0
+    ).random(8)
+    earth_samples = view_factors._block_random_generator(
+        seed, view_factors.ELEMENT_EARTH_SEED_TAG, 0
+    ).random(8)
+    visibility_samples = view_factors._block_random_generator(
+        seed, view_factors.EARTH_VISIBILITY_SEED_TAG, 0
+    ).random(8)
+    assert not np.array_equal(element_samples, earth_samples)
+    assert not np.array_equal(earth_samples, visibility_samples)
+    assert not np.array_equal(element_samples, visibility_samples)
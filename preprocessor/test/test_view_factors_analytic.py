@@ -0,0 +1,121 @@
+from test_config import *
+from src import view_factors_analytic, view_factors
+import numpy as np
+import trimesh
+import pytest
+
+PARALLEL_SQUARES_VIEW_FACTOR = 0.19982
+
+
+def _parallel_squares(occluded=False):
+    """
+    Returns a mesh with two unit squares one unit apart facing each other and,
+    optionally, a small square between them.
+    """
+    lower_square = np.array(
+        [[[0, 0, 0], [1, 0, 0], [1, 1, 0]], [[0, 0, 0], [1, 1, 0], [0, 1, 0]]],
+        dtype=float,
+    )
+    upper_square = lower_square[:, ::-1] + [0, 0, 1]
+    triangles = [lower_square, upper_square]
+    if occluded:
+        triangles.append((lower_square - 0.5) * 0.6 + [0.5, 0.5, 0.5])
+    return trimesh.Trimesh(**trimesh.triangles.to_kwargs(np.concatenate(triangles)))
+
+
+def test_triangle_view_factors_parallel_squares():
+    mesh = _parallel_squares()
+    emitter_ids = np.array([0, 0, 1, 1])
+    receiver_ids = np.array([2, 3, 2, 3])
+    triangle_view_factors = view_factors_analytic.triangle_view_factors(
+        mesh.triangles[emitter_ids], mesh.triangles[receiver_ids]
+    )
+    square_view_factor = np.sum(triangle_view_factors * mesh.area_faces[emitter_ids])
+    assert np.abs(square_view_factor - PARALLEL_SQUARES_VIEW_FACTOR) < 1e-4
+
+
+def test_fully_visible_pairs():
+    mesh = _parallel_squares()
+    emitter_ids = np.array([0, 0, 2])
+    receiver_ids = np.array([2, 1, 0])
+    visible = view_factors_analytic.fully_visible_pairs(
+        mesh, emitter_ids, receiver_ids, np.zeros(3, dtype=bool), 1e-4
+    )
+    assert np.array_equal(visible, [True, False, True])
+
+
+def test_occluded_pairs_are_not_fully_visible():
+    mesh = _parallel_squares(occluded=True)
+    visible = view_factors_analytic.fully_visible_pairs(
+        mesh, np.array([0]), np.array([2]), np.array([False]), 1e-4
+    )
+    assert not visible[0]
+
+
+def test_back_facing_pairs_are_only_visible_for_two_sides_emitters():
+    mesh = _parallel_squares()
+    mesh.faces[:2] = mesh.faces[:2, ::-1]
+    emitter_ids = np.array([0, 0])
+    receiver_ids = np.array([2, 2])
+    visible = view_factors_analytic.fully_visible_pairs(
+        mesh, emitter_ids, receiver_ids, np.array([False, True]), 1e-4
+    )
+    assert np.array_equal(visible, [False, True])
+
+
+def test_element_element_analytic_direct_parallel_squares():
+    mesh = _parallel_squares()
+    element_amount = len(mesh.faces)
+    element_element_view_factors = view_factors.element_element(
+        mesh,
+        np.ones(element_amount),
+        np.zeros(element_amount, dtype=bool),
+        200,
+        0,
+        seed=7,
+        cosine_weighted=True,
+        analytic_direct=True,
+    )
+    lower_square_view_factor = np.sum(
+        element_element_view_factors[:2, 2:] * mesh.area_faces[:2, np.newaxis]
+    )
+    assert np.abs(lower_square_view_factor - PARALLEL_SQUARES_VIEW_FACTOR) < 1e-4
+
+
+def test_element_element_analytic_direct_requires_cosine_weighted_rays():
+    mesh = _parallel_squares()
+    element_amount = len(mesh.faces)
+    with pytest.raises(Exception):
+        view_factors.element_element(
+            mesh,
+            np.ones(element_amount),
+            np.zeros(element_amount, dtype=bool),
+            100,
+            0,
+            analytic_direct=True,
+        )
+
+
+def test_element_element_analytic_direct_distant_triangles():
+    lower_triangle = np.array([[0, 0, 0], [1, 0, 0], [0, 1, 0]], dtype=float)
+    upper_triangle = lower_triangle[::-1] + [0, 0, 20]
+    mesh = trimesh.Trimesh(
+        **trimesh.triangles.to_kwargs(np.array([lower_triangle, upper_triangle]))
+    )
+    expected_view_factor = view_factors_analytic.triangle_view_factors(
+        mesh.triangles[[0]], mesh.triangles[[1]]
+    )[0]
+    for seed in range(20):
+        element_element_view_factors = view_factors.element_element(
+            mesh,
+            np.ones(2),
+            np.zeros(2, dtype=bool),
+            100,
+            0,
+            seed=seed,
+            cosine_weighted=True,
+            analytic_direct=True,
+        )
+        assert np.allclose(
+            element_element_view_factors[[0, 1], [1, 0]], expected_view_factor
+        )
@@ -0,0 +1,89 @@
+from test_config import *
+from src import view_factors_cache, vtk_io, mesh_ops
+from scipy import sparse
+import numpy as np
+
+
+def test_fingerprint_depends_on_content():
+    values = np.array([0.1, 0.2, 0.3])
+    assert view_factors_cache.fingerprint(values, 10) == view_factors_cache.fingerprint(
+        values.copy(), 10
+    )
+    assert view_factors_cache.fingerprint(values, 10) != view_factors_cache.fingerprint(
+        values, 11
+    )
+    assert view_factors_cache.fingerprint(values) != view_factors_cache.fingerprint(
+        values.astype(np.float32)
+    )
+
+
+def test_fingerprint_of_numpy_scalars_is_as_python_scalars():
+    fingerprint = view_factors_cache.fingerprint
+    assert fingerprint(np.float64(0.5), np.int64(3)) == fingerprint(0.5, 3)
+    assert fingerprint(np.bool_(True), np.str_("embree")) == fingerprint(True, "embree")
+    assert fingerprint(0.5) != fingerprint(0.5000000000000001)
+    assert fingerprint(1) != fingerprint(1.0)
+    assert fingerprint(True) != fingerprint(1)
+    assert fingerprint("1") != fingerprint(1)
+
+
+def test_mesh_fingerprint_changes_with_transform():
+    mesh = vtk_io.load_vtk(ICOSPHERE_GEOMETRY_PATH)
+    mesh_hash = view_factors_cache.mesh_fingerprint(mesh)
+    assert mesh_hash == view_factors_cache.mesh_fingerprint(
+        vtk_io.load_vtk(ICOSPHERE_GEOMETRY_PATH)
+    )
+    mesh_ops.look_at(mesh, np.array([0, 1, 0]))
+    assert mesh_hash != view_factors_cache.mesh_fingerprint(mesh)
+
+
+def test_cache_stores_dense_and_sparse_values(tmp_path):
+    cache = view_factors_cache.ViewFactorsCache(str(tmp_path))
+    dense_values = np.array([1.0, 2.0, 3.0])
+    sparse_values = sparse.csr_matrix(np.array([[0, 0.5], [0.25, 0]]))
+    assert cache.load("key") is None
+    cache.store("key", [dense_values, sparse_values])
+    loaded_dense_values, loaded_sparse_values = cache.load("key")
+    assert np.array_equal(loaded_dense_values, dense_values)
+    assert sparse.issparse(loaded_sparse_values)
+    assert np.array_equal(loaded_sparse_values.toarray(), sparse_values.toarray())
+
+
+def test_cache_evicts_least_recently_used_entries(tmp_path):
+    cache = view_factors_cache.ViewFactorsCache(str(tmp_path), max_size_mb=1)
+    values = np.zeros(50_000)
+    cache.store("first", [values])
+    cache.store("second", [values])
+    os.utime(tmp_path / "first.npz", (0, 0))
+    os.utime(tmp_path / "second.npz", (1, 1))
+    cache.load("first")
+    cache.store("third", [values])
+    assert cache.load("first") is not None
+    assert cache.load("second") is None
+    assert cache.load("third") is not None
+
+
+def test_cache_only_scans_directory_when_over_max_size(tmp_path, monkeypatch):
+    scanned_directories = []
+    listdir = os.listdir
+
+    def counted_listdir(path):
+        scanned_directories.append(path)
+        return listdir(path)
+
+    monkeypatch.setattr(os, "listdir", counted_listdir)
+    values = np.zeros(50_000)
+    unbounded_cache = view_factors_cache.ViewFactorsCache(
+        str(tmp_path / "unbounded"), max_size_mb=np.inf
+    )
+    for index in range(5):
+        unbounded_cache.store(f"entry_{index}", [values])
+    assert scanned_directories == []
+
+    cache = view_factors_cache.ViewFactorsCache(str(tmp_path / "bounded"), max_size_mb=1)
+    for index in range(2):
+        cache.store(f"entry_{index}", [values])
+    assert len(scanned_directories) == 1
+    cache.store("entry_2", [values])
+    assert len(scanned_directories) == 2
+    assert cache.size <= cache.max_size
@@ -0,0 +1,72 @@
+from test_config import *
+from src import view_factors_checkpoint, view_factors, vtk_io, mesh_ops
+import numpy as np
+import pytest
+
+
+def test_resumed_checkpoint_keeps_seed_and_results(tmp_path):
+    directory = str(tmp_path / "checkpoint")
+    checkpoint = view_factors_checkpoint.ViewFactorsCheckpoint(directory, "run", 11)
+    checkpoint.store("earth_division_0", [np.arange(3.0), np.ones(3)])
+
+    resumed = view_factors_checkpoint.ViewFactorsCheckpoint(
+        directory, "run", 12, resume=True
+    )
+    assert resumed.resumed
+    assert resumed.seed == 11
+    assert resumed.stored_amount("earth_division_") == 1
+    assert np.array_equal(resumed.load("earth_division_0")[0], np.arange(3.0))
+
+
+def test_checkpoint_is_discarded_without_resume(tmp_path):
+    directory = str(tmp_path / "checkpoint")
+    checkpoint = view_factors_checkpoint.ViewFactorsCheckpoint(directory, "run", 11)
+    checkpoint.store("earth_division_0", [np.arange(3.0)])
+
+    restarted = view_factors_checkpoint.ViewFactorsCheckpoint(directory, "run", 12)
+    assert not restarted.resumed
+    assert restarted.seed == 12
+    assert not restarted.contains("earth_division_0")
+
+
+def test_checkpoint_of_other_inputs_is_not_resumed(tmp_path):
+    directory = str(tmp_path / "checkpoint")
+    view_factors_checkpoint.ViewFactorsCheckpoint(directory, "run", 11)
+    with pytest.raises(Exception):
+        view_factors_checkpoint.ViewFactorsCheckpoint(
+            directory, "other run", 11, resume=True
+        )
+
+
+def test_element_element_resumed_from_checkpoint_is_identical(tmp_path):
+    mesh = vtk_io.load_vtk(BACKWARDS_PYRAMID_GEOMETRY_PATH)
+    element_amount = mesh_ops.element_amount(mesh)
+    absorptance = np.full(element_amount, 0.5)
+    two_sides_emission = np.zeros(element_amount, dtype=bool)
+    directory = str(tmp_path / "checkpoint")
+
+    def element_element(checkpoint):
+        return view_factors.element_element(
+            mesh,
+            absorptance,
+            two_sides_emission,
+            500,
+            2,
+            block_size=2,
+            seed=checkpoint.seed,
+            checkpoint=checkpoint,
+        )
+
+    checkpoint = view_factors_checkpoint.ViewFactorsCheckpoint(directory, "run", 5)
+    uninterrupted_view_factors = element_element(checkpoint)
+    # Simulates a run interrupted after its first block
+    for block_start in range(2, element_amount, 2):
+        os.remove(os.path.join(directory, f"element_block_{block_start}.npz"))
+    checkpoint.store("element_block_0", [np.ones((2, element_amount)), np.zeros(2)])
+
+    resumed = view_factors_checkpoint.ViewFactorsCheckpoint(
+        directory, "run", 6, resume=True
+    )
+    resumed_view_factors = element_element(resumed)
+    assert np.array_equal(resumed_view_factors[:2], np.ones((2, element_amount)))
+    assert np.array_equal(resumed_view_factors[2:], uninterrupted_view_factors[2:])
@@ -47,7 +47,7 @@ impl Default for MaterialProperties {
 pub struct ViewFactors {
     pub earth_ir: Vec<f64>,
     pub earth_albedo: Vec<f64>,
-    pub sun: f64,
+    pub sun: Vec<f64>,
     pub elements: Vec<f64>,
 }
 
@@ -148,7 +148,7 @@ impl Element {
         let factors = ViewFactors {
             earth_ir: vec![1.0],
             earth_albedo: vec![1.0],
-            sun: 1.0,
+            sun: vec![1.0],
             elements: vec![0.1f64; n_elements],
         };
 
@@ -368,6 +368,15 @@ impl Element {
         (factor * BOLTZMANN * alpha * area / 3.0) * e
     }
 
+    /// The function `division_sun_view_factor` returns the sun view factor of an orbit division.
+    /// View factors files with a single sun vector use it for every division.
+    fn division_sun_view_factor(factors: &ViewFactors, division: usize) -> f64 {
+        match factors.sun.len() {
+            1 => factors.sun[0],
+            _ => factors.sun[division],
+        }
+    }
+
     /// The function `calculate_f_array` calculates the F values for each orbit division based on
     /// various input parameters.
     ///
@@ -395,6 +404,7 @@ impl Element {
                     earth_ir,
                     albedo_factor,
                     generated_heat,
+                    Self::division_sun_view_factor(&factors, *idx),
                     factors.earth_albedo[*idx],
                     factors.earth_ir[*idx],
                     *in_eclipse,
@@ -422,6 +432,8 @@ impl Element {
     /// It is multiplied with the solar intensity and the earth view factor for albedo to calculate the albedo contribution.
     /// * `generated_heat`: The `generated_heat` parameter represents the amount of heat generated by
     /// the element. It is a `f64` (floating-point number) value.
+    /// * `sun_view_factor`: The parameter `sun_view_factor` represents the view factor between the
+    /// surface and the Sun at the orbit division.
     /// * `earth_view_factor_albedo`: The parameter `earth_view_factor_albedo` represents the view
     /// factor between the surface and the Earth for the albedo component. It is used to calculate the
     /// contribution of reflected solar radiation from the Earth's surface.
@@ -441,6 +453,7 @@ impl Element {
         earth_ir: f64,
         albedo_factor: f64,
         generated_heat: f64,
+        sun_view_factor: f64,
         earth_view_factor_albedo: f64,
         earth_view_factor_ir: f64,
         in_eclipse: bool,
@@ -449,7 +462,7 @@ impl Element {
 
         let solar = match in_eclipse {
             true => 0.0,
-            false => properties.alpha_sun * solar_intensity * factors.sun,
+            false => properties.alpha_sun * solar_intensity * sun_view_factor,
         };
         let ir = properties.alpha_ir * earth_view_factor_ir * earth_ir;
         let albedo =
@@ -619,7 +632,7 @@ mod tests {
         let vf = ViewFactors {
             earth_ir: vec![1.0, 0.5, 1.0],
             earth_albedo: vec![1.0, 0.4, 1.0],
-            sun: 1.0,
+            sun: vec![1.0],
             elements: vec![1.0, 1.0, 1.0],
         };
 
@@ -657,7 +670,7 @@ mod tests {
         let vf = ViewFactors {
             earth_ir: vec![1.0, 0.5, 1.0],
             earth_albedo: vec![1.0, 0.4, 1.0],
-            sun: 1.0,
+            sun: vec![1.0],
             elements: vec![1.0, 1.0, 1.0],
         };
 
@@ -679,4 +692,41 @@ mod tests {
             }
         }
     }
+
+    #[test]
+    fn test_calculate_f_array_sun_by_division() {
+        use super::{MaterialProperties, ViewFactors};
+        let m_props = MaterialProperties {
+            conductivity: 1.0,
+            density: 1.0,
+            specific_heat: 1.0,
+            thickness: 1.0,
+            alpha_sun: 1.0,
+            alpha_ir: 1.0,
+        };
+
+        let vf = ViewFactors {
+            earth_ir: vec![0.0, 0.0, 0.0],
+            earth_albedo: vec![0.0, 0.0, 0.0],
+            sun: vec![1.0, 0.5, 0.0],
+            elements: vec![1.0, 1.0, 1.0],
+        };
+
+        let divisions = vec![(0, false), (1, false), (2, false), (1, true)];
+
+        let f = Element::calculate_f_array(1.0, &m_props, &vf, 1361.0, 225.0, 1.0, 0.0, &divisions);
+
+        let f_expected = [
+            Vector::from_row_slice(&[453.667, 453.667, 453.667]),
+            Vector::from_row_slice(&[226.833, 226.833, 226.833]),
+            Vector::from_row_slice(&[0.0, 0.0, 0.0]),
+            Vector::from_row_slice(&[0.0, 0.0, 0.0]),
+        ];
+
+        for (f_r, f_exp) in f.iter().zip(f_expected) {
+            for (x, y) in f_r.iter().zip(f_exp.iter()) {
+                assert_float_eq(*x, *y, 0.01);
+            }
+        }
+    }
 }
@@ -428,7 +428,11 @@ pub fn fem_problem_from_vtk(config: &ParserConfig) -> Result<FEMProblem> {
                 .iter()
                 .map(|(vec, _)| vec[parser_element_id as usize])
                 .collect(),
-            sun: view_factors_parsed.sun[0].0[parser_element_id as usize],
+            sun: view_factors_parsed
+                .sun
+                .iter()
+                .map(|(vec, _)| vec[parser_element_id as usize])
+                .collect(),
             elements: elements_view_factors,
         };
 
@@ -538,7 +542,12 @@ pub fn parse_config(directory_path: &str) -> Result<ParserConfig> {
 
 const FACTOR: f64 = 1.0 / ((1 << 16) - 1) as f64;
 
+/// Value of the first field of a sparse matrix section. Dense sections start with their
+/// rows amount, which is never zero.
+const SPARSE_MATRIX_MARKER: u16 = 0;
+
 /// The function `deserialize_matrix` reads matrix data from a file and returns a `Matrix` object.
+/// The matrix can be stored either dense or sparse (CSR).
 ///
 /// Arguments:
 ///
@@ -551,6 +560,9 @@ fn deserialize_matrix(file: &mut File) -> Result<Matrix> {
     let rows = file
         .read_u16::<BigEndian>()
         .with_context(|| "Couldn't deserialize matrix rows")?;
+    if rows == SPARSE_MATRIX_MARKER {
+        return deserialize_sparse_matrix(file);
+    }
     let columns = file
         .read_u16::<BigEndian>()
         .with_context(|| "Couldn't deserialize matrix columns")?;
@@ -569,6 +581,50 @@ fn deserialize_matrix(file: &mut File) -> Result<Matrix> {
     ))
 }
 
+/// The function `deserialize_sparse_matrix` reads a CSR matrix section (after its marker) from a
+/// file and returns it as a dense `Matrix` object.
+///
+/// Arguments:
+///
+/// * `file`: `file` is a mutable reference to a `File` object. It is used to read data from the file.
+///
+/// Returns:
+///
+/// The function `deserialize_sparse_matrix` returns a `Result<Matrix>`.
+fn deserialize_sparse_matrix(file: &mut File) -> Result<Matrix> {
+    let rows = file
+        .read_u16::<BigEndian>()
+        .with_context(|| "Couldn't deserialize sparse matrix rows")? as usize;
+    let columns = file
+        .read_u16::<BigEndian>()
+        .with_context(|| "Couldn't deserialize sparse matrix columns")? as usize;
+    let non_zeros = file
+        .read_u32::<BigEndian>()
+        .with_context(|| "Couldn't deserialize sparse matrix non zeros amount")?
+        as usize;
+
+    let mut row_pointers: Vec<u32> = vec![0; rows + 1];
+    file.read_u32_into::<BigEndian>(&mut row_pointers)
+        .with_context(|| "Couldn't deserialize sparse matrix row pointers")?;
+    let mut column_indices: Vec<u16> = vec![0; non_zeros];
+    file.read_u16_into::<BigEndian>(&mut column_indices)
+        .with_context(|| "Couldn't deserialize sparse matrix column indices")?;
+    let mut data: Vec<u16> = vec![0; non_zeros];
+    file.read_u16_into::<BigEndian>(&mut data)
+        .with_context(|| "Couldn't deserialize sparse matrix data")?;
+
+    let mut matrix = Matrix::zeros(rows, columns);
+    for row in 0..rows {
+        let row_start = row_pointers[row] as usize;
+        let row_end = row_pointers[row + 1] as usize;
+        for entry in row_start..row_end {
+            matrix[(row, column_indices[entry] as usize)] = data[entry] as f64 * FACTOR;
+        }
+    }
+
+    Ok(matrix)
+}
+
 /// The function `deserialize_vector` reads data from a file and returns a tuple containing a vector and
 /// a start time.
 ///